@@ -12,6 +12,7 @@ required_libraries = [
     'cmd2',           # Command-line interface framework
     'regex',          # Advanced regular expressions
     'pandas',         # Excel file handling and data manipulation
+    'numpy',          # Vectorized statistics
     'win32clipboard', # Windows clipboard access
 ]
 input_file= ""
@@ -53,6 +54,7 @@ import cmd2
 import regex as re
 import os
 import threading
+import bisect
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
 
@@ -103,6 +105,14 @@ class ToolTip:
             self.tooltip_window = None
 
 
+class CommandCancelled(KeyboardInterrupt):
+    """Raised inside a running command when the user asks to cancel it.
+
+    Derives from KeyboardInterrupt so the broad `except Exception` handlers
+    inside the commands do not swallow it.
+    """
+
+
 if len(sys.argv)>1:
     input_file = " ".join(sys.argv[1:]).replace('"','')
     input_file='"'+input_file+'"'
@@ -136,6 +146,61 @@ def read_mapping_file(map_file, separator):
                         replacements[key] = value
         return replacements
 
+def read_lookup_table(lookup_file, key_column, fields=None, separator=",", header=False, ignore_case=False):
+    """Read a lookup file into a dict from key to the wanted fields, for join.
+
+    Excel files are read with pandas; text files are parsed line by line with the
+    csv module (or split on a separator longer than one character), keeping only
+    the key and the wanted fields of each row, so large lookup tables stay small
+    in memory. key_column and fields are 1-based;
+    fields=None keeps every column except the key. The first row of a key wins.
+    Returns (lookup, header_fields); header_fields is None unless header is set.
+    """
+    import csv
+
+    if separator.lower() == "tab":
+        separator = "\t"
+    elif separator.lower() == "space":
+        separator = " "
+
+    if lookup_file.lower().endswith(('.xls', '.xlsx')):
+        import pandas as pd
+        df = pd.read_excel(lookup_file, header=None, dtype=str, keep_default_na=False)
+        rows = ([str(value) for value in record] for record in df.itertuples(index=False))
+        handle = None
+    else:
+        handle = open(lookup_file, "r", encoding="utf-8", newline="")
+        if separator == " ":
+            rows = (line.split() for line in handle)
+        elif len(separator) != 1:
+            rows = (line.rstrip("\r\n").split(separator) for line in handle)
+        else:
+            # One reader per line: an unbalanced quote must not swallow the lines after it
+            rows = (next(csv.reader((line.rstrip("\r\n"),), delimiter=separator), []) for line in handle)
+
+    lookup = {}
+    header_fields = None
+    try:
+        for row in rows:
+            if not row:
+                continue
+            if fields is None:
+                wanted = tuple(value for i, value in enumerate(row, start=1) if i != key_column)
+            else:
+                wanted = tuple(row[i - 1] if i <= len(row) else "" for i in fields)
+            if header and header_fields is None:
+                header_fields = wanted
+                continue
+            key = row[key_column - 1].strip() if key_column <= len(row) else ""
+            if ignore_case:
+                key = key.casefold()
+            if key not in lookup:
+                lookup[key] = wanted
+    finally:
+        if handle is not None:
+            handle.close()
+    return lookup, header_fields
+
 def get_copied_file():
     import win32clipboard
     win32clipboard.OpenClipboard()
@@ -158,13 +223,1107 @@ def remove_spaces(s):
 def retrieve_spaces(s):
     return change_inside_quotes(s, 'hahi', ' ')
 
+# UUIDs, hex values and any run of digits: the parts of log lines that change between occurrences
+_volatile_token_re = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|0x[0-9a-f]+|\b[0-9a-f]*\d[0-9a-f]*\b|\d+',
+    re.IGNORECASE)
+
+def normalize_line(line, case_sensitive=False):
+    """Return the line with IDs, numbers and timestamps masked and whitespace collapsed."""
+    text = line.rstrip('\n\r')
+    if not case_sensitive:
+        text = text.lower()
+    text = _volatile_token_re.sub('#', text)
+    return ' '.join(text.split())
+
+def _lsh_bands(num_perm, similarity):
+    """Pick (bands, rows) so the LSH threshold (1/bands)**(1/rows) is closest to similarity."""
+    candidates = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(candidates, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - similarity))
+
+def minhash_clusters(texts, similarity=0.8, num_perm=64, progress=None):
+    """Cluster texts whose word sets have an estimated Jaccard similarity >= similarity.
+
+    Texts are bucketed band by band (LSH) on MinHash values; a text is merged
+    with the first text of its bucket when their word sets have a Jaccard
+    similarity of at least `similarity`. Signatures are never kept whole: each
+    band computes only its own MinHash rows, chunk_size texts at a time, from
+    one flat array of word hashes, so memory stays proportional to the text
+    rather than to len(texts) * num_perm. Words are hashed with zlib.crc32 and
+    the permutations come from a fixed seed, so every run gives the same
+    clusters. Returns one cluster id per text.
+    """
+    import zlib
+    import numpy as np
+
+    chunk_size = 4096
+    prime = np.uint64((1 << 31) - 1)
+    rng = np.random.default_rng(12345)
+    a = rng.integers(1, int(prime), num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(prime), num_perm, dtype=np.uint64)
+
+    # Word hashes of every text in one flat array; text i owns hashes[starts[i]:starts[i + 1]]
+    word_sets = [set(text.split()) or {text} for text in texts]
+    starts = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(words) for words in word_sets], out=starts[1:])
+    hashes = np.fromiter((zlib.crc32(word.encode("utf-8", "surrogateescape"))
+                          for words in word_sets for word in words),
+                         dtype=np.uint64, count=int(starts[-1]))
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def jaccard(i, j):
+        return len(word_sets[i] & word_sets[j]) / len(word_sets[i] | word_sets[j])
+
+    bands, rows = _lsh_bands(num_perm, similarity)
+    for band in range(bands):
+        band_a = a[band * rows:(band + 1) * rows, None]
+        band_b = b[band * rows:(band + 1) * rows, None]
+        buckets = {}
+        for chunk in range(0, len(texts), chunk_size):
+            if progress:
+                progress(band * len(texts) + chunk, bands * len(texts))
+            end = min(chunk + chunk_size, len(texts))
+            lo, hi = starts[chunk], starts[end]
+            values = (band_a * hashes[lo:hi] + band_b) % prime
+            minima = np.minimum.reduceat(values, starts[chunk:end] - lo, axis=1).T
+            for i, row in enumerate(minima, start=chunk):
+                first = buckets.setdefault(row.tobytes(), i)
+                if first != i:
+                    root_i, root_first = find(i), find(first)
+                    if root_i != root_first and jaccard(i, first) >= similarity:
+                        parent[root_i] = root_first
+
+    return [find(i) for i in range(len(texts))]
+
+def _read_records(path):
+    """Yield (line_number, payload) from a record file written by external_unique."""
+    with open(path, "r", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+        for record in f:
+            line_number, _, payload = record[:-1].partition("\t")
+            yield int(line_number), payload
+
+def external_unique(lines, emit, memory_bytes, size_hint, top_duplicates=0, progress=None):
+    """Remove duplicate lines with bounded memory, keeping first occurrences in order.
+
+    Lines are hash-partitioned into temporary bucket files, each bucket is
+    deduplicated in memory, and the surviving lines are merged back by line
+    number. Only one bucket is held in memory at a time; the bucket count is
+    derived from size_hint (bytes of input) and memory_bytes.
+
+    emit(line) receives every unique line in original order. Returns
+    (total_lines, unique_lines, duplicates, duplicated) where duplicates holds
+    up to top_duplicates (count, first_line_number, line) tuples, most repeated
+    first, and duplicated is the number of distinct lines seen more than once.
+    """
+    import heapq
+    import math
+    import tempfile
+    import zlib
+
+    # A line held in a dict costs roughly three times its size in Python objects
+    bucket_count = max(1, min(512, math.ceil(size_hint * 3 / memory_bytes)))
+    with tempfile.TemporaryDirectory(prefix="texttool_unique_") as tmp_dir:
+        # 1. Partition: the payload is a newline flag followed by the line text
+        bucket_paths = [os.path.join(tmp_dir, f"bucket_{i}.txt") for i in range(bucket_count)]
+        buckets = [open(p, "w", encoding="utf-8", errors="surrogateescape", newline="\n") for p in bucket_paths]
+        total_lines = 0
+        try:
+            for total_lines, line in enumerate(lines, start=1):
+                if progress and total_lines % 5000 == 0:
+                    progress(total_lines)
+                if line.endswith("\n"):
+                    payload = "1" + line[:-1]
+                else:
+                    payload = "0" + line
+                buckets[zlib.crc32(payload.encode("utf-8", "surrogateescape")) % bucket_count].write(f"{total_lines}\t{payload}\n")
+        finally:
+            for f in buckets:
+                f.close()
+
+        # 2. Deduplicate each bucket in memory, write survivors sorted by line number
+        run_paths = []
+        top = []
+        duplicated = 0
+        for i, path in enumerate(bucket_paths):
+            seen = {}
+            for line_number, payload in _read_records(path):
+                entry = seen.get(payload)
+                if entry is None:
+                    seen[payload] = [line_number, 1]
+                else:
+                    entry[1] += 1
+            os.remove(path)
+            survivors = sorted((entry[0], payload) for payload, entry in seen.items())
+            run_path = os.path.join(tmp_dir, f"run_{i}.txt")
+            with open(run_path, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+                f.writelines(f"{line_number}\t{payload}\n" for line_number, payload in survivors)
+            run_paths.append(run_path)
+            if top_duplicates:
+                repeated = [(entry[1], entry[0], payload) for payload, entry in seen.items() if entry[1] > 1]
+                duplicated += len(repeated)
+                top = heapq.nlargest(top_duplicates, top + repeated, key=lambda d: (d[0], -d[1]))
+            del seen, survivors
+
+        # 3. Stitch the runs back together in original first-occurrence order
+        unique_lines = 0
+        for _, payload in heapq.merge(*(_read_records(p) for p in run_paths), key=lambda r: r[0]):
+            unique_lines += 1
+            emit(payload[1:] + "\n" if payload[0] == "1" else payload[1:])
+
+    duplicates = [(count, line_number, payload[1:]) for count, line_number, payload in top]
+    return total_lines, unique_lines, duplicates, duplicated
+
+_number_re = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_digits_re = re.compile(r'(\d+)')
+# Constructs that change meaning when a pattern is embedded in a larger one: backreferences,
+# conditional groups and inline flags
+_context_dependent_re = re.compile(r'\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux-]+[:)]')
+
+class SortKey:
+    """Key function for sort: picks a field of the line, then maps it to a comparable value.
+
+    The field is the whole line, column `column` (1-based) split on `delimiter`
+    (whitespace when None), or capture group `group` of `pattern`. The value
+    is the field itself, its first number (`numeric`, lines without a number
+    sort last; pass the sort's `reverse` so they stay last when it is
+    reversed) or its text/number chunks (`natural`, so v2 < v10).
+    Plain attributes only, so instances can be pickled to worker processes.
+    """
+
+    def __init__(self, numeric=False, natural=False, column=None, delimiter=None,
+                 pattern=None, group=0, ignore_case=False, reverse=False):
+        self.numeric = numeric
+        self.natural = natural
+        self.column = column
+        self.delimiter = delimiter
+        self.pattern = pattern
+        self.group = group
+        self.ignore_case = ignore_case
+        self.reverse = reverse
+        self._regex = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_regex'] = None  # recompiled on first use
+        return state
+
+    def __call__(self, line):
+        text = line.rstrip('\n\r')
+        if self.column is not None:
+            parts = text.split(self.delimiter)
+            text = parts[self.column - 1] if len(parts) >= self.column else ''
+        elif self.pattern is not None:
+            if self._regex is None:
+                self._regex = re.compile(self.pattern)
+            match = self._regex.search(text)
+            text = (match.group(self.group) or '') if match else ''
+        if self.ignore_case:
+            text = text.casefold()
+        if self.numeric:
+            match = _number_re.search(text)
+            if match:
+                return (0, float(match.group()))
+            return (-1, 0.0) if self.reverse else (1, 0.0)
+        if self.natural:
+            # Even positions hold text, odd positions numbers, so tuples always compare like with like
+            return tuple(int(chunk) if i % 2 else chunk for i, chunk in enumerate(_digits_re.split(text)))
+        return text
+
+def _sort_chunk(chunk, key, reverse):
+    """Worker of parallel_sort: sort one chunk, as (key, line) records when there is a key."""
+    if key is None:
+        chunk.sort(reverse=reverse)
+        return chunk
+    records = [(key(line), line) for line in chunk]
+    records.sort(key=lambda record: record[0], reverse=reverse)
+    return records
+
+def parallel_sort(lines, key, reverse, workers):
+    """Sort lines by sorting one chunk per worker process and merging the sorted chunks.
+
+    Keys are computed in the workers, once per line. The chunks come back in
+    their original order and are merged by Timsort, which detects the sorted
+    runs and merges them in C (faster than heapq.merge for data in memory);
+    equal keys keep their original order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if workers <= 1 or len(lines) < 2 * workers:
+        runs = [_sort_chunk(list(lines), key, reverse)]
+    else:
+        size = -(-len(lines) // workers)
+        chunks = [lines[i:i + size] for i in range(0, len(lines), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(_sort_chunk, chunks, [key] * len(chunks), [reverse] * len(chunks)))
+
+    if len(runs) == 1:
+        merged = runs[0]
+    else:
+        merged = [record for run in runs for record in run]
+        if key is None:
+            merged.sort(reverse=reverse)
+        else:
+            merged.sort(key=lambda record: record[0], reverse=reverse)
+    return merged if key is None else [line for _, line in merged]
+
+def compile_template(lines, placeholders, case_sensitive=False):
+    """Turn template lines into str.format strings with one combined-regex pass per line.
+
+    All placeholders are matched by a single alternation, so they are replaced
+    simultaneously and a value is never searched for the other placeholders.
+    Placeholder i becomes the field {i}; the text around it has its braces
+    doubled. A line ending in a newline keeps it even if a placeholder ate it.
+    """
+    regex = re.compile("|".join(f"({re.escape(p)})" for p in placeholders), 0 if case_sensitive else re.IGNORECASE)
+    formats = []
+    for line in lines:
+        pieces, pos = [], 0
+        for match in regex.finditer(line):
+            pieces.append(line[pos:match.start()].replace("{", "{{").replace("}", "}}"))
+            pieces.append(f"{{{match.lastindex - 1}}}")
+            pos = match.end()
+        tail = line[pos:]
+        if line.endswith("\n") and not tail.endswith("\n"):
+            tail += "\n"
+        pieces.append(tail.replace("{", "{{").replace("}", "}}"))
+        formats.append("".join(pieces))
+    return formats
+
+def write_template_rows(template, rows, path, progress=None):
+    """Write template.format(*row) for each row to path with large buffered writes; returns the row count."""
+    written = 0
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as out:
+        for written, row in enumerate(rows, 1):
+            out.write(template.format(*row))
+            if progress and written % 1000 == 0:
+                progress(written)
+    return written
+
+WORD_DELIMITERS = re.compile(r"[\s\t<>\/,\"&;:\\=\(\)\+\|\.\'\!\^\’\”\“\{\}]+")
+
+class WordIndex:
+    """Word-frequency index of the text, used for autocompletion.
+
+    The index remembers the list it was last synced with, so sync() only
+    tokenizes the lines added or removed since then: it takes them from the
+    change set of a sparse edit when there is one, skips the work when the
+    list is the same object, and only otherwise compares the two lists as
+    multisets. Commands replace current_lines rather than edit it, so a list
+    that is still the same object has not changed. Words longer than three
+    characters that start with a letter are kept in a list sorted by their
+    lower-case form; complete() finds the prefix range with bisect and ranks
+    it by frequency.
+    """
+
+    def __init__(self):
+        self.words = []         # sorted by lower-case form, then by the word itself
+        self._keys = []         # (word.lower(), word), parallel to words
+        self.counts = {}        # word -> number of occurrences in the text
+        self._source = None     # the list of lines the index was last synced with
+
+    def clear(self):
+        """Forget all words; the lists are emptied in place so references stay valid."""
+        del self.words[:]
+        del self._keys[:]
+        self.counts.clear()
+        self._source = None
+
+    def sync(self, lines, changes=None):
+        """Bring the index in step with lines, tokenizing only the lines that changed.
+
+        changes is an (old lines, new lines, {line number: new line}) change
+        set, as kept in last_changes; it is used when it leads from the list
+        the index last saw to lines.
+        """
+        from collections import Counter
+
+        if lines is self._source:
+            return
+        if changes is not None and changes[0] is self._source and changes[1] is lines:
+            old_lines = changes[0]
+            removed = Counter(old_lines[i] for i in changes[2])
+            added = Counter(changes[2].values())
+            removed, added = removed - added, added - removed
+        else:
+            new = Counter(lines)
+            old = Counter(self._source or ())
+            removed = old - new
+            added = new - old
+        self._source = lines
+        if not removed and not added:
+            return
+
+        delta = Counter()
+        for changed, sign in ((removed, -1), (added, 1)):
+            for line, times in changed.items():
+                for word in WORD_DELIMITERS.split(line):
+                    if len(word) > 3 and word[0].isascii() and word[0].isalpha():
+                        delta[word] += sign * times
+
+        appeared, vanished = [], []
+        for word, change in delta.items():
+            if not change:
+                continue
+            before = self.counts.get(word, 0)
+            after = before + change
+            if after > 0:
+                self.counts[word] = after
+                if not before:
+                    appeared.append(word)
+            elif before:
+                del self.counts[word]
+                vanished.append(word)
+
+        if len(appeared) + len(vanished) > len(self._keys) // 8:
+            # Large changes (such as loading a file) are cheaper to re-sort at once
+            self._keys[:] = sorted((w.lower(), w) for w in self.counts)
+            self.words[:] = [w for _, w in self._keys]
+            return
+        for word in vanished:
+            i = bisect.bisect_left(self._keys, (word.lower(), word))
+            del self._keys[i]
+            del self.words[i]
+        for word in appeared:
+            entry = (word.lower(), word)
+            i = bisect.bisect_left(self._keys, entry)
+            self._keys.insert(i, entry)
+            self.words.insert(i, word)
+
+    def complete(self, prefix, limit):
+        """Return up to limit words starting with prefix (any case), most frequent first."""
+        import heapq
+
+        if not prefix:
+            return heapq.nlargest(limit, self.words, key=self.counts.__getitem__)
+        prefix = prefix.lower()
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        lo = bisect.bisect_left(self._keys, (prefix,))
+        hi = bisect.bisect_left(self._keys, (upper,), lo)
+        return heapq.nlargest(limit, self.words[lo:hi], key=self.counts.__getitem__)
+
+def parse_column_spec(spec):
+    """Parse a column specification such as "1,3-5,7" into sorted 1-based column numbers.
+
+    Raises ValueError with a message meant for the user.
+    """
+    columns = set()
+    for part in spec.split(','):
+        part = part.strip()
+        try:
+            if '-' in part:
+                # Handle range (e.g., "2-4")
+                start, end = part.split('-')
+                start_col, end_col = int(start.strip()), int(end.strip())
+                if start_col < 1 or end_col < start_col:
+                    raise ValueError(f"Invalid range '{part}'")
+            else:
+                start_col = end_col = int(part)
+                if start_col < 1:
+                    raise ValueError(f"Column numbers must be positive (got {start_col})")
+        except ValueError as e:
+            if str(e).startswith(("Invalid range", "Column numbers")):
+                raise
+            raise ValueError(f"Invalid column specification. {e}")
+        columns.update(range(start_col, end_col + 1))
+    return sorted(columns)
+
+class IndentOutline:
+    """Indentation structure of a list of lines, computed in one pass.
+
+    indents[i] is the leading whitespace length of line i; blank lines are
+    flagged in blank and never end a block. block_end[i] is the index just
+    past the block headed by line i: the first later non-blank line indented
+    no deeper than it. parent[i] is the nearest enclosing header (-1 at the
+    top level) and depth[i] the number of headers above line i.
+    """
+
+    def __init__(self, lines):
+        import heapq
+
+        self.lines = list(lines)
+        n = len(self.lines)
+        self.indents = [len(line) - len(line.lstrip()) for line in self.lines]
+        self.blank = [not line.strip() for line in self.lines]
+        self.block_end = [n] * n
+        self.parent = [-1] * n
+        self.depth = [0] * n
+        stack = []          # open non-blank headers, strictly increasing indents
+        open_blanks = []    # heap of (-indent, index) for blank lines whose block is open
+        for i, indent in enumerate(self.indents):
+            if not self.blank[i]:
+                while stack and self.indents[stack[-1]] >= indent:
+                    self.block_end[stack.pop()] = i
+                while open_blanks and -open_blanks[0][0] >= indent:
+                    self.block_end[heapq.heappop(open_blanks)[1]] = i
+            if stack:
+                self.parent[i] = stack[-1]
+                self.depth[i] = self.depth[stack[-1]] + 1
+            if self.blank[i]:
+                heapq.heappush(open_blanks, (-indent, i))
+            else:
+                stack.append(i)
+
+    def block(self, i):
+        """(start, end) index range of the block headed by line i."""
+        return i, self.block_end[i]
+
+    def blocks(self, matches, depth=None):
+        """Index ranges of the blocks headed by matching lines, outermost first.
+
+        matches(i) tests line i; lines inside a block that was already taken are
+        not tested again. With depth, only headers at that nesting depth count.
+        """
+        ranges = []
+        i, n = 0, len(self.lines)
+        while i < n:
+            if (depth is None or self.depth[i] == depth) and matches(i):
+                ranges.append(self.block(i))
+                i = self.block_end[i]
+            else:
+                i += 1
+        return ranges
+
+class ParsedTable:
+    """Delimited text parsed once into column arrays.
+
+    quoting selects the tokenizer: 'csv' uses the csv module, so quoted fields
+    may contain the delimiter; 'raw' is a plain str.split(delimiter); 'words'
+    splits on runs of whitespace. columns[i] holds column i + 1 of every row,
+    with "" where a row is shorter; row_lengths keeps the real field counts.
+
+    'csv' falls back to 'raw' (and quoting says so) when the delimiter is not a
+    single character, or when an unbalanced quote would merge several lines
+    into one row: every row always comes from exactly one line.
+    """
+
+    def __init__(self, lines, delimiter, quoting):
+        import csv
+        from itertools import zip_longest
+
+        self.lines = list(lines)
+        self.delimiter = delimiter
+        if quoting == "csv" and len(delimiter) != 1:
+            quoting = "raw"
+        if quoting == "csv":
+            rows = list(csv.reader((line.rstrip("\r\n") for line in self.lines), delimiter=delimiter))
+            if len(rows) != len(self.lines):
+                quoting = "raw"
+        self.quoting = quoting
+        if quoting == "words":
+            rows = [line.split() for line in self.lines]
+        elif quoting == "raw":
+            rows = [line.rstrip("\n\r").split(delimiter) for line in self.lines]
+        self.n_rows = len(rows)
+        self.row_lengths = [len(row) for row in rows]
+        self.columns = list(zip_longest(*rows, fillvalue="")) if rows else []
+
+    def widths(self):
+        """Longest value of every column, computed once per table."""
+        if not hasattr(self, "_widths"):
+            self._widths = [max(map(len, column)) for column in self.columns]
+        return self._widths
+
+    def column(self, number):
+        """Values of a 1-based column, "" for rows that are too short."""
+        if number <= len(self.columns):
+            return self.columns[number - 1]
+        return ("",) * self.n_rows
+
+    def format_rows(self, rows):
+        """Turn rows of fields back into lines, one line per row.
+
+        In csv mode, rows of two or more fields are quoted where the tokenizer
+        needs it; empty and single-field rows are written as they are.
+        """
+        if self.quoting == "csv":
+            import csv
+            import io
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=self.delimiter, lineterminator="\n")
+            lines = []
+            for row in rows:
+                if len(row) < 2:
+                    lines.append("".join(row) + "\n")
+                    continue
+                writer.writerow(row)
+                lines.append(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+            return lines
+        return [self.delimiter.join(row) + "\n" for row in rows]
+
+PIPELINE_COMMANDS = ("trim_whitespace", "convert_case", "replace", "right_replace", "left_replace", "remove_empty_lines")
+LAZY_COMMANDS = PIPELINE_COMMANDS + ("select",)
+# Commands that work with a virtual clone repeat without materializing it
+REPEAT_AWARE_COMMANDS = ("show", "count", "save", "revert", "liveview", "lazy", "pipeline", "begin", "end")
+# Commands that only work on the text and never call Tk, so the Live View can run them on a worker thread
+ASYNC_COMMANDS = PIPELINE_COMMANDS + (
+    "select", "filter", "unfilter", "delete", "undelete", "bulk_replace", "conditional_replace",
+    "count", "extract_between", "extract_context", "extract_column", "extract_urls", "extract_emails",
+    "split_lines", "merge_lines", "insert_line", "reverse_lines", "select_lines", "select_from_file",
+    "filter_length", "sort", "unique", "clone", "placeholder_replace", "statistics", "find_duplicates",
+    "find_mismatches", "replace_between", "replace_multiline", "remove_blocks", "indented_select",
+    "indented_remove", "group_by", "join")
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+
+def literals_overlap(a, b):
+    """True if an occurrence of literal a can share characters with an occurrence of b."""
+    if not a or not b or a in b or b in a:
+        return True
+    return any(a.endswith(b[:k]) or b.endswith(a[:k]) for k in range(1, min(len(a), len(b))))
+
+def convert_placeholders(value):
+    """Expand the [doublequote], [pipe], [quote], [tab], [greater] and [spaces] placeholders."""
+    return (value.replace('[doublequote]', '\\"').replace('[pipe]', '\\|').replace('[quote]', "\\'")
+            .replace('[tab]', "\t").replace('[greater]', ">").replace('[spaces]', r"[^\S\r\n]+"))
+
+def is_literal_pattern(pattern):
+    """True if pattern has no regex metacharacters, so as a regex it only matches itself."""
+    return bool(pattern) and not REGEX_METACHARACTERS.intersection(pattern)
+
+class LiteralPattern:
+    """Plain-text search with the same matches as the escaped pattern as a regex.
+
+    Case-sensitive search uses str.find/str.replace. Case-insensitive search
+    uses one escaped IGNORECASE regex compiled up front; for ASCII text an `in`
+    test on the lowered line first skips lines without a match, so most lines
+    never reach the regex.
+    """
+
+    def __init__(self, text, case_sensitive=False):
+        self.text = text
+        self.case_sensitive = case_sensitive
+        self.regex = re.compile(re.escape(text), 0 if case_sensitive else re.IGNORECASE)
+        self.folded = text.lower() if text.isascii() else None
+
+    def contains(self, line):
+        if self.case_sensitive:
+            return self.text in line
+        if self.folded is not None and line.isascii():
+            return self.folded in line.lower()
+        return self.regex.search(line) is not None
+
+    def substituter(self, new):
+        """Per-line function replacing every occurrence with the plain text new."""
+        if self.case_sensitive:
+            text = self.text
+            return lambda line: line.replace(text, new) if text in line else line
+        template = new.replace("\\", "\\\\")
+        sub = self.regex.sub
+        if self.folded is None:
+            return lambda line: sub(template, line)
+        contains = self.contains
+        return lambda line: sub(template, line) if contains(line) else line
+
+def change_set_diff(old, new, changes, fromfile='previous', tofile='current', n=3):
+    """Lines of a unified diff from old to new for an edit given as {line number: new line}.
+
+    Every change replaces a line in place, so no sequence matching is needed:
+    only the changed lines and their n lines of context are visited. Changes
+    with at most 2n unchanged lines between them share a hunk, as in difflib.
+    The diff is equivalent to difflib.unified_diff(old, new), with the same
+    header and hunk format, but where lines repeat difflib may align them
+    differently, so the hunks are not always identical.
+    """
+    def unified_range(start, stop):
+        length = stop - start
+        if length == 1:
+            return f"{start + 1}"
+        return f"{start + 1 if length else start},{length}"
+
+    numbers = sorted(changes)
+    if not numbers:
+        return
+    yield f"--- {fromfile}"
+    yield f"+++ {tofile}"
+    groups = [[numbers[0], numbers[0]]]
+    for i in numbers[1:]:
+        if i - groups[-1][1] - 1 > 2 * n:
+            groups.append([i, i])
+        else:
+            groups[-1][1] = i
+    for first, last in groups:
+        start, stop = max(0, first - n), min(len(old), last + 1 + n)
+        yield f"@@ -{unified_range(start, stop)} +{unified_range(start, stop)} @@"
+        i = start
+        while i < stop:
+            if i not in changes:
+                yield " " + old[i]
+                i += 1
+                continue
+            j = i
+            while j < stop and j in changes:
+                j += 1
+            for k in range(i, j):
+                yield "-" + old[k]
+            for k in range(i, j):
+                yield "+" + new[k]
+            i = j
+
+def collapsed_stacks(stats, min_seconds=1e-6):
+    """Yield "outer;...;inner microseconds" lines for flamegraph tools from pstats data.
+
+    cProfile keeps caller -> callee totals, not whole stacks, so the time of
+    a function is split between its callers in proportion to what each
+    spent in it: the stacks are exact when every function has one caller
+    and an estimate otherwise. Recursion is cut at the first repeat and
+    stacks under min_seconds are left out.
+    """
+    def label(key):
+        filename, lineno, name = key
+        if filename == "~":
+            return name.replace(";", ":")
+        return f"{os.path.basename(filename)}:{name}:{lineno}".replace(";", ":")
+
+    callees = {}
+    for key, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((key, edge[3]))
+
+    totals = {}
+    work = [(key, (label(key),), 1.0, frozenset([key])) for key, value in stats.items() if not value[4]]
+    while work:
+        key, path, share, seen = work.pop()
+        own = stats[key][2] * share
+        if own >= min_seconds:
+            totals[path] = totals.get(path, 0.0) + own
+        for callee, edge_seconds in callees.get(key, ()):
+            callee_seconds = stats[callee][3]
+            if callee in seen or not callee_seconds or share * edge_seconds < min_seconds:
+                continue
+            work.append((callee, path + (label(callee),), share * edge_seconds / callee_seconds, seen | {callee}))
+    for path, seconds in totals.items():
+        yield f"{';'.join(path)} {round(seconds * 1_000_000)}"
+
+def peak_rss_bytes():
+    """Peak resident set size of this process in bytes, or None where it can't be read."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except Exception:
+        pass
+    return None
+
+def percentile(values, q):
+    """Nearest-rank q-th percentile (0-100) of a non-empty list of numbers."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+def scan_blocks(lines, start, end, case_sensitive=False, include_end=True, progress=None):
+    """Yield (start_line, start_col, end_line, end_col) spans of the blocks between two delimiters.
+
+    The delimiters are literal strings, found with str.find (or an escaped
+    IGNORECASE regex) line by line, so the text is never joined. A block runs
+    from a start delimiter to the first end delimiter after it, like a lazy
+    DOTALL "start.*?end"; end_col is exclusive. With include_end=False the
+    block stops before the end delimiter and the scan resumes at it (as the
+    "(start)(.*?)(?=end)" form did). A start delimiter with no end after it
+    ends the scan.
+    """
+    def finder(token):
+        if case_sensitive:
+            size = len(token)
+
+            def find(line, pos):
+                i = line.find(token, pos)
+                return None if i < 0 else (i, i + size)
+        else:
+            search = re.compile(re.escape(token), re.IGNORECASE).search
+
+            def find(line, pos):
+                m = search(line, pos)
+                return None if m is None else m.span()
+        return find
+
+    find_start, find_end = finder(start), finder(end)
+    n = len(lines)
+    line_no, pos = 0, 0
+    while line_no < n:
+        found = find_start(lines[line_no], pos)
+        if found is None:
+            line_no += 1
+            pos = 0
+            if progress and line_no % 4096 == 0:
+                progress(line_no)
+            continue
+        end_line, end_pos = line_no, found[1]
+        hit = find_end(lines[end_line], end_pos)
+        while hit is None:
+            end_line += 1
+            if end_line >= n:
+                return
+            hit = find_end(lines[end_line], 0)
+        end_col = hit[1] if include_end else hit[0]
+        yield (line_no, found[0], end_line, end_col)
+        line_no, pos = end_line, end_col
+
+def span_text(lines, span):
+    """Text of a (start_line, start_col, end_line, end_col) span."""
+    start_line, start_col, end_line, end_col = span
+    if start_line == end_line:
+        return lines[start_line][start_col:end_col]
+    return lines[start_line][start_col:] + "".join(lines[start_line + 1:end_line]) + lines[end_line][:end_col]
+
+def rewrite_spans(lines, spans, render):
+    """Return a copy of lines with each span replaced by render(span).
+
+    render returns the new text, or None to keep the span. Lines outside the
+    rewritten spans are reused as they are; only the lines a span touches are
+    rebuilt. Returns (new_lines, number_of_spans_rewritten).
+    """
+    out = []
+    rewritten = 0
+    cursor_line, cursor_col = 0, 0
+    pending = ""
+
+    def flush(text):
+        if "\n" in text[:-1]:
+            out.extend(text.splitlines(keepends=True))
+        elif text:
+            out.append(text)
+
+    for span in spans:
+        new = render(span)
+        if new is None:
+            continue
+        rewritten += 1
+        start_line, start_col, end_line, end_col = span
+        if start_line == cursor_line:
+            pending += lines[start_line][cursor_col:start_col]
+        else:
+            flush(pending + lines[cursor_line][cursor_col:])
+            out.extend(lines[cursor_line + 1:start_line])
+            pending = lines[start_line][:start_col]
+        pending += new
+        cursor_line, cursor_col = end_line, end_col
+    if cursor_line < len(lines):
+        flush(pending + lines[cursor_line][cursor_col:])
+        out.extend(lines[cursor_line + 1:])
+    else:
+        flush(pending)
+    return out, rewritten
+
+def _escape_end(pattern, i):
+    """Index just past the escape sequence starting with the backslash at pattern[i].
+
+    Covers the escapes whose payload would otherwise read as plain text:
+    \\xHH, \\uHHHH, \\UHHHHHHHH, octal and group references, \\N{...} and \\p{...}.
+    """
+    nxt = pattern[i + 1:i + 2]
+    j = i + 2
+    if nxt in ("x", "u", "U"):
+        width = {"x": 2, "u": 4, "U": 8}[nxt]
+        while j < min(len(pattern), i + 2 + width) and pattern[j] in "0123456789abcdefABCDEF":
+            j += 1
+    elif nxt in ("N", "p", "P") and pattern[j:j + 1] == "{":
+        close = pattern.find("}", j)
+        j = close + 1 if close != -1 else len(pattern)
+    elif nxt == "0":
+        while j < min(len(pattern), i + 4) and pattern[j] in "01234567":
+            j += 1
+    elif nxt.isdigit():
+        # \\NNN with three octal digits is a character, otherwise a one or two digit group reference
+        if nxt in "01234567" and len(pattern) >= i + 4 and all(c in "01234567" for c in pattern[i + 2:i + 4]):
+            j = i + 4
+        elif pattern[j:j + 1].isdigit():
+            j += 1
+    return j
+
+def required_literals(pattern):
+    """Return literal strings that every match of a regex pattern must contain.
+
+    Only the top level of the pattern is examined: groups, classes, escapes and
+    optional items end a literal run. An empty list means nothing is required
+    (for example a top-level alternation), so the caller must scan every line.
+    """
+    literals = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            nxt = pattern[i + 1:i + 2]
+            if depth == 0 and nxt and not nxt.isalnum():
+                current += nxt
+                i += 2
+            else:
+                literals.append(current)
+                current = ""
+                i = _escape_end(pattern, i)
+            continue
+        if c == "[":
+            # skip the character class, including a leading ] or ^]
+            j = i + 1
+            if pattern[j:j + 1] == "^":
+                j += 1
+            if pattern[j:j + 1] == "]":
+                j += 1
+            while j < len(pattern) and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            literals.append(current)
+            current = ""
+            i = j + 1
+            continue
+        if c == "(":
+            depth += 1
+            literals.append(current)
+            current = ""
+        elif c == ")":
+            depth = max(depth - 1, 0)
+        elif c == "|" and depth == 0:
+            return []
+        elif depth:
+            pass
+        elif c in "*?{":
+            # the previous character is optional
+            literals.append(current[:-1])
+            current = ""
+            if c == "{":
+                close = pattern.find("}", i)
+                i = close if close != -1 else i
+        elif c in "+.^$":
+            literals.append(current)
+            current = ""
+        else:
+            current += c
+        i += 1
+    literals.append(current)
+    return [literal for literal in literals if len(literal) >= 3]
+
+class TrigramIndex:
+    """Inverted index from byte trigrams to the numbers of the lines that contain them.
+
+    Lines are case-folded and UTF-8 encoded, so one index serves case-sensitive
+    and case-insensitive queries; it only narrows the candidate lines, which the
+    caller verifies with the real matcher. Postings are kept in numpy arrays:
+    codes[i] is a trigram and ids[offsets[i]:offsets[i + 1]] are its lines.
+    Positions listed in dirty were edited after the build and are always
+    returned as candidates.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.codes = None
+        self.offsets = None
+        self.ids = None
+        self.dirty = set()
+        self.build_seconds = 0.0
+
+    @staticmethod
+    def _trigrams(data):
+        import numpy as np
+
+        b = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+        return (b[:-2] << 16) | (b[1:-1] << 8) | b[2:]
+
+    def build(self, lines, progress=None, chunk=100000):
+        """Index lines, processing them in chunks to bound temporary memory."""
+        import time
+        import numpy as np
+
+        start_time = time.perf_counter()
+        code_parts, id_parts = [], []
+        for start in range(0, len(lines), chunk):
+            data = [line.casefold().encode("utf-8") for line in lines[start:start + chunk]]
+            lengths = np.fromiter(map(len, data), dtype=np.int64, count=len(data))
+            line_of = np.repeat(np.arange(start, start + len(data), dtype=np.uint64), lengths)
+            if len(line_of) >= 3:
+                codes = self._trigrams(b"".join(data))
+                inside = line_of[:-2] == line_of[2:]   # a trigram must not span two lines
+                pairs = np.sort((codes[inside].astype(np.uint64) << np.uint64(32)) | line_of[:-2][inside])
+                pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+                code_parts.append((pairs >> np.uint64(32)).astype(np.uint32))
+                id_parts.append((pairs & np.uint64(0xFFFFFFFF)).astype(np.uint32))
+            if progress:
+                progress(min(start + chunk, len(lines)))
+
+        codes = np.concatenate(code_parts) if code_parts else np.zeros(0, dtype=np.uint32)
+        ids = np.concatenate(id_parts) if id_parts else np.zeros(0, dtype=np.uint32)
+        order = np.argsort(codes, kind="stable")   # keeps each posting list in line order
+        codes = codes[order]
+        self.ids = ids[order]
+        self.codes, starts = np.unique(codes, return_index=True)
+        self.offsets = np.append(starts, len(codes))
+        self.lines = list(lines)
+        self.dirty = set()
+        self.build_seconds = time.perf_counter() - start_time
+
+    def memory_bytes(self):
+        """Approximate memory held by the index."""
+        arrays = (self.codes, self.offsets, self.ids)
+        return sum(a.nbytes for a in arrays if a is not None) + 8 * len(self.lines)
+
+    def sync(self, lines, max_dirty):
+        """Follow edits made to the text since the last build or sync.
+
+        Returns False when more than max_dirty lines changed; the index must
+        then be rebuilt.
+        """
+        import numpy as np
+
+        old = self.lines
+        if lines == old:
+            return True
+        n_old, n_new = len(old), len(lines)
+        if n_old == n_new:
+            changed = [i for i, (a, b) in enumerate(zip(old, lines)) if a is not b and a != b]
+            if len(changed) + len(self.dirty) > max_dirty:
+                return False
+            self.dirty.update(changed)
+            self.lines = list(lines)
+            return True
+
+        # Lines were inserted or removed: lines[start:n_new - end] replaced
+        # old[start:n_old - end]. Postings after the edit are shifted and the
+        # replaced region becomes dirty.
+        limit = min(n_old, n_new)
+        start = 0
+        while start < limit and old[start] == lines[start]:
+            start += 1
+        end = 0
+        while end < limit - start and old[n_old - 1 - end] == lines[n_new - 1 - end]:
+            end += 1
+        region = range(start, n_new - end)
+        if not n_new or len(region) + len(self.dirty) > max_dirty:
+            return False
+        shift = n_new - n_old
+        ids = self.ids.astype(np.int64)
+        # postings of removed lines point at the first edited line: a harmless
+        # false candidate, since candidates are always verified
+        ids = np.where(ids >= n_old - end, ids + shift, np.minimum(ids, start))
+        self.ids = np.minimum(ids, n_new - 1).astype(np.uint32)
+        self.dirty = {d if d < start else d + shift for d in self.dirty
+                      if d < start or d >= n_old - end} | set(region)
+        self.lines = list(lines)
+        return True
+
+    def candidates(self, literals):
+        """Sorted numbers of the lines that may contain every literal, or None if nothing narrows the search."""
+        import numpy as np
+
+        result = None
+        for literal in literals:
+            data = literal.casefold().encode("utf-8")
+            if len(data) < 3:
+                continue
+            postings = []
+            for code in np.unique(self._trigrams(data)):
+                i = np.searchsorted(self.codes, code)
+                if i < len(self.codes) and self.codes[i] == code:
+                    postings.append(self.ids[self.offsets[i]:self.offsets[i + 1]])
+                else:
+                    postings.append(np.zeros(0, dtype=np.uint32))
+            for posting in sorted(postings, key=len):
+                if result is None:
+                    result = posting
+                elif len(posting):
+                    # postings are sorted, so a binary search per candidate
+                    # intersects them in O(len(result) * log(len(posting)))
+                    found = np.searchsorted(posting, result)
+                    result = result[posting[np.minimum(found, len(posting) - 1)] == result]
+                else:
+                    result = posting
+                if not len(result):
+                    break
+        if result is None:
+            return None
+        if self.dirty:
+            return np.union1d(result, np.fromiter(self.dirty, dtype=np.uint32, count=len(self.dirty)))
+        return np.unique(result)   # shifted postings may repeat a line
+
+def _read_pickled_run(path):
+    """Yield the records of a sorted run written by external_sort."""
+    import pickle
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+def external_sort(lines, key, reverse, run_lines, emit, progress=None):
+    """Sort lines whose keys would not fit in memory.
+
+    Lines are cut into runs of run_lines, each run is sorted in memory on
+    precomputed (key, line) pairs and spilled to a temporary file, then the
+    runs are combined with a k-way heapq.merge. Equal keys keep their
+    original order. emit(line) receives the lines in sorted order.
+    """
+    import heapq
+    import pickle
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="texttool_sort_") as tmp_dir:
+        run_paths = []
+
+        def spill(run):
+            if key is None:
+                run.sort(reverse=reverse)
+            else:
+                run.sort(key=lambda record: record[0], reverse=reverse)
+            path = os.path.join(tmp_dir, f"run_{len(run_paths)}.pkl")
+            with open(path, "wb") as f:
+                for start in range(0, len(run), 10000):
+                    pickle.dump(run[start:start + 10000], f, protocol=pickle.HIGHEST_PROTOCOL)
+            run_paths.append(path)
+
+        run = []
+        for count, line in enumerate(lines, start=1):
+            run.append(line if key is None else (key(line), line))
+            if len(run) >= run_lines:
+                spill(run)
+                run = []
+                if progress:
+                    progress(count)
+        if run:
+            spill(run)
+        del run
+
+        runs = [_read_pickled_run(p) for p in run_paths]
+        if key is None:
+            for line in heapq.merge(*runs, reverse=reverse):
+                emit(line)
+        else:
+            for _, line in heapq.merge(*runs, key=lambda record: record[0], reverse=reverse):
+                emit(line)
+
 class TextTool(cmd2.Cmd):
     def __init__(self):
         global input_file
         super().__init__(persistent_history_file=".text_tool_history.txt")
         self.text_lines = []
         self.current_lines = []
-        self.words = []
+        self.word_index = WordIndex()
+        self.words = self.word_index.words
         self.previous_lines = []
         self.previous_words = []
         self.original_full_text = []
@@ -173,6 +1332,34 @@ class TextTool(cmd2.Cmd):
         self.highlight_enabled = False
         self.auotocomplete_from_text = False        
         self.selected_indices = []
+        self.cancel_event = threading.Event()  # set to stop the running command; new for every command
+        self.progress = (0, 0)                  # (lines processed, total lines)
+        self.progress_chunk_size = 5000         # lines between progress reports
+        self.command_owner = None               # 'cli' or 'liveview' while a command runs
+        self.defer_live_view = False            # True while a worker thread owns the text
+        self.sort_memory_mb = 512               # above this estimate, sort spills runs to disk
+        self.completion_limit = 50              # most frequent text words offered per completion
+        self.trigram_index = None               # TrigramIndex while 'index on'
+        self.table_cache = {}                   # (delimiter, quoting) -> ParsedTable of current_lines
+        self.outline_cache = None               # IndentOutline of current_lines
+        self.pipeline_block = None              # commands collected between 'begin' and 'end'
+        self.lazy_plan = None                   # pending (command, arg) steps while 'lazy on'
+        self.placeholder_memory_lines = 20_000_000  # larger placeholder_replace results need to_file
+        self.repeat_tail = None                 # (block_lines, copies) that clone appends virtually after current_lines
+        self.previous_repeat_tail = None        # repeat_tail that goes with previous_lines
+        self.clone_virtual_lines = 1_000_000    # clone results at least this long are kept virtual
+        self.last_changes = None                # (previous_lines, current_lines, {line number: new line}) of the last sparse edit
+        self.liveview_patch_limit = 10_000      # above this many changed lines the Live View is reloaded, not patched
+        self.liveview_seconds = 0.0             # time spent syncing and refreshing the Live View, read by profile
+        self.profile_enabled = False            # "profile on": measure every command
+        self.profile_records = []               # one dict per profiled command of the session
+        self.profile_started_tracing = False    # tracemalloc was started by "profile on"
+        self.metrics_path = None                # JSON lines file of "metrics on", None while off
+        self.metrics_session = None             # start time and process id, set by the first "metrics on"
+        self.cache_hits = {'table': 0, 'outline': 0}  # reuses of the parsed table and indent outline caches
+        self.size_cache = {}                    # 'text' / 'repeat' -> (list, character count), read by text_size
+        self.index_stats = {'indexed_queries': 0, 'indexed_seconds': 0.0, 'indexed_lines': 0,
+                            'verified_lines': 0, 'scan_seconds': 0.0, 'scanned_lines': 0}
         self.COLOR_HEADER = "\033[1;36m"  # Cyan
         self.COLOR_COMMAND = "\033[1;32m"  # Green
         self.COLOR_EXAMPLE = "\033[1;33m"  # Yellow
@@ -274,6 +1461,16 @@ class TextTool(cmd2.Cmd):
         self.hidden_commands.append('replace_multiline')
         self.hidden_commands.append('extract_context')
         self.hidden_commands.append('unfilter')
+        self.hidden_commands.append('index')
+        self.hidden_commands.append('group_by')
+        self.hidden_commands.append('join')
+        self.hidden_commands.append('pipeline')
+        self.hidden_commands.append('begin')
+        self.hidden_commands.append('end')
+        self.hidden_commands.append('lazy')
+        self.hidden_commands.append('profile')
+        self.hidden_commands.append('profile_cmd')
+        self.hidden_commands.append('metrics')
         
 
         self.liveview_box = None  # keep reference to the text box
@@ -331,6 +1528,94 @@ class TextTool(cmd2.Cmd):
                 return None, f"Invalid regex pattern: {e2}"
 
 
+    def _parse_replace_args(self, arg):
+        """Split replace arguments into (string1, string2, case_sensitive); ValueError on bad input."""
+        # Check for case_sensitive parameter
+        case_sensitive = "case_sensitive" in arg
+        if case_sensitive:
+            arg = arg.replace("case_sensitive", "").strip()
+
+        # Check if the arguments are quoted
+        if arg.startswith('"') and arg.count('"') >= 2:
+            # Split the arguments by double quotes
+            args = arg.split('"')
+            if len(args) < 4:
+                raise ValueError('Invalid arguments. Usage: replace "string1" "string2" OR replace string1 string2')
+            string1, string2 = args[1], args[3]
+        elif arg.startswith("'") and arg.count("'") >= 2:
+            # Split the arguments by single quotes
+            args = arg.split("'")
+            if len(args) < 4:
+                raise ValueError('Invalid arguments. Usage: replace "string1" "string2" OR replace string1 string2')
+            string1, string2 = args[1], args[3]
+        else:
+            # Split the arguments by spaces (for unquoted arguments)
+            args = arg.split()
+            if len(args) < 2:
+                raise ValueError('Invalid arguments. Usage: replace "string1" "string2" OR replace string1 string2')
+            string1, string2 = args[0], args[1]
+        if (string1.startswith("(") or string1.startswith("\\") or "." in string1) and not (string1.startswith("^") and string1.endswith("$")):
+            string1 = f"^{string1}$"
+        return string1, string2, case_sensitive
+
+    def _parse_select_args(self, arg):
+        """Parse select arguments into (search_terms, regexes, negate, case_sensitive); re.error on bad patterns."""
+        # Check for case_sensitive parameter
+        case_sensitive = "case_sensitive" in arg
+        if case_sensitive:
+            arg = arg.replace("case_sensitive", "").strip()
+
+        # Remove surrounding quotes if present
+        arg = arg.strip('"').strip("'")
+
+        # Check if the selection is negated (e.g., "!string1")
+        negate = False
+        if arg.startswith("!"):
+            negate = True
+            arg = arg[1:]  # Remove the "!" prefix
+
+        # Split the input string on the keyword "OR"
+        search_terms = [term.strip() for term in arg.split("OR")]
+
+        # Compile regex patterns for each search term with appropriate flags
+        flags = 0 if case_sensitive else re.IGNORECASE
+        regexes = [re.compile(term.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags) for term in search_terms]
+        return search_terms, regexes, negate, case_sensitive
+
+    def _parse_side_replace_args(self, arg, command):
+        """Split right_replace/left_replace arguments into (string1, string2, case_sensitive)."""
+        import shlex
+        try:
+            args = shlex.split(arg) if '"' in arg or "'" in arg else arg.strip().split()
+        except ValueError:
+            raise ValueError("Invalid quotes or arguments.")
+
+        # Detect and remove case_sensitive flag
+        case_sensitive = "case_sensitive" in args
+        if case_sensitive:
+            args.remove("case_sensitive")
+
+        # Parse arguments
+        if len(args) == 2:
+            return args[0], args[1], case_sensitive
+        if len(args) == 1:
+            return "", args[0], case_sensitive
+        raise ValueError(f'Missing parameters. Usage: {command} "string1" "string2"')
+
+    def _replace_first_ignore_case(self, lines, old, new):
+        """Return a new list where the first case-insensitive `old` of each line is replaced by `new`."""
+        search_lower = old.lower()
+        new_lines = []
+        for line in self.iter_progress(lines):
+            line_lower = line.lower()
+            if search_lower in line_lower:
+                start_idx = line_lower.find(search_lower)
+                end_idx = start_idx + len(old)
+                line = line[:start_idx] + new + line[end_idx:]
+            new_lines.append(line)
+        return new_lines
+
+
     def start_live_view(self):
         """Launch Tkinter window showing live updates of current_lines, with cursor line tracking."""
         import tkinter as tk
@@ -945,9 +2230,12 @@ class TextTool(cmd2.Cmd):
                         if case_sensitive:
                             cmd += " case_sensitive"
 
-                        # --- Execute and update ---
-                        self.onecmd(cmd)
-                        self.update_live_view()
+                        # --- Execute on a worker thread, Live View updates when done ---
+                        def on_done(status, error):
+                            if status == 'error':
+                                messagebox.showerror("Error", f"Failed to apply replacement:\n{str(error)}")
+
+                        self.run_command_async(cmd, on_done)
 
 
                     except Exception as e:
@@ -1147,10 +2435,16 @@ class TextTool(cmd2.Cmd):
                             status_label.config(text="Error: Unknown operation")
                             return
                         
-                        # Execute the command
-                        self.onecmd(cmd)
-                        self.update_live_view()
-                        status_label.config(text=f"✅ {operation} applied successfully")
+                        # Execute the command on a worker thread
+                        def on_done(status, error):
+                            if status == 'done':
+                                status_label.config(text=f"✅ {operation} applied successfully")
+                            elif status == 'cancelled':
+                                status_label.config(text=f"⛔ {operation} cancelled")
+                            else:
+                                status_label.config(text=f"Error: {str(error)}")
+
+                        self.run_command_async(cmd, on_done)
                         
                     except Exception as e:
                         status_label.config(text=f"Error: {str(e)}")
@@ -1438,9 +2732,15 @@ class TextTool(cmd2.Cmd):
                             elif op == "remove_blocks":
                                 cmd = f'remove_blocks "{start_pat}" "{end_pat}"{case_sensitive}'
                         
-                        self.onecmd(cmd)
-                        self.update_live_view()
-                        status_label.config(text=f"✅ {op} executed successfully.")
+                        def on_done(status, error):
+                            if status == 'done':
+                                status_label.config(text=f"✅ {op} executed successfully.")
+                            elif status == 'cancelled':
+                                status_label.config(text=f"⛔ {op} cancelled.")
+                            else:
+                                messagebox.showerror("Error", f"Operation failed:\n{str(error)}")
+
+                        self.run_command_async(cmd, on_done)
                         
                     except Exception as e:
                         messagebox.showerror("Error", f"Operation failed:\n{str(e)}")
@@ -1580,14 +2880,16 @@ class TextTool(cmd2.Cmd):
                     """Execute the selected command with parameters."""
                     try:
                         full_command = f"{command_name} {parameters}".strip()
-                        self.onecmd(full_command)
-                        
-                        # Update Live View if command might have changed content
-                        if command_name in ['load', 'replace', 'select', 'revert', 'sort', 'unique', 
-                                          'remove_empty_lines', 'bulk_replace']:
-                            self.update_live_view()
-                        
+
+                        # Live View is refreshed by run_command_async once the command ends
+                        def on_done(status, error):
+                            if status == 'error':
+                                messagebox.showerror("Error", f"Failed to execute command:\n{str(error)}")
+
+                        # Release the grab so the progress window's Cancel button stays usable
+                        palette.grab_release()
                         palette.destroy()
+                        self.run_command_async(full_command, on_done)
                         #messagebox.showinfo("Success", f"Command '{command_name}' executed successfully!")
                         
                     except Exception as e:
@@ -1658,6 +2960,12 @@ class TextTool(cmd2.Cmd):
                     # Write to file
                     with open(file_path, 'w', encoding='utf-8') as f:
                         f.write(content)
+                        if self.repeat_tail:
+                            # Clone copies kept virtually follow the text shown in the view
+                            block, copies = self.repeat_tail
+                            block_text = "".join(block)
+                            for _ in range(copies):
+                                f.write(block_text)
                     
                     messagebox.showinfo("Success", f"File saved successfully to:\n{file_path}")
                 except Exception as e:
@@ -1682,6 +2990,12 @@ class TextTool(cmd2.Cmd):
                     # Write to file
                     with open(file_path, 'w', encoding='utf-8') as f:
                         f.write(content)
+                        if self.repeat_tail:
+                            # Clone copies kept virtually follow the text shown in the view
+                            block, copies = self.repeat_tail
+                            block_text = "".join(block)
+                            for _ in range(copies):
+                                f.write(block_text)
                     
                     # Update original file path
                     self.original_file_path = file_path
@@ -1754,22 +3068,34 @@ class TextTool(cmd2.Cmd):
         threading.Thread(target=run_viewer, daemon=True).start()
 
 
-    def update_live_view(self):
+    def update_live_view(self, changes=None):
         """
         Refresh the LiveView content from current_lines safely.
         Pushes backend text → GUI without breaking <<Modified>> bindings
         or triggering recursive modification events.
+        With a change set from apply_line_changes() only those lines are rewritten.
         """
         if not (hasattr(self, "liveview_box") and self.liveview_box):
             return
+        if self.defer_live_view:
+            return  # a worker thread is running, the refresh happens once it is done
 
+        import time
+        started = time.perf_counter()
         try:
             # Optional: temporarily disable modification event during refresh
             self.liveview_box.unbind("<<Modified>>")
 
-            # Replace GUI content
-            self.liveview_box.delete("1.0", tk.END)
-            self.liveview_box.insert(tk.END, ''.join(self.current_lines))
+            # Replace GUI content, or only the changed lines when each is still one line
+            if (changes is not None and len(changes) <= self.liveview_patch_limit
+                    and all(self.previous_lines[i].count("\n") == 1 and self.previous_lines[i].endswith("\n")
+                            and line.count("\n") == 1 and line.endswith("\n") for i, line in changes.items())):
+                for i, line in changes.items():
+                    self.liveview_box.delete(f"{i + 1}.0", f"{i + 1}.end")
+                    self.liveview_box.insert(f"{i + 1}.0", line[:-1])
+            else:
+                self.liveview_box.delete("1.0", tk.END)
+                self.liveview_box.insert(tk.END, ''.join(self.current_lines))
 
             # Reset internal Tk modified flag
             self.liveview_box.edit_modified(False)
@@ -1782,6 +3108,8 @@ class TextTool(cmd2.Cmd):
             if hasattr(self, "liveview_root") and self.liveview_root:
                 total_lines = len(self.current_lines)
                 title = f"Live Text Viewer – {total_lines} lines"
+                if self.repeat_tail:
+                    title += f" + {self.repeat_tail_lines():,} cloned lines (not shown)"
                 self.liveview_root.title(title)
 
         except Exception as e:
@@ -1790,6 +3118,8 @@ class TextTool(cmd2.Cmd):
             self.liveview_box = None
             self.file_path_label = None
             self.update_file_path_display = None
+        finally:
+            self.liveview_seconds += time.perf_counter() - started
 
 
 
@@ -1799,6 +3129,8 @@ class TextTool(cmd2.Cmd):
             return  # Skip if highlighting is disabled        
         if not hasattr(self, "liveview_box") or not self.liveview_box:
             return
+        if self.defer_live_view:
+            return
         try:
             text_box = self.liveview_box
             text_box.tag_remove("highlight", "1.0", "end")  # clear old highlights
@@ -1841,14 +3173,307 @@ class TextTool(cmd2.Cmd):
             self.text_changed = False
 
 
+    def snapshot_state(self):
+        """Capture the text state so a cancelled command can be rolled back.
+
+        Nothing is copied: commands build a new current_lines (and the other
+        lists) instead of modifying them in place, so keeping references is
+        enough. The word index catches up with the restored text on its next
+        sync.
+        """
+        state = {}
+        for name in ('current_lines', 'previous_lines', 'previous_words',
+                     'original_full_text', 'selected_indices', 'filter_status',
+                     'repeat_tail', 'previous_repeat_tail'):
+            state[name] = getattr(self, name, None)
+        return state
+
+    def restore_state(self, state):
+        """Restore a state captured by snapshot_state()."""
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def report_progress(self, done, total):
+        """Publish loop progress and stop the command if a cancel was requested."""
+        if self.cancel_event.is_set():
+            raise CommandCancelled()
+        self.progress = (done, total)
+
+    def iter_progress(self, lines):
+        """Yield lines, reporting progress every progress_chunk_size lines."""
+        total = len(lines)
+        chunk = self.progress_chunk_size
+        for i, line in enumerate(lines):
+            if i % chunk == 0:
+                self.report_progress(i, total)
+            yield line
+        self.report_progress(total, total)
+
+    def line_changes(self, transform):
+        """Sparse change set {line number: new line} of a per-line transform over current_lines.
+
+        Lines the transform leaves equal are left out, so nothing is built
+        for them.
+        """
+        changes = {}
+        for i, line in enumerate(self.iter_progress(self.current_lines)):
+            new_line = transform(line)
+            if new_line is not line and new_line != line:
+                changes[i] = new_line
+        return changes
+
+    def apply_line_changes(self, changes):
+        """Commit a change set from line_changes() and patch the Live View; returns the number of changed lines.
+
+        previous_lines takes the old list itself for revert and diff, and
+        current_lines becomes a copy of it with the changed lines put in, so
+        unchanged lines stay the same objects in both.
+        """
+        lines = list(self.current_lines)
+        for i, line in changes.items():
+            lines[i] = line
+        cached = self.size_cache.get('text')
+        if cached is not None and cached[0] is self.current_lines:
+            old = self.current_lines
+            self.size_cache['text'] = (lines, cached[1] + sum(len(line) - len(old[i]) for i, line in changes.items()))
+        self.previous_lines = self.current_lines
+        self.current_lines = lines
+        self.last_changes = (self.previous_lines, self.current_lines, changes)
+        self.update_live_view(changes)
+        return len(changes)
+
+    def matching_indices(self, regexes):
+        """Return the numbers of the lines matching any of the regexes, in order.
+
+        With the trigram index on, only the candidate lines it returns are
+        searched; patterns without a required literal fall back to a full scan.
+        """
+        import time
+
+        lines = self.current_lines
+        start = time.perf_counter()
+        candidates = None
+        if self.trigram_index is not None:
+            self.sync_index()
+            parts = []
+            for regex in regexes:
+                literals = [] if regex.flags & re.VERBOSE else required_literals(regex.pattern)
+                part = self.trigram_index.candidates(literals)
+                if part is None:
+                    parts = None
+                    break
+                parts.append(part)
+            if parts:
+                import numpy as np
+                candidates = np.unique(np.concatenate(parts)).tolist()
+
+        stats = self.index_stats
+        if candidates is None:
+            result = [i for i, line in enumerate(self.iter_progress(lines))
+                      if any(regex.search(line) for regex in regexes)]
+            stats['scan_seconds'] += time.perf_counter() - start
+            stats['scanned_lines'] += len(lines)
+        else:
+            result = [i for i in candidates if any(regex.search(lines[i]) for regex in regexes)]
+            stats['indexed_queries'] += 1
+            stats['indexed_seconds'] += time.perf_counter() - start
+            stats['indexed_lines'] += len(lines)
+            stats['verified_lines'] += len(candidates)
+        return result
+
+    def indent_outline(self):
+        """Return the indentation outline of current_lines, reusing it while the text is unchanged."""
+        outline = self.outline_cache
+        if outline is None or outline.lines != self.current_lines:
+            outline = self.outline_cache = IndentOutline(self.current_lines)
+        else:
+            self.cache_hits['outline'] += 1
+        return outline
+
+    def parsed_table(self, delimiter, quoting="csv"):
+        """Return current_lines parsed into columns, reusing the cached parse while the text is unchanged."""
+        table = self.table_cache.get((delimiter, quoting))
+        if table is not None and table.lines == self.current_lines:
+            self.cache_hits['table'] += 1
+            return table
+        if any(cached.lines != self.current_lines for cached in self.table_cache.values()):
+            self.table_cache = {}
+        table = ParsedTable(self.current_lines, delimiter, quoting)
+        self.table_cache[(delimiter, quoting)] = table
+        return table
+
+    def sync_index(self):
+        """Bring the trigram index in step with current_lines, rebuilding it after large edits."""
+        lines = self.current_lines
+        if not self.trigram_index.sync(lines, max(1000, len(lines) // 20)):
+            self.trigram_index.build(lines, progress=lambda done: self.report_progress(done, len(lines)))
+
+    def run_command_async(self, cmd, on_done=None):
+        """Run a command on a worker thread while the Live View shows its progress.
+
+        The Tk thread only polls the worker, so the window stays responsive.
+        Cancel restores the state captured before the command started.
+        on_done(status, error) is called on the Tk thread once the command
+        has finished, with status 'done', 'cancelled' or 'error'.
+
+        Only ASYNC_COMMANDS go to the worker; any other command may open a
+        dialog or touch the Live View, so it runs here on the Tk thread.
+        The command gets its own cancel event: Ctrl+C in the terminal does
+        not cancel it.
+        """
+        from tkinter import ttk
+
+        if self.command_owner is not None:
+            self.show_status_message("⏳ Another command is still running")
+            return
+
+        # Pull manual edits into current_lines now, the worker must not touch Tk
+        if self.text_changed:
+            self.sync_liveview_to_current_lines()
+
+        command = cmd.split()[0] if cmd.split() else ""
+        if command not in ASYNC_COMMANDS:
+            status, error = 'error', None
+            self.cancel_event = threading.Event()
+            self.command_owner = 'liveview'
+            try:
+                self.onecmd(cmd)
+                status = 'done'
+            except KeyboardInterrupt:
+                status = 'cancelled'
+            except Exception as e:
+                error = e
+            finally:
+                self.command_owner = None
+            if on_done:
+                try:
+                    on_done(status, error)
+                except tk.TclError:
+                    pass
+            return
+
+        snapshot = self.snapshot_state()
+        cancel_event = self.cancel_event = threading.Event()
+        self.progress = (0, 0)
+        self.command_owner = 'liveview'
+        self.defer_live_view = True
+        outcome = {'status': 'error', 'error': None}
+
+        def worker():
+            try:
+                self.onecmd(cmd)
+                outcome['status'] = 'done'
+            except KeyboardInterrupt:
+                outcome['status'] = 'cancelled'
+            except Exception as e:
+                outcome['error'] = e
+
+        # Progress window, only shown if the command takes noticeable time
+        progress_window = tk.Toplevel(self.liveview_root)
+        progress_window.title("Running command")
+        progress_window.resizable(False, False)
+        progress_window.transient(self.liveview_root)
+        progress_window.attributes('-topmost', True)
+        progress_window.withdraw()
+
+        frame = ttk.Frame(progress_window, padding="15")
+        frame.pack(fill=tk.BOTH, expand=True)
+        display_cmd = cmd if len(cmd) <= 50 else cmd[:47] + "..."
+        ttk.Label(frame, text=f"Running: {display_cmd}").pack(anchor=tk.W)
+        progress_bar = ttk.Progressbar(frame, length=320, mode="indeterminate")
+        progress_bar.pack(fill=tk.X, pady=8)
+        progress_bar.start(15)
+        progress_label = ttk.Label(frame, text="")
+        progress_label.pack(anchor=tk.W)
+
+        def cancel():
+            cancel_event.set()
+            progress_label.config(text="Cancelling...")
+
+        ttk.Button(frame, text="Cancel", command=cancel).pack(pady=(8, 0))
+        progress_window.protocol("WM_DELETE_WINDOW", cancel)
+
+        thread = threading.Thread(target=worker, daemon=True)
+
+        def show_window():
+            if thread.is_alive():
+                progress_window.deiconify()
+
+        def poll():
+            if thread.is_alive():
+                done, total = self.progress
+                if total and not cancel_event.is_set():
+                    if str(progress_bar['mode']) != "determinate":
+                        progress_bar.stop()
+                        progress_bar.config(mode="determinate")
+                    progress_bar.config(maximum=total, value=done)
+                    progress_label.config(text=f"{done:,} / {total:,} lines")
+                progress_window.after(100, poll)
+                return
+
+            progress_window.destroy()
+            status = outcome['status']
+            if cancel_event.is_set():
+                # onecmd() already rolled back; this covers a cancel after it returned
+                self.restore_state(snapshot)
+                status = 'cancelled'
+            self.defer_live_view = False
+            self.command_owner = None
+            self.update_live_view()
+            if on_done:
+                try:
+                    on_done(status, outcome['error'])
+                except tk.TclError:
+                    pass  # the dialog was closed while the command ran
+
+        thread.start()
+        progress_window.after(250, show_window)
+        progress_window.after(100, poll)
+
+
+    def sigint_handler(self, signum, frame):
+        """Ctrl+C asks the running command to stop at its next progress check.
+
+        A second Ctrl+C, or one outside a command, interrupts immediately.
+        Commands started from the Live View have their own Cancel button and
+        are left alone.
+        """
+        if self.command_owner == 'cli' and not self.cancel_event.is_set():
+            self.cancel_event.set()
+            return
+        super().sigint_handler(signum, frame)
 
     def onecmd(self, line, **kwargs):
         """
         Intercepts all CLI commands to ensure synchronization between
         LiveView (ScrolledText) and backend text (current_lines).
         """
+        # 0️⃣ Inside a begin … end block, collect the commands instead of running them
+        text = (line.raw if hasattr(line, 'raw') else str(line)).strip()
+        command = text.split()[0] if text else ""
+        if self.pipeline_block is not None and command and command != "end":
+            self.add_pipeline_step(text)
+            return False
+
+        # In lazy mode line-wise commands join the plan; anything else runs it first (see below)
+        if self.lazy_plan is not None and self.current_lines and command in LAZY_COMMANDS:
+            rest = text[len(command):].strip()
+            if rest != "?":
+                self.add_lazy_step(command, rest)
+                return False
+
+        # Profile the whole run, Live View sync and refresh included
+        probe = None
+        if self.profile_enabled and command and command != "profile":
+            probe = self.profile_start()
+        metrics = None
+        if self.metrics_path and command and command != "metrics":
+            metrics = self.metrics_start()
+
         # 1️⃣ Sync LiveView → backend if user modified text manually
         if getattr(self, 'text_changed', False):
+            import time
+            sync_started = time.perf_counter()
             try:
                 if hasattr(self, 'liveview_box') and self.liveview_box:
                     new_text = self.liveview_box.get("1.0", "end-1c")
@@ -1871,28 +3496,153 @@ class TextTool(cmd2.Cmd):
                         self.liveview_root.title(title)
             except Exception as e:
                 print(f"[Warning] LiveView → backend sync failed before command: {e}")
+            self.liveview_seconds += time.perf_counter() - sync_started
 
         # 2️⃣ Optional: remove highlights before executing a new command
         try:
-            if hasattr(self, "liveview_box") and self.liveview_box:
+            if hasattr(self, "liveview_box") and self.liveview_box and not self.defer_live_view:
                 self.liveview_box.tag_remove("highlight", "1.0", "end")
         except Exception:
             pass
 
-        # 3️⃣ Execute the command using cmd2
-        result = super().onecmd(line, **kwargs)
-
-        # 4️⃣ Backend → LiveView update after command (if backend changed)
+        # 3️⃣ Execute the command using cmd2. Commands build their result out of place,
+        # so on Ctrl+C / Cancel restoring the snapshot gives back the pre-command state.
+        snapshot = self.snapshot_state()
+        changes_before = self.last_changes
+        owns_run = self.command_owner is None  # False when run_command_async started us
+        if owns_run:
+            self.command_owner = 'cli'
+            self.cancel_event = threading.Event()
         try:
-            if hasattr(self, "liveview_box") and self.liveview_box:
+            if self.lazy_plan and command != "lazy":
+                self.materialize_plan()
+            # Line-wise edits change every copy of a clone repeat the same way, so they
+            # run on the block once; any other command needs the copies as real lines
+            # previous_repeat_tail must go with previous_lines too: a command that replaces
+            # previous_lines gets both tails materialized first, even once repeat_tail is gone
+            tail_transform = None
+            if (self.repeat_tail or self.previous_repeat_tail) and command not in REPEAT_AWARE_COMMANDS:
+                rest = text[len(command):].strip()
+                if self.repeat_tail and command in PIPELINE_COMMANDS and rest != "?" and self.current_lines:
+                    try:
+                        tail_transform = self.line_transform(command, rest)
+                    except ValueError:
+                        pass
+                if tail_transform is None:
+                    self.materialize_repeat()
+            result = super().onecmd(line, **kwargs)
+            if tail_transform is not None:
+                self._transform_repeat_tail([tail_transform])
+            cancelled = self.cancel_event.is_set()
+        except KeyboardInterrupt:
+            result = False
+            cancelled = True
+        finally:
+            if owns_run:
+                self.command_owner = None
+        if cancelled:
+            self.restore_state(snapshot)
+            self.poutput("Command cancelled, text restored to its previous state.")
+
+        # 4️⃣ Backend → LiveView update after command (if backend changed), unless
+        # the command already patched its changed lines in (apply_line_changes)
+        patched = (not cancelled and self.last_changes is not changes_before
+                   and self.last_changes[1] is self.current_lines)
+        try:
+            if hasattr(self, "liveview_box") and self.liveview_box and not patched:
                 self.update_live_view()
         except Exception:
             pass
 
         # 5️⃣ Cleanup: clear change flag after full sync
         self.text_changed = False
+        if probe is not None:
+            self.profile_stop(text, probe)
+        if metrics is not None:
+            self.metrics_stop(command, text, metrics)
         return result
 
+    def text_size(self):
+        """(lines, characters) of the text, the virtual clone repeat included.
+
+        Character counts are cached per list object: commands replace
+        current_lines rather than editing it, so the text is only summed
+        again after a command changed it, and apply_line_changes updates the
+        count from its change set without summing at all.
+        """
+        lines, chars = len(self.current_lines), self.char_count('text', self.current_lines)
+        if self.repeat_tail:
+            block, copies = self.repeat_tail
+            lines += len(block) * copies
+            chars += self.char_count('repeat', block) * copies
+        return lines, chars
+
+    def char_count(self, name, lines):
+        """Number of characters in lines, reusing size_cache[name] while it holds the same list."""
+        cached = self.size_cache.get(name)
+        if cached is not None and cached[0] is lines:
+            return cached[1]
+        chars = sum(map(len, lines))
+        self.size_cache[name] = (lines, chars)
+        return chars
+
+    def metrics_start(self):
+        """Readings taken before a command, for metrics_stop()."""
+        import time
+        lines, chars = self.text_size()
+        hits = dict(self.cache_hits, index=self.index_stats['indexed_queries'])
+        return {'lines': lines, 'chars': chars, 'hits': hits, 'wall': time.perf_counter()}
+
+    def metrics_stop(self, command, text, start):
+        """Append the JSON line of one command to the metrics file."""
+        import time, json, hashlib
+        duration = time.perf_counter() - start['wall']
+        lines, chars = self.text_size()
+        hits = dict(self.cache_hits, index=self.index_stats['indexed_queries'])
+        arg = text[len(command):].strip()
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'session': self.metrics_session,
+            'command': command,
+            'arg_hash': hashlib.sha1(arg.encode('utf-8')).hexdigest()[:12],
+            'duration': round(duration, 6),
+            'lines_before': start['lines'], 'lines_after': lines,
+            'chars_before': start['chars'], 'chars_after': chars,
+            'cache_hits': {name: hits[name] - start['hits'][name] for name in hits},
+            'peak_rss': peak_rss_bytes(),
+        }
+        try:
+            with open(self.metrics_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            self.poutput(f"Error: Could not write metrics to '{self.metrics_path}', metrics turned off: {e}")
+            self.metrics_path = None
+
+    def profile_start(self):
+        """Readings taken before a profiled command, for profile_stop()."""
+        import time, tracemalloc
+        lines, chars = self.text_size()
+        tracemalloc.reset_peak()
+        return {'lines': lines, 'chars': chars, 'memory': tracemalloc.get_traced_memory()[0],
+                'liveview': self.liveview_seconds, 'cpu': time.process_time(), 'wall': time.perf_counter()}
+
+    def profile_stop(self, text, probe):
+        """Record a profiled command and print its one-line summary."""
+        import time, tracemalloc
+        wall = time.perf_counter() - probe['wall']
+        cpu = time.process_time() - probe['cpu']
+        liveview = self.liveview_seconds - probe['liveview']
+        peak = tracemalloc.get_traced_memory()[1] - probe['memory']
+        lines, chars = self.text_size()
+        record = {'command': text, 'wall': wall, 'cpu': cpu, 'body': wall - liveview, 'liveview': liveview,
+                  'lines_in': probe['lines'], 'lines_out': lines, 'chars_in': probe['chars'], 'chars_out': chars,
+                  'peak': max(peak, 0)}
+        self.profile_records.append(record)
+        self.poutput(f"[profile] {text.split()[0]}: {wall:.3f}s wall, {cpu:.3f}s cpu "
+                     f"(command {record['body']:.3f}s, Live View {liveview:.3f}s), "
+                     f"lines {record['lines_in']:,} -> {lines:,}, chars {record['chars_in']:,} -> {chars:,}, "
+                     f"peak +{record['peak'] / 1048576:.1f} MB")
+
 
         
     def do_liveview(self, arg):
@@ -1976,6 +3726,10 @@ class TextTool(cmd2.Cmd):
         Usage:
             autocompletion_from_text          - Toggle the autocompletion state
             autocompletion_from_text on/off    - Set explicitly
+            autocompletion_from_text limit N   - Offer at most N words per completion (default 50)
+
+        Words are suggested most frequent first. The word index is updated
+        incrementally from the lines each command changed.
         """
         arg = arg.strip().lower()
         if arg.strip() == "?":  # Check if the argument is just "?"
@@ -1983,19 +3737,27 @@ class TextTool(cmd2.Cmd):
             state = "enabled" if self.auotocomplete_from_text else "disabled"
             self.poutput(f"\nAuto-Completion based on current text is now {state}.\n")
             return  # Exit the function   
+        if arg.startswith("limit"):
+            value = arg[len("limit"):].strip()
+            if not value.isdigit() or int(value) < 1:
+                self.poutput("Error: limit expects a positive number.")
+                return
+            self.completion_limit = int(value)
+            self.poutput(f"Autocompletion offers up to {self.completion_limit} words.")
+            return
         if arg in ["on", "true", "1"]:
             self.auotocomplete_from_text = True
             self.do_fill_words('')
         elif arg in ["off", "false", "0"]:
             self.auotocomplete_from_text = False
-            self.words=[]
+            self.word_index.clear()
         else:
             # toggle state if no arg given
             self.auotocomplete_from_text = not self.auotocomplete_from_text
             if self.auotocomplete_from_text:
                 self.do_fill_words('')
             else:
-                self.words=[]
+                self.word_index.clear()
 
 
         state = "enabled" if self.auotocomplete_from_text else "disabled"
@@ -2109,7 +3871,8 @@ class TextTool(cmd2.Cmd):
             
             # Insert after the selection
             insertion_point = end_line + 1
-            self.current_lines[insertion_point:insertion_point] = repeated_content
+            self.current_lines = (self.current_lines[:insertion_point] + repeated_content
+                                  + self.current_lines[insertion_point:])
             
             self.update_live_view()
             self.poutput(f"Cloned selection ({len(selected_lines)} lines) {repetitions} time(s).")
@@ -2290,59 +4053,58 @@ class TextTool(cmd2.Cmd):
         self.previous_lines = self.current_lines.copy()
         self.previous_words = self.words.copy()
         
-        # Apply operation to selected lines only
+        # Apply operation to selected lines only, on a copy committed at the end
+        new_lines = self.current_lines.copy()
+        substitute = None
         for i in range(start_line, end_line + 1):
+            if (i - start_line) % self.progress_chunk_size == 0:
+                self.report_progress(i - start_line, end_line - start_line + 1)
             original_line = self.current_lines[i]
             
             if operation == "replace":
-                # Apply replace logic directly
-                if "case_sensitive" in operation_args:
-                    case_sensitive = True
-                    op_args_clean = operation_args.replace("case_sensitive", "").strip()
-                else:
-                    case_sensitive = False
-                    op_args_clean = operation_args
-                
-                # Parse search and replace patterns
-                if op_args_clean.startswith('"') and op_args_clean.count('"') >= 2:
-                    parts = op_args_clean.split('"')
-                    string1, string2 = parts[1], parts[3]
-                elif op_args_clean.startswith("'") and op_args_clean.count("'") >= 2:
-                    parts = op_args_clean.split("'")
-                    string1, string2 = parts[1], parts[3]
-                else:
-                    parts = op_args_clean.split()
-                    if len(parts) < 2:
-                        self.poutput("Error: Invalid replace arguments.")
-                        return
-                    string1, string2 = parts[0], parts[1]
-                
-                # Perform the replacement
-                try:
-                    flags = 0 if case_sensitive else re.IGNORECASE
-                    regex = re.compile(string1.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags)
+                if substitute is None:
+                    # Apply replace logic directly, parsed once for the whole range
+                    if "case_sensitive" in operation_args:
+                        case_sensitive = True
+                        op_args_clean = operation_args.replace("case_sensitive", "").strip()
+                    else:
+                        case_sensitive = False
+                        op_args_clean = operation_args
                     
-                    if "\\0" in string2:
-                        def replacement(match):
-                            return string2.replace("\\0", match.group(0)).replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+")
-                        self.current_lines[i] = regex.sub(replacement, original_line)
+                    # Parse search and replace patterns
+                    if op_args_clean.startswith('"') and op_args_clean.count('"') >= 2:
+                        parts = op_args_clean.split('"')
+                        string1, string2 = parts[1], parts[3]
+                    elif op_args_clean.startswith("'") and op_args_clean.count("'") >= 2:
+                        parts = op_args_clean.split("'")
+                        string1, string2 = parts[1], parts[3]
                     else:
-                        self.current_lines[i] = regex.sub(string2.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), original_line)
+                        parts = op_args_clean.split()
+                        if len(parts) < 2:
+                            self.poutput("Error: Invalid replace arguments.")
+                            return
+                        string1, string2 = parts[0], parts[1]
                     
-                        
+                    pattern, replacement = convert_placeholders(string1), convert_placeholders(string2)
+                    literal = LiteralPattern(pattern, case_sensitive).substituter(replacement)
+                    if is_literal_pattern(pattern) and "\\" not in replacement:
+                        substitute = literal
+                    else:
+                        try:
+                            regex = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+                            if "\\0" in string2:
+                                replacement = lambda match: convert_placeholders(string2.replace("\\0", match.group(0)))
+                            substitute = lambda line: regex.sub(replacement, line)
+                        except re.error:
+                            # Fallback to literal replacement
+                            substitute = literal
+                
+                # Perform the replacement
+                try:
+                    new_lines[i] = substitute(original_line)
                 except re.error:
                     # Fallback to literal replacement
-                    if case_sensitive:
-                        self.current_lines[i] = original_line.replace(string1.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), string2.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"))
-                    else:
-                        line_lower = original_line.lower()
-                        search_lower = string1.lower()
-                        if search_lower in line_lower:
-                            start_idx = line_lower.find(search_lower)
-                            end_idx = start_idx + len(string1)
-                            self.current_lines[i] = original_line[:start_idx] + string2 + original_line[end_idx:]
-                        else:
-                            self.current_lines[i] = original_line
+                    new_lines[i] = literal(original_line)
             
             elif operation == "right_replace":
                 # Apply right_replace logic directly
@@ -2367,16 +4129,16 @@ class TextTool(cmd2.Cmd):
                 
                 # Perform right replacement
                 if not string1:  # append mode
-                    self.current_lines[i] = original_line.rstrip("\n") + string2 + "\n"
+                    new_lines[i] = original_line.rstrip("\n") + string2 + "\n"
                 else:
                     if case_sensitive:
                         idx = original_line.find(string1)
                     else:
                         idx = original_line.lower().find(string1.lower())
                     if idx != -1:
-                        self.current_lines[i] = original_line[:idx] + string2 + "\n"
+                        new_lines[i] = original_line[:idx] + string2 + "\n"
                     else:
-                        self.current_lines[i] = original_line
+                        new_lines[i] = original_line
             
             elif operation == "left_replace":
                 # Apply left_replace logic directly
@@ -2401,17 +4163,18 @@ class TextTool(cmd2.Cmd):
                 
                 # Perform left replacement
                 if not string1:  # prepend mode
-                    self.current_lines[i] = string2 + original_line
+                    new_lines[i] = string2 + original_line
                 else:
                     if case_sensitive:
                         idx = original_line.find(string1)
                     else:
                         idx = original_line.lower().find(string1.lower())
                     if idx != -1:
-                        self.current_lines[i] = string2 + original_line[idx + len(string1):]
+                        new_lines[i] = string2 + original_line[idx + len(string1):]
                     else:
-                        self.current_lines[i] = original_line
+                        new_lines[i] = original_line
         
+        self.current_lines = new_lines
         self.update_live_view()
         try:
             self.do_fill_words('')
@@ -2554,8 +4317,10 @@ class TextTool(cmd2.Cmd):
         self.previous_words = self.words.copy()
         
         # Trim whitespace only in selected range
+        new_lines = self.current_lines.copy()
         for i in range(start_line, end_line + 1):
-            self.current_lines[i] = self.current_lines[i].strip() + "\n"
+            new_lines[i] = new_lines[i].strip() + "\n"
+        self.current_lines = new_lines
         
         self.update_live_view()
         self.poutput(f"Trimmed whitespace in {end_line - start_line + 1} selected lines.")
@@ -2744,7 +4509,7 @@ class TextTool(cmd2.Cmd):
                 # Sort and remove duplicates
                 elif i == 11:
                     # First show sorted
-                    self.current_lines.sort()
+                    self.current_lines = sorted(self.current_lines)
                     #self.update_live_view()
                     self.poutput("\nAfter sorting:")
                     self.poutput("".join(self.current_lines))
@@ -2816,6 +4581,8 @@ class TextTool(cmd2.Cmd):
                     self.text_lines = file.readlines()
 
             self.current_lines = self.text_lines.copy()
+            if self.trigram_index is not None:
+                self.trigram_index.build(self.current_lines)
          
             self.original_file_path = file_path  # Store the original file path
             self.update_live_view()
@@ -2837,6 +4604,8 @@ class TextTool(cmd2.Cmd):
             if clipboard_content:
                 self.text_lines = [ s.replace("\r","") for s in clipboard_content.splitlines(keepends=True)]
                 self.current_lines = self.text_lines.copy()
+                if self.trigram_index is not None:
+                    self.trigram_index.build(self.current_lines)
                 
                 self.update_live_view()
                 try:
@@ -2907,6 +4676,12 @@ class TextTool(cmd2.Cmd):
             arg = arg.args
 
         if not arg:
+            if self.repeat_tail:
+                # Print the clone copies one block at a time instead of joining them all
+                block, copies = self.repeat_tail
+                self.poutput(''.join(self.current_lines), end='')
+                self._print_repeated(''.join(block), copies)
+                return
             self.poutput(''.join(self.current_lines))
             return
 
@@ -2920,10 +4695,19 @@ class TextTool(cmd2.Cmd):
             # Compile regex patterns for each search term
             regexes = [re.compile(term.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+")) for term in search_terms]
             # Find lines that match any of the regex patterns
-            matching_lines = [
-                line for line in self.current_lines
-                if any(regex.search(line) for regex in regexes)
-            ]
+            matching_lines = [self.current_lines[i] for i in self.matching_indices(regexes)]
+            if self.repeat_tail:
+                # The block is searched once; its matches repeat in every copy
+                block, copies = self.repeat_tail
+                block_matches = ''.join(line for line in block if any(regex.search(line) for regex in regexes))
+                if matching_lines or block_matches:
+                    self.poutput(''.join(matching_lines), end='')
+                    self._print_repeated(block_matches, copies)
+                    self.highlight_lines_in_liveview(matching_lines)
+                else:
+                    self.poutput("No lines matched the pattern.")
+                    self.highlight_lines_in_liveview([])
+                return
             if matching_lines:
                 self.poutput(''.join(matching_lines))
                 # Highlight matching lines in live view
@@ -2937,6 +4721,13 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: Invalid regex pattern.")
 
 
+    def _print_repeated(self, text, copies):
+        """Print text copies times, one copy per write, ending with the newline show adds."""
+        if text:
+            for _ in range(copies):
+                self.poutput(text, end='')
+        self.poutput('')
+
     def do_filter(self, arg):
         """Alias for 'select' command. Filter and display lines containing the given string(s) or regex pattern(s).
 
@@ -3042,56 +4833,24 @@ class TextTool(cmd2.Cmd):
         if not arg:
             arg=""
 
-        # Check for case_sensitive parameter
-        case_sensitive = "case_sensitive" in arg
-        if case_sensitive:
-            arg = arg.replace("case_sensitive", "").strip()
-
-        # Remove surrounding quotes if present
-        arg = arg.strip('"').strip("'")
-
-        # Check if the selection is negated (e.g., "!string1")
-        negate = False
-        if arg.startswith("!"):
-            negate = True
-            arg = arg[1:]  # Remove the "!" prefix
-
-        # Split the input string on the keyword "OR"
-        search_terms = [term.strip() for term in arg.split("OR")]
-
         try:
-            # Compile regex patterns for each search term with appropriate flags
-            flags = 0 if case_sensitive else re.IGNORECASE
-            regexes = [re.compile(term.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags) for term in search_terms]
+            search_terms, regexes, negate, case_sensitive = self._parse_select_args(arg)
             
+            # current_lines still equals original_full_text here, so the matching
+            # line numbers are also the selected indices
+            matches = self.matching_indices(regexes)
             if negate:
                 # Select lines that do NOT match any of the regex patterns
-                self.current_lines = [
-                    line for line in self.current_lines
-                    if not any(regex.search(line) for regex in regexes)
-                ]
-                try:
-                    self.do_fill_words('')
-                except:
-                    a=0                
-                self.selected_indices = [
-                    i for i, line in enumerate(self.original_full_text)
-                    if not any(regex.search(line) for regex in regexes)
-                ]
+                matched = set(matches)
+                self.selected_indices = [i for i in range(len(self.original_full_text)) if i not in matched]
             else:
                 # Select lines that match any of the regex patterns
-                self.current_lines = [
-                    line for line in self.current_lines
-                    if any(regex.search(line) for regex in regexes)
-                ]
-                try:
-                    self.do_fill_words('')
-                except:
-                    a=0                
-                self.selected_indices = [
-                    i for i, line in enumerate(self.original_full_text)
-                    if any(regex.search(line) for regex in regexes)
-                ]
+                self.selected_indices = matches
+            self.current_lines = [self.original_full_text[i] for i in self.selected_indices]
+            try:
+                self.do_fill_words('')
+            except:
+                a=0
             self.update_live_view()
             sensitivity = "case sensitive" if case_sensitive else "case insensitive"
             try:
@@ -3263,7 +5022,7 @@ class TextTool(cmd2.Cmd):
             if not negate:
                 # Delete lines that do NOT match any of the regex patterns
                 self.current_lines = [
-                    line for line in self.current_lines
+                    line for line in self.iter_progress(self.current_lines)
                     if not any(regex.search(line) for regex in regexes)
                 ]
                 self.deleteed_indices = [
@@ -3273,7 +5032,7 @@ class TextTool(cmd2.Cmd):
             else:
                 # Delete lines that match any of the regex patterns
                 self.current_lines = [
-                    line for line in self.current_lines
+                    line for line in self.iter_progress(self.current_lines)
                     if any(regex.search(line) for regex in regexes)
                 ]
                 self.deleteed_indices = [
@@ -3453,19 +5212,17 @@ class TextTool(cmd2.Cmd):
                 self.poutput("Error: No valid key-value pairs found in clipboard.")
                 return
             
-            # Perform the replacements with case sensitivity
-            for old_text, new_text in replacements.items():
+            # Perform the replacements with case sensitivity, out of place
+            lines = self.current_lines
+            total = len(replacements) * len(lines)
+            for k, (old_text, new_text) in enumerate(replacements.items()):
+                self.report_progress(k * len(lines), total)
                 if case_sensitive:
-                    self.current_lines = [line.replace(old_text, new_text) for line in self.current_lines]
+                    lines = [line.replace(old_text, new_text) for line in lines]
                 else:
                     # Case insensitive replacement
-                    for i, line in enumerate(self.current_lines):
-                        line_lower = line.lower()
-                        search_lower = old_text.lower()
-                        if search_lower in line_lower:
-                            start_idx = line_lower.find(search_lower)
-                            end_idx = start_idx + len(old_text)
-                            self.current_lines[i] = line[:start_idx] + new_text + line[end_idx:]
+                    lines = self._replace_first_ignore_case(lines, old_text, new_text)
+            self.current_lines = lines
             
             self.update_live_view()
             sensitivity = "case sensitive" if case_sensitive else "case insensitive"
@@ -3492,19 +5249,17 @@ class TextTool(cmd2.Cmd):
             sys.exit(1)  
         replacements = read_mapping_file(map_file, separator)      
         
-        # Perform replacements with case sensitivity
-        for old_text, new_text in replacements.items():
+        # Perform replacements with case sensitivity, out of place
+        lines = self.current_lines
+        total = len(replacements) * len(lines)
+        for k, (old_text, new_text) in enumerate(replacements.items()):
+            self.report_progress(k * len(lines), total)
             if case_sensitive:
-                self.current_lines = [line.replace(old_text, new_text) for line in self.current_lines]
+                lines = [line.replace(old_text, new_text) for line in lines]
             else:
                 # Case insensitive replacement
-                for i, line in enumerate(self.current_lines):
-                    line_lower = line.lower()
-                    search_lower = old_text.lower()
-                    if search_lower in line_lower:
-                        start_idx = line_lower.find(search_lower)
-                        end_idx = start_idx + len(old_text)
-                        self.current_lines[i] = line[:start_idx] + new_text + line[end_idx:]
+                lines = self._replace_first_ignore_case(lines, old_text, new_text)
+        self.current_lines = lines
                 
         self.update_live_view()
         sensitivity = "case sensitive" if case_sensitive else "case insensitive"
@@ -3553,86 +5308,60 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: No file is loaded.")
             return
 
-        # Save the current state for revert functionality
-        self.previous_lines = self.current_lines.copy()
+        # Save the current words for revert; apply_line_changes keeps the lines
         self.previous_words = self.words.copy()
 
         # Extract the raw input string from the cmd2.parsing.Statement object
         if hasattr(arg, 'args'):
             arg = arg.args
 
-        # Check for case_sensitive parameter
-        case_sensitive = "case_sensitive" in arg
-        if case_sensitive:
-            arg = arg.replace("case_sensitive", "").strip()
+        try:
+            string1, string2, case_sensitive = self._parse_replace_args(arg)
+        except ValueError as e:
+            self.poutput(f"Error: {e}")
+            return
 
-        # Check if the arguments are quoted
-        if arg.startswith('"') and arg.count('"') >= 2:
-            # Split the arguments by double quotes
-            args = arg.split('"')
-            string1, string2 = args[1], args[3]
-            if (string1.startswith("(") or string1.startswith("\\") or "." in string1) and not (string1.startswith("^") and string1.endswith("$")):
-                string1 = f"^{string1}$"
-        elif arg.startswith("'") and arg.count("'") >= 2:
-            # Split the arguments by double quotes
-            args = arg.split("'")
-            string1, string2 = args[1], args[3]
-            if (string1.startswith("(") or string1.startswith("\\") or "." in string1) and not (string1.startswith("^") and string1.endswith("$")):
-                string1 = f"^{string1}$"            
-        else:
-            # Split the arguments by spaces (for unquoted arguments)
-            args = arg.split()
-            if len(args) < 2:
-                self.poutput("Error: Invalid arguments. Usage: replace \"string1\" \"string2\" OR replace string1 string2")
-                return
-            string1, string2 = args[0], args[1]
-            if (string1.startswith("(") or string1.startswith("\\") or "." in string1) and not (string1.startswith("^") and string1.endswith("$")):
-                string1 = f"^{string1}$"
+        pattern, replacement = convert_placeholders(string1), convert_placeholders(string2)
+        if is_literal_pattern(pattern) and "\\" not in replacement:
+            # Plain text: replace every occurrence without the regex engine
+            substitute = LiteralPattern(pattern, case_sensitive).substituter(replacement)
+            changed = self.apply_line_changes(self.line_changes(substitute))
+            sensitivity = "case sensitive" if case_sensitive else "case insensitive"
+            self.do_fill_words('')
+            self.poutput(f"Replacement completed ({sensitivity}): {changed} line(s) changed.")
+            return
 
         try:
             # Compile the regex pattern with appropriate flags
             flags = 0 if case_sensitive else re.IGNORECASE
-            regex = re.compile(string1.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags)
+            regex = re.compile(pattern, flags)
 
             # Replace \0 with the entire match
             if "\\0" in string2:
-                def replacement(match):
-                    return string2.replace("\\0", match.group(0)).replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+")
-
-                self.current_lines = [regex.sub(replacement, line) for line in self.current_lines]
-                self.update_live_view()
+                def template(match):
+                    return convert_placeholders(string2.replace("\\0", match.group(0)))
             else:
                 # Perform the replacement using the regex pattern and the replacement string
-                self.current_lines = [regex.sub(string2.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), line) for line in self.current_lines]
-                self.update_live_view()
+                template = replacement
 
+            changed = self.apply_line_changes(self.line_changes(lambda line: regex.sub(template, line)))
             sensitivity = "case sensitive" if case_sensitive else "case insensitive"
             self.do_fill_words('')
-            self.poutput(f"Replacement completed ({sensitivity}).")
+            self.poutput(f"Replacement completed ({sensitivity}): {changed} line(s) changed.")
         except re.error as e:
             self.poutput(f"Error: Invalid regex pattern or replacement string. Details: {e}")
             self.poutput(f"Literal replacement will be now tried")
             try:
-                if case_sensitive:
-                    self.current_lines = [line.replace(string1.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), string2.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+")) for line in self.current_lines]
-                else:
-                    # Case insensitive literal replacement
-                    for i, line in enumerate(self.current_lines):
-                        line_lower = line.lower()
-                        search_lower = string1.lower()
-                        if search_lower in line_lower:
-                            start_idx = line_lower.find(search_lower)
-                            end_idx = start_idx + len(string1)
-                            self.current_lines[i] = line[:start_idx] + string2 + line[end_idx:]
-                self.update_live_view()
+                substitute = LiteralPattern(pattern, case_sensitive).substituter(replacement)
+                changed = self.apply_line_changes(self.line_changes(substitute))
                 sensitivity = "case sensitive" if case_sensitive else "case insensitive"
                 self.do_fill_words('')
-                self.poutput(f"Literal Replacement completed ({sensitivity}).")
+                self.poutput(f"Literal Replacement completed ({sensitivity}): {changed} line(s) changed.")
             except Exception as d:
                 self.poutput(f"Literal Replacement failed. Details: {d}")            
                 
     def complete_replace(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive','?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -3643,7 +5372,7 @@ class TextTool(cmd2.Cmd):
         return completions
 
     def complete_show(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -3695,7 +5424,8 @@ class TextTool(cmd2.Cmd):
 
         # Restore the previous state
         self.current_lines = self.previous_lines.copy()
-        self.words =  self.previous_words.copy()     
+        self.repeat_tail = self.previous_repeat_tail
+        self.do_fill_words('')
         self.update_live_view()
         self.poutput("Reverted to the previous state.")
 
@@ -3853,6 +5583,11 @@ class TextTool(cmd2.Cmd):
 
         with open(file_path, 'w') as file:
             file.writelines(self.current_lines)
+            if self.repeat_tail:
+                block, copies = self.repeat_tail
+                block_text = "".join(block)
+                for _ in range(copies):
+                    file.write(block_text)
         self.poutput(f"File saved successfully to '{file_path}'.")
 
 
@@ -3886,7 +5621,15 @@ class TextTool(cmd2.Cmd):
             f"  • {self.COLOR_EXAMPLE}replace_between{self.COLOR_RESET}    - Replace content between delimiters\n"
             f"  • {self.COLOR_EXAMPLE}placeholder_replace{self.COLOR_RESET} - Template-based replacement\n"
             f"  • {self.COLOR_EXAMPLE}replace_confirm{self.COLOR_RESET}    - Interactive replacement\n"
-            f"  • {self.COLOR_EXAMPLE}select_from_file{self.COLOR_RESET}   - Filter using external lists\n\n"
+            f"  • {self.COLOR_EXAMPLE}select_from_file{self.COLOR_RESET}   - Filter using external lists\n"
+            f"  • {self.COLOR_EXAMPLE}index{self.COLOR_RESET}              - Trigram index for repeated queries\n"
+            f"  • {self.COLOR_EXAMPLE}group_by{self.COLOR_RESET}           - Count and aggregate rows per column value\n"
+            f"  • {self.COLOR_EXAMPLE}join{self.COLOR_RESET}               - Add fields from a lookup file by key column\n"
+            f"  • {self.COLOR_EXAMPLE}pipeline{self.COLOR_RESET}           - Run several line commands in one pass (also begin … end)\n"
+            f"  • {self.COLOR_EXAMPLE}lazy{self.COLOR_RESET}               - Plan line commands and run them only when the text is needed\n"
+            f"  • {self.COLOR_EXAMPLE}profile{self.COLOR_RESET}            - Time, memory and line counts of every command\n"
+            f"  • {self.COLOR_EXAMPLE}profile_cmd{self.COLOR_RESET}        - Run one command under cProfile (top functions, .prof, flamegraph)\n"
+            f"  • {self.COLOR_EXAMPLE}metrics{self.COLOR_RESET}            - Log command timings as JSON lines, p50/p95 summary\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
             f"  • Advanced functions remain available until {self.COLOR_EXAMPLE}standard{self.COLOR_RESET} is used\n"
             f"  • No performance impact when functions are enabled\n"
@@ -3984,6 +5727,42 @@ class TextTool(cmd2.Cmd):
             self.hidden_commands.remove('extract_context')
         except:
             a = 0    			
+        try:
+            self.hidden_commands.remove('index')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('group_by')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('join')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('pipeline')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('begin')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('lazy')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('profile')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('profile_cmd')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.remove('metrics')
+        except:
+            a = 0
 
         #try:
             #self.hidden_commands.remove('indented_select')
@@ -4118,6 +5897,42 @@ class TextTool(cmd2.Cmd):
             self.hidden_commands.append('extract_context')
         except:
             a = 0  
+        try:
+            self.hidden_commands.append('index')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('group_by')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('join')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('pipeline')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('begin')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('lazy')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('profile')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('profile_cmd')
+        except:
+            a = 0
+        try:
+            self.hidden_commands.append('metrics')
+        except:
+            a = 0
             
         #try:
             #self.hidden_commands.append('indented_select')
@@ -4236,17 +6051,21 @@ class TextTool(cmd2.Cmd):
                 return
             old_text,new_text = args[0], args[1]
         
-        # Use appropriate flags based on case sensitivity
-        flags = 0 if case_sensitive else re.IGNORECASE
-        regex = re.compile(re.escape(old_text), flags)  # Escape special chars for literal match
+        # Literal match (special chars are escaped), case per the flag
+        literal = LiteralPattern(old_text, case_sensitive)
         updated_lines = []
         
         replace_all = False
-        for line in self.current_lines:
-            matches = list(regex.finditer(line))
-            if not matches:
+        for k, line in enumerate(self.current_lines):
+            if replace_all:
+                # Nothing left to confirm: replace the rest in one pass
+                substitute = literal.substituter(new_text)
+                updated_lines.extend(substitute(line) for line in self.current_lines[k:])
+                break
+            if not literal.contains(line):
                 updated_lines.append(line)
                 continue
+            matches = list(literal.regex.finditer(line))
             
             start_idx = 0
             new_line = ""
@@ -4324,41 +6143,61 @@ class TextTool(cmd2.Cmd):
 
 
     def do_count(self, arg):
-        """Count the occurrences of a specific string or regex pattern in the current text.
+        """Count the occurrences of one or more strings or regex patterns in the current text.
 
         Usage:
-            count <pattern>  - Count the occurrences of the specified pattern
+            count <pattern>                                  - Count lines containing the pattern
+            count "p1" "p2" ... [by <group>] [ignore_case]   - Count several patterns in one pass
+            count file <path> [by <group>] [ignore_case]     - Read the patterns from a file, one per line
 
         Examples:
             count "error"  - Counts the number of times "error" appears
             count "\\d+"    - Counts lines containing numbers
+            count "E100" "E200" "timeout"        - Lines and occurrences per pattern
+            count "user=(\\w+)" by 1             - Occurrences per captured user name
+            count file codes.txt                 - Count every pattern listed in codes.txt
 
         Notes:
-            - The search is case-sensitive
+            - The search is case-sensitive unless ignore_case is given
             - Supports regex patterns for complex counting
-            - Counts lines containing the pattern, not total occurrences
+            - A single pattern counts lines containing it, not total occurrences
+            - Several patterns are combined into one prefilter that finds the candidate
+              lines in a single scan; each pattern then runs on the candidates only.
+              Patterns with backreferences, conditional or named groups or inline
+              flags cannot be combined, so they run on every line.
+              The report gives per-pattern line and occurrence counts, and 'by'
+              groups the occurrences by a capture group (number or name)
         """
         help_text = (
             f"{self.COLOR_HEADER}Count - Pattern Occurrence Counter{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Description:{self.COLOR_RESET}\n"
             f"  Count how many lines contain a specific string or regular expression pattern.\n"
+            f"  Several patterns are counted in a single pass, with line and occurrence totals.\n"
             f"  Useful for statistics, debugging, and data analysis tasks.\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}count <pattern>{self.COLOR_RESET}  - Count lines containing pattern\n\n"
+            f"  {self.COLOR_EXAMPLE}count <pattern>{self.COLOR_RESET}  - Count lines containing pattern\n"
+            f"  {self.COLOR_EXAMPLE}count \"p1\" \"p2\" ... [by <group>] [ignore_case]{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}count file <path> [by <group>] [ignore_case]{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}count \"error\"{self.COLOR_RESET}       - Count error lines\n"
             f"  {self.COLOR_EXAMPLE}count \"warning\"{self.COLOR_RESET}     - Count warning lines\n"
             f"  {self.COLOR_EXAMPLE}count \"^[A-Z]\"{self.COLOR_RESET}      - Count lines starting with capital\n"
             f"  {self.COLOR_EXAMPLE}count \"\\\\d+\"{self.COLOR_RESET}         - Count lines with numbers\n"
-            f"  {self.COLOR_EXAMPLE}count \"^$\"{self.COLOR_RESET}          - Count empty lines\n\n"
+            f"  {self.COLOR_EXAMPLE}count \"^$\"{self.COLOR_RESET}          - Count empty lines\n"
+            f"  {self.COLOR_EXAMPLE}count \"E100\" \"E200\" \"timeout\"{self.COLOR_RESET} - Per-pattern lines and occurrences\n"
+            f"  {self.COLOR_EXAMPLE}count \"user=(\\\\w+)\" by 1{self.COLOR_RESET}   - Occurrences per captured user\n"
+            f"  {self.COLOR_EXAMPLE}count file codes.txt{self.COLOR_RESET}       - Patterns read from a file\n\n"
             f"{self.COLOR_COMMAND}Counting Behavior:{self.COLOR_RESET}\n"
-            f"  • {self.COLOR_COMMAND}Line-based counting{self.COLOR_RESET} - Counts lines, not total occurrences\n"
-            f"  • {self.COLOR_COMMAND}Case-sensitive{self.COLOR_RESET} - 'Error' ≠ 'error'\n"
+            f"  • {self.COLOR_COMMAND}Line-based counting{self.COLOR_RESET} - A single pattern counts lines, not total occurrences\n"
+            f"  • {self.COLOR_COMMAND}Case-sensitive{self.COLOR_RESET} - 'Error' ≠ 'error' (unless ignore_case)\n"
             f"  • {self.COLOR_COMMAND}Regex support{self.COLOR_RESET} - Use patterns for complex matching\n"
-            f"  • {self.COLOR_COMMAND}Multiple matches{self.COLOR_RESET} - Line counted once even with multiple matches\n\n"
+            f"  • {self.COLOR_COMMAND}Multiple matches{self.COLOR_RESET} - Line counted once even with multiple matches\n"
+            f"  • {self.COLOR_COMMAND}Several patterns{self.COLOR_RESET} - One scan; lines and occurrences per pattern\n"
+            f"  • {self.COLOR_COMMAND}by <group>{self.COLOR_RESET} - Occurrences grouped by a capture group number or name\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
             f"  • Use {self.COLOR_EXAMPLE}show <pattern>{self.COLOR_RESET} to see the actual lines\n"
             f"  • Combine with {self.COLOR_EXAMPLE}select{self.COLOR_RESET} to work with matching lines\n"
+            f"  • Pattern files hold one pattern per line; blank lines are skipped\n"
             f"  • No changes to text - safe for analysis\n"
             f"  • Great for log analysis and data profiling\n"
         )
@@ -4369,14 +6208,209 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: No file is loaded.")
             return
 
+        stripped = arg.strip()
+        if stripped.startswith("file ") or (stripped[:1] in ('"', "'") and len(stripped) > 1):
+            try:
+                args = shlex.split(stripped)
+            except ValueError as e:
+                self.poutput(f"Error parsing arguments: {e}")
+                return
+            if len(args) > 1:
+                self.materialize_repeat()
+                self._count_patterns(args)
+                return
+
         pattern = arg.strip('"').strip("'")
         try:
             regex = re.compile(pattern)
-            count = sum(1 for line in self.current_lines if regex.search(line))
+            count = len(self.matching_indices([regex]))
+            if self.repeat_tail:
+                block, copies = self.repeat_tail
+                count += copies * sum(1 for line in block if regex.search(line))
             self.poutput(f"Pattern '{pattern}' found {count} times.")
         except re.error:
             self.poutput("Error: Invalid regex pattern.")
 
+    def _count_patterns(self, args):
+        """Count several patterns in one scan, as used by the multi-pattern form of count."""
+        patterns = []
+        group = None
+        flags = 0
+        i = 0
+        while i < len(args):
+            token = args[i]
+            if token == "file" and i + 1 < len(args):
+                path = args[i + 1]
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        patterns.extend(line.rstrip("\r\n") for line in f if line.strip())
+                except OSError as e:
+                    self.poutput(f"Error: Could not read patterns file '{path}': {e}")
+                    return
+                i += 1
+            elif token == "by" and i + 1 < len(args):
+                group = args[i + 1]
+                group = int(group) if group.isdigit() else group
+                i += 1
+            elif token == "ignore_case":
+                flags = re.IGNORECASE
+            else:
+                patterns.append(token)
+            i += 1
+        if not patterns:
+            self.poutput("Error: No patterns to count.")
+            return
+
+        try:
+            regexes = [re.compile(p, flags) for p in patterns]
+        except re.error as e:
+            self.poutput(f"Error: Invalid regex pattern: {e}")
+            return
+        # One alternation finds the lines that match any pattern, so the individual
+        # patterns only run on candidate lines. Joining renumbers the groups, so
+        # patterns that refer to their own groups or set inline flags are not joined.
+        combined = None
+        if not any(r.groupindex or _context_dependent_re.search(r.pattern) for r in regexes):
+            try:
+                combined = re.compile("|".join(f"(?:{r.pattern})" for r in regexes), flags)
+            except re.error:
+                pass
+        if group is not None:
+            for p, r in zip(patterns, regexes):
+                if (isinstance(group, int) and group > r.groups) or (isinstance(group, str) and group not in r.groupindex):
+                    self.poutput(f"Error: Pattern '{p}' has no capture group '{group}'.")
+                    return
+
+        line_counts = [0] * len(regexes)
+        occurrences = [0] * len(regexes)
+        from collections import Counter
+
+        groups = [Counter() for _ in regexes] if group is not None else None
+        if self.trigram_index is not None:
+            candidates = self.matching_indices(regexes)
+        elif combined is not None:
+            candidates = [i for i, line in enumerate(self.iter_progress(self.current_lines)) if combined.search(line)]
+        else:
+            candidates = self.iter_progress(range(len(self.current_lines)))
+        matched_lines = 0
+        for i in candidates:
+            line = self.current_lines[i]
+            matched = False
+            for n, r in enumerate(regexes):
+                hits = 0
+                for m in r.finditer(line):
+                    hits += 1
+                    if groups is not None:
+                        groups[n][m.group(group)] += 1
+                if hits:
+                    line_counts[n] += 1
+                    occurrences[n] += hits
+                    matched = True
+            matched_lines += matched
+
+        width = min(max(len(p) for p in patterns) + 2, 40)
+        self.poutput(f"{'Pattern':<{width}} {'Lines':>10} {'Occurrences':>12}")
+        for n, p in enumerate(patterns):
+            label = p if len(p) <= width else p[:width - 3] + "..."
+            self.poutput(f"{label:<{width}} {line_counts[n]:>10} {occurrences[n]:>12}")
+            if groups is not None:
+                for value, hits in groups[n].most_common():
+                    self.poutput(f"    {'' if value is None else value}: {hits}")
+        self.poutput(f"Lines matching any pattern: {matched_lines} of {len(self.current_lines)}.")
+
+    def do_index(self, arg):
+        """Build or drop a trigram index that speeds up repeated show, count and select queries.
+
+        Usage:
+            index on      - Build the index for the current text
+            index off     - Drop the index and free its memory
+            index status  - Show index size, memory and measured query speedups
+
+        Notes:
+            - The index maps every three-character sequence to the lines that contain it.
+              Queries look up the literal text their pattern requires and only search the
+              candidate lines, which are always verified with the real pattern.
+            - Patterns with no required literal of three or more characters (such as
+              alternations at the top level) still scan every line.
+            - Edits are followed incrementally; after large edits the index is rebuilt
+              by the next query.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}Index - Trigram Index for Fast Queries{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Description:{self.COLOR_RESET}\n"
+            f"  Build an inverted index of three-character sequences so that show, count and\n"
+            f"  select only search the lines that can match, instead of scanning the whole text.\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}index on{self.COLOR_RESET}      - Build the index for the current text\n"
+            f"  {self.COLOR_EXAMPLE}index off{self.COLOR_RESET}     - Drop the index and free its memory\n"
+            f"  {self.COLOR_EXAMPLE}index status{self.COLOR_RESET}  - Index size, memory and query speedups\n\n"
+            f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}index on{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}count \"timeout\"{self.COLOR_RESET}        - Searches only lines containing 'timeout'\n"
+            f"  {self.COLOR_EXAMPLE}show \"user=\\\\d+ failed\"{self.COLOR_RESET}  - Narrowed by 'user=' and ' failed'\n"
+            f"  {self.COLOR_EXAMPLE}index status{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  • Candidate lines are always verified with the real pattern\n"
+            f"  • Patterns without a literal of 3+ characters still scan every line\n"
+            f"  • Edits are followed incrementally; large edits trigger a rebuild\n"
+            f"  • Speedups compare indexed queries with the full scans measured so far\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if hasattr(arg, 'args'):
+            arg = arg.args
+        action = arg.strip().lower() or "status"
+
+        if action == "on":
+            if not self.current_lines:
+                self.poutput("Error: No file is loaded.")
+                return
+            self.trigram_index = TrigramIndex()
+            lines = self.current_lines
+            self.trigram_index.build(lines, progress=lambda done: self.report_progress(done, len(lines)))
+            self.poutput(f"Trigram index built for {len(lines):,} lines in {self.trigram_index.build_seconds:.2f} s "
+                         f"({self.trigram_index.memory_bytes() / 1048576:.1f} MB).")
+        elif action == "off":
+            self.trigram_index = None
+            self.poutput("Trigram index dropped.")
+        elif action == "status":
+            index = self.trigram_index
+            stats = self.index_stats
+            if index is None:
+                self.poutput("Trigram index: off")
+            else:
+                self.sync_index()
+                self.poutput("Trigram index: on")
+                self.poutput(f"  Lines indexed:     {len(index.lines):,} ({len(index.dirty):,} edited since build)")
+                self.poutput(f"  Distinct trigrams: {len(index.codes):,}")
+                self.poutput(f"  Memory:            {index.memory_bytes() / 1048576:.1f} MB")
+                self.poutput(f"  Build time:        {index.build_seconds:.2f} s")
+            queries = stats['indexed_queries']
+            if not queries:
+                self.poutput("  No indexed queries yet.")
+                return
+            indexed = stats['indexed_seconds'] / queries
+            verified = 100.0 * stats['verified_lines'] / max(stats['indexed_lines'], 1)
+            self.poutput(f"  Indexed queries:   {queries}, {indexed * 1000:.1f} ms on average, "
+                         f"{verified:.2f}% of lines verified")
+            if stats['scanned_lines']:
+                scan = stats['scan_seconds'] / stats['scanned_lines'] * stats['indexed_lines'] / queries
+                self.poutput(f"  Full scan:         {scan * 1000:.1f} ms estimated for the same text, "
+                             f"speedup x{scan / max(indexed, 1e-9):.1f}")
+            else:
+                self.poutput("  Full scan:         not measured yet (run a query with the index off)")
+        else:
+            self.poutput("Error: Use 'index on', 'index off' or 'index status'.")
+
+    def complete_index(self, text, line, begidx, endidx):
+        FRIENDS_T = ['on', 'off', 'status', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
 
     def do_conditional_replace(self, arg):
         """Replace a string or regex pattern only in lines that match another pattern.
@@ -4441,7 +6475,6 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: No file is loaded.")
             return
             
-        self.previous_lines = self.current_lines.copy()
         self.previous_words = self.words.copy()
 
         # Check for case_sensitive parameter
@@ -4475,40 +6508,34 @@ class TextTool(cmd2.Cmd):
         try:
             # Use appropriate flags based on case sensitivity
             flags = 0 if case_sensitive else re.IGNORECASE
-            target_regex = re.compile(target_pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags)
-            search_regex = re.compile(search_pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags)
+            target, search = convert_placeholders(target_pattern), convert_placeholders(search_pattern)
+            replacement = convert_placeholders(replace_pattern)
+            if is_literal_pattern(target):
+                in_target = LiteralPattern(target, case_sensitive).contains
+            else:
+                in_target = re.compile(target, flags).search
+            if is_literal_pattern(search) and "\\" not in replacement:
+                substitute = LiteralPattern(search, case_sensitive).substituter(replacement)
+            else:
+                search_regex = re.compile(search, flags)
+                substitute = lambda line: search_regex.sub(replacement, line)
             
-            self.current_lines = [
-                search_regex.sub(replace_pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), line) if target_regex.search(line) else line
-                for line in self.current_lines
-            ]
-            self.update_live_view()
+            changed = self.apply_line_changes(self.line_changes(lambda line: substitute(line) if in_target(line) else line))
             sensitivity = "case sensitive" if case_sensitive else "case insensitive"
             try:
                 self.do_fill_words('')
             except:
                 a=0             
-            self.poutput(f"Replacement completed in specified lines ({sensitivity}).")
+            self.poutput(f"Replacement completed in specified lines ({sensitivity}): {changed} line(s) changed.")
         except re.error:
             self.poutput("Error: Invalid regex pattern.")
             self.poutput(f"Literal replacement will be now tried")
             try:
-                if case_sensitive:
-                    self.current_lines = [line.replace(search_pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), replace_pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+")) if target_pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+") in line else line for line in self.current_lines]
-                else:
-                    # Case insensitive literal replacement
-                    target_lower = target_pattern.lower()
-                    search_lower = search_pattern.lower()
-                    for i, line in enumerate(self.current_lines):
-                        if target_lower in line.lower():
-                            line_lower = line.lower()
-                            if search_lower in line_lower:
-                                start_idx = line_lower.find(search_lower)
-                                end_idx = start_idx + len(search_pattern)
-                                self.current_lines[i] = line[:start_idx] + replace_pattern + line[end_idx:]
-                self.update_live_view()
+                in_target = LiteralPattern(convert_placeholders(target_pattern), case_sensitive).contains
+                substitute = LiteralPattern(convert_placeholders(search_pattern), case_sensitive).substituter(convert_placeholders(replace_pattern))
+                changed = self.apply_line_changes(self.line_changes(lambda line: substitute(line) if in_target(line) else line))
                 sensitivity = "case sensitive" if case_sensitive else "case insensitive"
-                self.poutput(f"Literal Replacement completed ({sensitivity}).")
+                self.poutput(f"Literal Replacement completed ({sensitivity}): {changed} line(s) changed.")
             except Exception as d:
                 self.poutput(f"Literal Replacement failed. Details: {d}")
 
@@ -4598,29 +6625,22 @@ class TextTool(cmd2.Cmd):
             start_pattern, end_pattern = args[:2]
             filter_words = []
         
-        regex, msg = self._compile_regex_safely(
-            start_pattern,
-            end_pattern,
-            inner_only=inner_only,
-            case_sensitive=case_sensitive,
-            multiline=True
-        )
-        
-        if not regex:
-            self.poutput(f"Error: {msg}")
+        if not start_pattern or not end_pattern:
+            self.poutput("Error: Delimiters must not be empty.")
             return
         
-        text = "".join(self.current_lines)
-        matches = regex.findall(text)
+        # Stream over the lines for delimiter spans instead of regex-scanning the joined text
+        lines = self.current_lines
+        spans = scan_blocks(lines, start_pattern, end_pattern, case_sensitive,
+                            progress=lambda done: self.report_progress(done, len(lines)))
+        extracted = [span_text(lines, span) for span in spans]
         
-        if not matches:
+        if not extracted:
             self.poutput(f"No matches found between '{start_pattern}' and '{end_pattern}'.")
             return
         
-        if inner_only and matches and isinstance(matches[0], tuple):
-            extracted = [m[0] if isinstance(m, tuple) else m for m in matches]
-        else:
-            extracted = matches if isinstance(matches[0], str) else [m[0] if isinstance(m, tuple) else m for m in matches]
+        if inner_only:
+            extracted = [block[len(start_pattern):len(block) - len(end_pattern)] for block in extracted]
         
         # Apply content filtering - ALL words must be present
         if filter_words:
@@ -4737,7 +6757,8 @@ class TextTool(cmd2.Cmd):
                 self.poutput("Error: Line number out of range.")
                 return
 
-            self.current_lines.insert(line_number - 1, text_to_insert)
+            self.current_lines = (self.current_lines[:line_number - 1] + [text_to_insert]
+                                  + self.current_lines[line_number - 1:])
             self.update_live_view()
             try:
                 self.do_fill_words('')
@@ -4939,16 +6960,16 @@ class TextTool(cmd2.Cmd):
         if case_sensitive:
             # Case sensitive matching
             if negate:
-                self.current_lines = [line for line in self.current_lines if not any(s in line for s in strings)]
+                self.current_lines = [line for line in self.iter_progress(self.current_lines) if not any(s in line for s in strings)]
             else:
-                self.current_lines = [line for line in self.current_lines if any(s in line for s in strings)]
+                self.current_lines = [line for line in self.iter_progress(self.current_lines) if any(s in line for s in strings)]
         else:
             # Case insensitive matching
             strings_lower = [s.lower() for s in strings]
             if negate:
-                self.current_lines = [line for line in self.current_lines if not any(s_lower in line.lower() for s_lower in strings_lower)]
+                self.current_lines = [line for line in self.iter_progress(self.current_lines) if not any(s_lower in line.lower() for s_lower in strings_lower)]
             else:
-                self.current_lines = [line for line in self.current_lines if any(s_lower in line.lower() for s_lower in strings_lower)]
+                self.current_lines = [line for line in self.iter_progress(self.current_lines) if any(s_lower in line.lower() for s_lower in strings_lower)]
         
         self.update_live_view()
         sensitivity = "case sensitive" if case_sensitive else "case insensitive"
@@ -4971,43 +6992,65 @@ class TextTool(cmd2.Cmd):
         return completions
 
 
-    def do_convert_case(self, arg):
-        """Convert the text to uppercase, lowercase, or title case.
+    def do_join(self, arg):
+        """Enrich the delimited lines with fields from a lookup file, matched on a key column.
 
         Usage:
-            convert_case <upper|lower|title>
+            join "<lookup_file>" <key_column> [key N] [fields <columns>] [inner|left|anti]
+                 [replace] [delimiter] [sep <lookup_delimiter>] [header] [ignore_case] [raw]
 
         Arguments:
-            upper - Convert all text to UPPERCASE.
-            lower - Convert all text to lowercase.
-            title - Convert Text To Title Case.
+            "<lookup_file>" - Text/CSV or Excel file with the lookup table.
+            key_column      - Column of the loaded text holding the key.
+            key N           - Key column of the lookup file (default: 1).
+            fields          - Lookup columns to add, as in extract_column (default: all but the key).
+            inner           - Keep only lines whose key is found (default).
+            left            - Keep every line; missing keys get empty fields.
+            anti            - Keep only lines whose key is NOT found, unchanged.
+            replace         - Replace the key field with the looked-up fields instead of appending them.
+            delimiter       - Delimiter of the loaded text (default: ","); tab, space, pipe, semicolon.
+            sep             - Delimiter of the lookup file (default: the text delimiter).
+            header          - Both files start with a header line.
+            ignore_case     - Match keys case-insensitively.
+            raw             - Split the text on every delimiter, ignoring CSV quoting.
 
         Examples:
-            convert_case upper  - Converts all text to uppercase.
-            convert_case lower  - Converts all text to lowercase.
-            convert_case title  - Converts text to title case (first letter of each word capitalized).
+            join "teams.csv" 2                      - Append the team fields for the user ID in column 2.
+            join "teams.xlsx" 2 fields 2 replace    - Replace the user ID with the team name.
+            join "known.txt" 1 anti                 - Keep lines whose first field is not in known.txt.
+            join "users.tsv" 3 key 2 left tab       - Left join on column 3 against column 2 of a TSV.
 
         Notes:
-            - The conversion applies to all loaded lines.
-            - Title case capitalizes the first letter of each word.
-            - Original line structure is preserved.
+            - The lookup file is read once into a hash table; the text is then streamed once.
+            - Surrounding spaces are ignored in keys; the first lookup row of a key wins.
+            - Both files are parsed one row per line: delimiters longer than one character
+              and unbalanced quotes fall back to splitting on every delimiter.
         """
         help_text = (
-            f"{self.COLOR_HEADER}\nConvert the text to uppercase, lowercase, or title case.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_HEADER}\nEnrich delimited lines with fields from a lookup file.{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}convert_case <upper|lower|title>{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}join \"<lookup_file>\" <key_column> [key N] [fields <columns>] [inner|left|anti]{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}     [replace] [delimiter] [sep <lookup_delimiter>] [header] [ignore_case] [raw]{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Arguments:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}upper{self.COLOR_RESET} - Convert all text to UPPERCASE.\n"
-            f"  {self.COLOR_EXAMPLE}lower{self.COLOR_RESET} - Convert all text to lowercase.\n"
-            f"  {self.COLOR_EXAMPLE}title{self.COLOR_RESET} - Convert Text To Title Case.\n\n"
+            f"  {self.COLOR_EXAMPLE}key_column{self.COLOR_RESET}  - Column of the loaded text holding the key\n"
+            f"  {self.COLOR_EXAMPLE}key N{self.COLOR_RESET}       - Key column of the lookup file (default: 1)\n"
+            f"  {self.COLOR_EXAMPLE}fields{self.COLOR_RESET}      - Lookup columns to add (default: all but the key)\n"
+            f"  {self.COLOR_EXAMPLE}inner{self.COLOR_RESET}       - Keep only lines whose key is found (default)\n"
+            f"  {self.COLOR_EXAMPLE}left{self.COLOR_RESET}        - Keep every line; missing keys get empty fields\n"
+            f"  {self.COLOR_EXAMPLE}anti{self.COLOR_RESET}        - Keep only lines whose key is NOT found\n"
+            f"  {self.COLOR_EXAMPLE}replace{self.COLOR_RESET}     - Replace the key field instead of appending\n"
+            f"  {self.COLOR_EXAMPLE}sep{self.COLOR_RESET}         - Delimiter of the lookup file (default: the text delimiter)\n"
+            f"  {self.COLOR_EXAMPLE}header{self.COLOR_RESET}      - Both files start with a header line\n"
+            f"  {self.COLOR_EXAMPLE}ignore_case{self.COLOR_RESET} - Match keys case-insensitively\n\n"
             f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}convert_case upper{self.COLOR_RESET}  - Converts all text to uppercase.\n"
-            f"  {self.COLOR_EXAMPLE}convert_case lower{self.COLOR_RESET}  - Converts all text to lowercase.\n"
-            f"  {self.COLOR_EXAMPLE}convert_case title{self.COLOR_RESET}  - Converts text to title case (first letter of each word capitalized).\n\n"
+            f"  {self.COLOR_EXAMPLE}join \"teams.csv\" 2{self.COLOR_RESET}                   - Append team fields for the ID in column 2\n"
+            f"  {self.COLOR_EXAMPLE}join \"teams.xlsx\" 2 fields 2 replace{self.COLOR_RESET} - Replace the ID with the team name\n"
+            f"  {self.COLOR_EXAMPLE}join \"known.txt\" 1 anti{self.COLOR_RESET}              - Lines whose key is not in known.txt\n"
+            f"  {self.COLOR_EXAMPLE}join \"users.tsv\" 3 key 2 left tab{self.COLOR_RESET}    - Left join against a TSV\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
-            f"  - The conversion applies to all loaded lines.\n"
-            f"  - Title case capitalizes the first letter of each word.\n"
-            f"  - Original line structure is preserved.\n"
+            f"  - The lookup file is read once into a hash table; the text is streamed once.\n"
+            f"  - Surrounding spaces are ignored in keys; the first lookup row of a key wins.\n"
+            f"  - Long delimiters and unbalanced quotes fall back to splitting on every delimiter.\n"
         )
         if arg.strip() == "?":
             self.poutput(help_text)
@@ -5015,25 +7058,970 @@ class TextTool(cmd2.Cmd):
         if not self.current_lines:
             self.poutput("Error: No file is loaded.")
             return
+        if hasattr(arg, 'args'):
+            arg = arg.args
 
-        self.previous_lines = self.current_lines.copy()
+        args = shlex.split(arg) if '"' in arg or "'" in arg else arg.strip().split()
+        if len(args) < 2 or not args[1].isdigit() or int(args[1]) < 1:
+            self.poutput("Error: Usage: join \"<lookup_file>\" <key_column> [options]. Type 'join ?' for help.")
+            return
+        file_path = args[0]
+        key_column = int(args[1])
+        lookup_key = 1
+        fields = None
+        mode = "inner"
+        replace = use_header = ignore_case = raw = False
+        delimiter = ","
+        separator = None
+        keywords = {"tab": "\t", "space": " ", "pipe": "|", "semicolon": ";"}
+        i = 2
+        while i < len(args):
+            token = args[i]
+            nxt = args[i + 1] if i + 1 < len(args) else None
+            if token == "key" and nxt is not None and nxt.isdigit() and int(nxt) > 0:
+                lookup_key = int(nxt)
+                i += 1
+            elif token == "fields" and nxt is not None:
+                try:
+                    fields = parse_column_spec(nxt)
+                except ValueError as e:
+                    self.poutput(f"Error: {e}")
+                    return
+                i += 1
+            elif token == "sep" and nxt is not None:
+                separator = keywords.get(nxt, nxt)
+                i += 1
+            elif token in ("inner", "left", "anti"):
+                mode = token
+            elif token == "replace":
+                replace = True
+            elif token == "header":
+                use_header = True
+            elif token == "ignore_case":
+                ignore_case = True
+            elif token == "raw":
+                raw = True
+            else:
+                delimiter = keywords.get(token, token)
+            i += 1
+
+        if not os.path.exists(file_path):
+            self.poutput(f"Error: File '{file_path}' does not exist.")
+            return
+        try:
+            lookup, lookup_header = read_lookup_table(file_path, lookup_key, fields,
+                                                      separator or delimiter, use_header, ignore_case)
+        except Exception as e:
+            self.poutput(f"Error reading lookup file: {e}")
+            return
+
+        if delimiter == " ":
+            table = self.parsed_table(delimiter, "words")
+        else:
+            table = self.parsed_table(delimiter, "raw" if raw else "csv")
+        width = len(fields) if fields is not None else max((len(v) for v in lookup.values()), default=0)
+        empty = ("",) * width
+        keys = table.column(key_column)
+
+        def joined(row, extra):
+            if replace:
+                return row[:key_column - 1] + list(extra) + row[key_column:]
+            return row + list(extra)
+
+        rows = []
+        matched = 0
+        first = True
+        for n in self.iter_progress(range(table.n_rows)):
+            length = table.row_lengths[n]
+            if not length:
+                if mode != "inner":
+                    rows.append([])
+                continue
+            row = [column[n] for column in table.columns[:length]]
+            if len(row) < key_column:
+                row += [""] * (key_column - len(row))
+            if use_header and first:
+                first = False
+                if mode != "anti":
+                    row = joined(row, lookup_header or empty)
+                rows.append(row)
+                continue
+            first = False
+            key = keys[n].strip()
+            extra = lookup.get(key.casefold() if ignore_case else key)
+            if extra is not None:
+                matched += 1
+                if mode != "anti":
+                    rows.append(joined(row, extra + empty[len(extra):]))
+            elif mode == "left":
+                rows.append(joined(row, empty))
+            elif mode == "anti":
+                rows.append(row)
+
+        self.previous_lines = self.current_lines.copy()
         self.previous_words = self.words.copy()
+        self.current_lines = table.format_rows(rows)
+        self.update_live_view()
+        try:
+            self.do_fill_words('')
+        except:
+            a=0
+        self.poutput(f"Join ({mode}) against {len(lookup):,} lookup keys: {matched:,} lines matched, "
+                     f"{len(self.current_lines):,} lines in the result.")
 
-        case_type = arg.strip().lower()
-        if case_type == "upper":
-            self.current_lines = [line.upper() for line in self.current_lines]
-            self.update_live_view()
-        elif case_type == "lower":
-            self.current_lines = [line.lower() for line in self.current_lines]
-            self.update_live_view()
-        elif case_type == "title":
-            self.current_lines = [line.title() for line in self.current_lines]
-            self.update_live_view()
+    def complete_join(self, text, line, begidx, endidx):
+        FRIENDS_T = ['key', 'fields', 'inner', 'left', 'anti', 'replace', 'sep', 'tab', 'space', 'pipe',
+                     'semicolon', 'header', 'ignore_case', 'raw', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
+    def line_transform(self, command, arg):
+        """Per-line function for a command that can run inside a pipeline.
+
+        The function takes one line and returns the new line, or None to drop
+        it, with the same result the command gives on its own. Raises
+        ValueError for commands that are not line-wise or for bad arguments.
+        """
+        if command == "trim_whitespace":
+            return lambda line: line.strip() + "\n"
+        if command == "remove_empty_lines":
+            return lambda line: line if line.strip() else None
+        if command == "convert_case":
+            case_type = arg.strip().lower()
+            if case_type not in ("upper", "lower", "title"):
+                raise ValueError("Invalid case type. Use 'upper', 'lower', or 'title'.")
+            return getattr(str, case_type)
+        if command == "replace":
+            string1, string2, case_sensitive = self._parse_replace_args(arg)
+            pattern, replacement = convert_placeholders(string1), convert_placeholders(string2)
+            if is_literal_pattern(pattern) and "\\" not in replacement:
+                return LiteralPattern(pattern, case_sensitive).substituter(replacement)
+            try:
+                regex = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+            except re.error:
+                # Same literal fallback as the replace command
+                return LiteralPattern(pattern, case_sensitive).substituter(replacement)
+            if "\\0" in string2:
+                replacement = lambda match: convert_placeholders(string2.replace("\\0", match.group(0)))
+            return lambda line: regex.sub(replacement, line)
+        if command in ("right_replace", "left_replace"):
+            string1, string2, case_sensitive = self._parse_side_replace_args(arg, command)
+            if not string1:
+                if command == "right_replace":
+                    return lambda line: line.rstrip("\n") + string2 + "\n"
+                return lambda line: string2 + line
+            needle = string1 if case_sensitive else string1.lower()
+
+            def replace_side(line):
+                idx = (line if case_sensitive else line.lower()).find(needle)
+                if idx == -1:
+                    return line
+                if command == "right_replace":
+                    return line[:idx] + string2 + "\n"
+                return string2 + line[idx + len(string1):]
+            return replace_side
+        raise ValueError(f"'{command}' can't run in a pipeline. Line-wise commands: {', '.join(PIPELINE_COMMANDS)}.")
+
+    def add_pipeline_step(self, text):
+        """Check one command of an open begin … end block and queue it."""
+        command, _, arg = text.partition(" ")
+        try:
+            self.line_transform(command, arg.strip())
+        except ValueError as e:
+            self.poutput(f"Error: {e} The command was not added.")
+            return
+        self.pipeline_block.append((command, arg.strip()))
+
+    def apply_line_transforms(self, lines, transforms):
+        """Apply per-line transforms to lines in one pass; a transform returning None drops the line."""
+        if not transforms:
+            return lines
+        new_lines = []
+        for line in self.iter_progress(lines):
+            for transform in transforms:
+                line = transform(line)
+                if line is None:
+                    break
+            else:
+                new_lines.append(line)
+        return new_lines
+
+    def run_pipeline(self, steps):
+        """Run (command, arg) steps over the text in one pass, with one undo snapshot and one refresh."""
+        try:
+            transforms = [self.line_transform(command, arg) for command, arg in steps]
+        except ValueError as e:
+            self.poutput(f"Error: {e}")
+            return
+
+        try:
+            new_lines = self.apply_line_transforms(self.current_lines, transforms)
+        except re.error as e:
+            self.poutput(f"Error: Invalid regex pattern or replacement string. Details: {e}")
+            return
+
+        self.previous_lines = self.current_lines.copy()
+        self.previous_words = self.words.copy()
+        lines_in = len(self.current_lines)
+        self.current_lines = new_lines
+        self._transform_repeat_tail(transforms)
+        self.update_live_view()
+        try:
+            self.do_fill_words('')
+        except:
+            a=0
+        self.poutput(f"Pipeline ran {len(steps)} command(s) in one pass: {lines_in} lines in, {len(new_lines)} lines out.")
+
+    def do_pipeline(self, arg):
+        """Run several line-wise commands in a single pass over the text.
+
+        Usage:
+            pipeline <command> [&& <command> ...]
+
+        Description:
+            The commands are separated by "&&" and applied one after the other
+            to every line, in one pass, with one revert point and one Live View
+            refresh. A block typed between 'begin' and 'end' runs the same way.
+
+        Commands:
+            trim_whitespace, convert_case, replace, right_replace, left_replace, remove_empty_lines
+
+        Examples:
+            pipeline trim_whitespace && convert_case lower && remove_empty_lines
+            pipeline replace "foo" "bar" && right_replace "#" ""
+
+            begin
+            trim_whitespace
+            replace "\\s+" " "
+            remove_empty_lines
+            end
+
+        Notes:
+            - Each command gives the same result it gives on its own.
+            - 'end discard' closes a begin block without running it.
+            - revert undoes the whole pipeline at once.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}\nRun several line-wise commands in a single pass over the text.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}pipeline <command> [&& <command> ...]{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}begin{self.COLOR_RESET}  ...one command per line...  {self.COLOR_EXAMPLE}end{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Commands:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}{', '.join(PIPELINE_COMMANDS)}{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}pipeline trim_whitespace && convert_case lower && remove_empty_lines{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}pipeline replace \"foo\" \"bar\" && right_replace \"#\" \"\"{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  - All commands run in one pass, with one revert point and one Live View refresh.\n"
+            f"  - Each command gives the same result it gives on its own.\n"
+            f"  - {self.COLOR_EXAMPLE}end discard{self.COLOR_RESET} closes a begin block without running it.\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if not self.current_lines:
+            self.poutput("Error: No file is loaded.")
+            return
+        if hasattr(arg, 'args'):
+            arg = arg.args
+
+        steps = []
+        for text in arg.split("&&"):
+            command, _, rest = text.strip().partition(" ")
+            if command:
+                steps.append((command, rest.strip()))
+        if not steps:
+            self.poutput("Error: No commands given. Usage: pipeline <command> [&& <command> ...]")
+            return
+        self.run_pipeline(steps)
+
+    def complete_pipeline(self, text, line, begidx, endidx):
+        FRIENDS_T = list(PIPELINE_COMMANDS) + ['case_sensitive', 'upper', 'lower', 'title', '&&', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
+    def do_begin(self, arg):
+        """Start a pipeline block: the following commands are collected until 'end' and run in one pass.
+
+        Usage:
+            begin
+        """
+        if arg.strip() == "?":
+            self.do_pipeline("?")
+            return
+        if self.pipeline_block is not None:
+            self.poutput("Error: A pipeline block is already open. Type 'end' to run it.")
+            return
+        self.pipeline_block = []
+        self.pipeline_saved_prompt = self.prompt
+        self.prompt = "pipeline> "
+        self.poutput("Pipeline block started. Enter line-wise commands, then 'end' to run them ('end discard' to drop).")
+
+    def do_end(self, arg):
+        """Close the open pipeline block and run it ('end discard' drops it).
+
+        Usage:
+            end [discard]
+        """
+        if self.pipeline_block is None:
+            self.poutput("Error: No pipeline block is open. Start one with 'begin'.")
+            return
+        steps = self.pipeline_block
+        self.pipeline_block = None
+        self.prompt = self.pipeline_saved_prompt
+        if arg.strip() == "discard":
+            self.poutput(f"Pipeline block discarded ({len(steps)} command(s)).")
+            return
+        if not steps:
+            self.poutput("Pipeline block was empty, nothing to run.")
+            return
+        if not self.current_lines:
+            self.poutput("Error: No file is loaded.")
+            return
+        self.run_pipeline(steps)
+
+    def _literal_replace(self, arg):
+        """(pattern, replacement, case_sensitive) of a replace that substitutes plain text, else None."""
+        string1, string2, case_sensitive = self._parse_replace_args(arg)
+        if not string1 or REGEX_METACHARACTERS.intersection(string1) or "\\" in string2 or "[" in string2:
+            return None
+        if not case_sensitive and not (string1.isascii() and string2.isascii()):
+            return None
+        return string1, string2, case_sensitive
+
+    def optimize_plan(self, steps):
+        """Rewrite lazy (command, arg) steps into a cheaper list with the same result.
+
+        - trim_whitespace and remove_empty_lines repeated with only case changes
+          in between, or convert_case upper/lower repeated back to back, are dropped;
+        - remove_empty_lines moves ahead of trim_whitespace and convert_case,
+          which never make a blank line non-blank or the reverse, so those
+          transforms skip the lines it drops;
+        - adjacent plain-text replaces with the same case setting become one
+          "replace_literals" step, one alternation pass, when no pattern can
+          overlap an earlier pattern or replacement.
+        select keeps its place, since unselect needs the full text at that point.
+        """
+        plan = []
+        for command, arg in steps:
+            if command == "convert_case":
+                arg = arg.strip().lower()
+            if command == "convert_case" and arg != "title" and plan and plan[-1] == (command, arg):
+                continue
+            if command in ("trim_whitespace", "remove_empty_lines"):
+                # Case changes never add or remove whitespace, so they don't undo these steps
+                pos = len(plan)
+                while pos and plan[pos - 1][0] == "convert_case":
+                    pos -= 1
+                if pos and plan[pos - 1] == (command, arg):
+                    continue
+            if command == "remove_empty_lines":
+                pos = len(plan)
+                while pos and plan[pos - 1][0] in ("trim_whitespace", "convert_case"):
+                    pos -= 1
+                if pos and plan[pos - 1][0] == "remove_empty_lines":
+                    continue
+                plan.insert(pos, (command, arg))
+                continue
+            literal = self._literal_replace(arg) if command == "replace" else None
+            if literal:
+                pattern, replacement, case_sensitive = literal
+                fold = (lambda text: text) if case_sensitive else str.lower
+                if plan and plan[-1][0] == "replace_literals" and plan[-1][1][1] == case_sensitive:
+                    pairs = plan[-1][1][0]
+                    if not any(literals_overlap(fold(pattern), fold(other)) or literals_overlap(fold(pattern), fold(inserted))
+                               for other, inserted, _ in pairs):
+                        plan[-1] = ("replace_literals", (pairs + [(pattern, replacement, arg)], case_sensitive))
+                        continue
+                plan.append(("replace_literals", ([(pattern, replacement, arg)], case_sensitive)))
+                continue
+            plan.append((command, arg))
+        # A literal replace that found nothing to merge with stays a plain replace
+        return [("replace", step[1][0][0][2]) if step[0] == "replace_literals" and len(step[1][0]) == 1 else step
+                for step in plan]
+
+    def plan_step_transform(self, step):
+        """Per-line function for an optimized plan step."""
+        command, arg = step
+        if command != "replace_literals":
+            return self.line_transform(command, arg)
+        pairs, case_sensitive = arg
+        regex = re.compile("|".join(f"({re.escape(pattern)})" for pattern, _, _ in pairs),
+                           0 if case_sensitive else re.IGNORECASE)
+        replacements = [replacement for _, replacement, _ in pairs]
+        return lambda line: regex.sub(lambda match: replacements[match.lastindex - 1], line)
+
+    def _select_commutes(self, search_terms, case_sensitive, step):
+        """True if running step before a select cannot change which lines the select keeps."""
+        if any(not term or REGEX_METACHARACTERS.intersection(term) for term in search_terms):
+            return False
+        command, arg = step
+        if command == "trim_whitespace":
+            return not any(char.isspace() for term in search_terms for char in term)
+        if command == "replace":
+            literal = self._literal_replace(arg)
+            if not literal:
+                return False
+            pairs, replace_case_sensitive = [literal[:2] + (arg,)], literal[2]
+        elif command == "replace_literals":
+            pairs, replace_case_sensitive = arg
+        else:
+            return False
+        if case_sensitive and replace_case_sensitive:
+            fold = lambda text: text
+        elif all(term.isascii() for term in search_terms):
+            fold = str.lower
+        else:
+            return False
+        return not any(literals_overlap(fold(term), fold(pattern)) or literals_overlap(fold(term), fold(replacement))
+                       for term in search_terms for pattern, replacement, _ in pairs)
+
+    def add_lazy_step(self, command, arg):
+        """Check a line-wise command and add it to the lazy plan instead of running it."""
+        try:
+            if command == "select":
+                self._parse_select_args(arg)
+            else:
+                self.line_transform(command, arg)
+        except (ValueError, re.error) as e:
+            self.poutput(f"Error: {e} The command was not added to the lazy plan.")
+            return
+        self.lazy_plan.append((command, arg))
+        if self.liveview_box:
+            # An open Live View needs concrete lines after every command
+            self.materialize_plan()
+        else:
+            self.poutput(f"Planned: {command} {arg}".rstrip() + f" ({len(self.lazy_plan)} pending).")
+
+    def materialize_plan(self):
+        """Run the pending lazy plan so current_lines holds concrete text again.
+
+        Runs of line-wise steps between selects are fused into one pass each.
+        A select whose patterns the steps before it cannot affect is matched on
+        the text as it was (with the trigram index when it is on) before those
+        steps run. The end state, unselect included, is the one the commands
+        would have left one by one; revert goes back to before the whole plan.
+        """
+        steps = self.lazy_plan
+        if not steps:
+            return
+        plan = self.optimize_plan(steps)
+        if self.repeat_tail and any(step[0] == "select" for step in plan):
+            self.materialize_repeat()
+        lines = self.current_lines
+        pending = []
+        selection = None
+        passes = 0
+        try:
+            for step in plan:
+                if step[0] != "select":
+                    pending.append(step)
+                    continue
+                if not lines:
+                    break  # like the commands themselves, nothing runs once no lines are left
+                search_terms, regexes, negate, case_sensitive = self._parse_select_args(step[1])
+                transforms = [self.plan_step_transform(s) for s in pending]
+                if lines is self.current_lines and all(self._select_commutes(search_terms, case_sensitive, s) for s in pending):
+                    matches = self.matching_indices(regexes)
+                    lines = self.apply_line_transforms(lines, transforms)
+                else:
+                    lines = self.apply_line_transforms(lines, transforms)
+                    matches = [i for i, line in enumerate(self.iter_progress(lines))
+                               if any(regex.search(line) for regex in regexes)]
+                passes += 1
+                if negate:
+                    matched = set(matches)
+                    matches = [i for i in range(len(lines)) if i not in matched]
+                selection = (lines, matches)
+                lines = [lines[i] for i in matches]
+                pending = []
+            if pending:
+                lines = self.apply_line_transforms(lines, [self.plan_step_transform(s) for s in pending])
+                passes += 1
+        except (ValueError, re.error) as e:
+            self.lazy_plan = []
+            self.poutput(f"Error: the lazy plan failed and its {len(steps)} command(s) were dropped. Details: {e}")
+            return
+
+        if self.repeat_tail:
+            # No select in the plan: every copy of the block changes the same way
+            self._transform_repeat_tail([self.plan_step_transform(step) for step in plan])
+        self.previous_lines = self.current_lines.copy()
+        self.previous_words = self.words.copy()
+        if selection:
+            self.original_full_text = list(selection[0])
+            self.selected_indices = selection[1]
+            self.filter_status = 'select'
+        self.current_lines = lines
+        self.lazy_plan = []
+        self.update_live_view()
+        try:
+            self.do_fill_words('')
+        except:
+            a=0
+        self.poutput(f"Lazy plan: ran {len(steps)} command(s) in {passes} pass(es).")
+
+    def repeat_tail_lines(self):
+        """Number of lines held virtually in the clone repeat."""
+        if not self.repeat_tail:
+            return 0
+        block, copies = self.repeat_tail
+        return len(block) * copies
+
+    def materialize_repeat(self):
+        """Turn a virtual clone repeat into real lines, in current_lines and in previous_lines."""
+        if self.repeat_tail:
+            block, copies = self.repeat_tail
+            self.current_lines = self.current_lines + block * copies
+            self.repeat_tail = None
+        if self.previous_repeat_tail:
+            block, copies = self.previous_repeat_tail
+            self.previous_lines = self.previous_lines + block * copies
+            self.previous_repeat_tail = None
+
+    def _transform_repeat_tail(self, transforms):
+        """Apply per-line transforms to the repeated block once, keeping the old repeat for revert."""
+        if not self.repeat_tail:
+            return
+        block, copies = self.repeat_tail
+        self.previous_repeat_tail = self.repeat_tail
+        block = self.apply_line_transforms(block, transforms)
+        self.repeat_tail = (block, copies) if block else None
+
+    def do_lazy(self, arg):
+        """Collect line-wise commands into a plan and run them only when the text is needed.
+
+        Usage:
+            lazy on       - Start collecting commands
+            lazy off      - Run the pending plan and go back to running commands at once
+            lazy status   - Show the pending commands and the optimized plan
+            lazy run      - Run the pending plan now and keep collecting
+
+        Description:
+            While lazy mode is on, trim_whitespace, convert_case, replace,
+            right_replace, left_replace, remove_empty_lines and select are
+            checked and added to a plan instead of running. Any other command
+            (show, save, count, diff, liveview, ...) first runs the plan.
+
+        Notes:
+            - The plan is optimized: repeated idempotent steps are dropped,
+              remove_empty_lines runs before case and whitespace changes, and
+              adjacent plain-text replaces are merged into one pass.
+            - Steps between selects run fused, in one pass over the lines.
+            - With the Live View open, the plan runs after every command.
+            - revert undoes the whole plan at once.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}\nCollect line-wise commands into a plan and run them only when the text is needed.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}lazy on{self.COLOR_RESET}      - Start collecting commands\n"
+            f"  {self.COLOR_EXAMPLE}lazy off{self.COLOR_RESET}     - Run the pending plan and stop collecting\n"
+            f"  {self.COLOR_EXAMPLE}lazy status{self.COLOR_RESET}  - Show the pending commands and the optimized plan\n"
+            f"  {self.COLOR_EXAMPLE}lazy run{self.COLOR_RESET}     - Run the pending plan now\n\n"
+            f"{self.COLOR_COMMAND}Planned Commands:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}{', '.join(LAZY_COMMANDS)}{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  - Any other command (show, save, count, diff, liveview, ...) runs the plan first.\n"
+            f"  - Repeated idempotent steps are dropped, remove_empty_lines runs early and\n"
+            f"    adjacent plain-text replaces are merged into one pass.\n"
+            f"  - With the Live View open, the plan runs after every command.\n"
+            f"  - {self.COLOR_EXAMPLE}revert{self.COLOR_RESET} undoes the whole plan at once.\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if hasattr(arg, 'args'):
+            arg = arg.args
+
+        option = arg.strip().lower()
+        if option == "on":
+            if self.lazy_plan is None:
+                self.lazy_plan = []
+            self.poutput("Lazy mode on: line-wise commands are planned until the text is needed.")
+        elif option == "off":
+            self.materialize_plan()
+            self.lazy_plan = None
+            self.poutput("Lazy mode off.")
+        elif option == "run":
+            if self.lazy_plan:
+                self.materialize_plan()
+            else:
+                self.poutput("Nothing to run, the lazy plan is empty.")
+        elif option in ("", "status"):
+            if self.lazy_plan is None:
+                self.poutput("Lazy mode is off.")
+                return
+            if not self.lazy_plan:
+                self.poutput("Lazy mode is on, the plan is empty.")
+                return
+            self.poutput(f"Pending commands ({len(self.lazy_plan)}):")
+            for command, step_arg in self.lazy_plan:
+                self.poutput(f"  {command} {step_arg}".rstrip())
+            self.poutput("Optimized plan:")
+            for command, step_arg in self.optimize_plan(self.lazy_plan):
+                if command == "replace_literals":
+                    pairs = ", ".join(f"'{pattern}' -> '{replacement}'" for pattern, replacement, _ in step_arg[0])
+                    step_arg = f"{pairs} ({'case sensitive' if step_arg[1] else 'case insensitive'})"
+                self.poutput(f"  {command} {step_arg}".rstrip())
         else:
+            self.poutput("Error: Use 'lazy on', 'lazy off', 'lazy status' or 'lazy run'.")
+
+    def complete_lazy(self, text, line, begidx, endidx):
+        FRIENDS_T = ['on', 'off', 'status', 'run', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
+    def do_profile(self, arg):
+        """Measure the time, memory and text size of every command.
+
+        Usage:
+            profile on      - Start measuring; a one-line summary follows each command
+            profile off     - Stop measuring (the session table is kept)
+            profile report  - Show the table of the commands measured this session
+            profile clear   - Empty the session table
+
+        Description:
+            For each command the summary gives the wall and CPU time, the part
+            of it spent syncing and refreshing the Live View, the lines and
+            characters before and after, and the peak memory the command
+            allocated above what was in use when it started (tracemalloc).
+
+        Notes:
+            - tracemalloc traces every allocation, so commands run slower while
+              profiling is on; compare timings taken in the same mode.
+            - Characters are counted as str lengths, clone repeats included.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}\nMeasure the time, memory and text size of every command.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}profile on{self.COLOR_RESET}      - Start measuring, with a summary after each command\n"
+            f"  {self.COLOR_EXAMPLE}profile off{self.COLOR_RESET}     - Stop measuring (the session table is kept)\n"
+            f"  {self.COLOR_EXAMPLE}profile report{self.COLOR_RESET}  - Show the commands measured this session\n"
+            f"  {self.COLOR_EXAMPLE}profile clear{self.COLOR_RESET}   - Empty the session table\n\n"
+            f"{self.COLOR_COMMAND}Measured:{self.COLOR_RESET}\n"
+            f"  - Wall and CPU time, split into the command itself and Live View sync/refresh\n"
+            f"  - Lines and characters before and after the command\n"
+            f"  - Peak memory allocated by the command (tracemalloc)\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  - tracemalloc slows commands down while profiling is on.\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if hasattr(arg, 'args'):
+            arg = arg.args
+
+        import tracemalloc
+        option = arg.strip().lower()
+        if option == "on":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.profile_started_tracing = True
+            self.profile_enabled = True
+            self.poutput("Profiling on: each command is followed by its measurements.")
+        elif option == "off":
+            if self.profile_started_tracing:
+                tracemalloc.stop()
+                self.profile_started_tracing = False
+            self.profile_enabled = False
+            self.poutput(f"Profiling off. {len(self.profile_records)} command(s) in the session table.")
+        elif option == "clear":
+            self.profile_records = []
+            self.poutput("Profile session table cleared.")
+        elif option in ("", "report", "status"):
+            if not self.profile_records:
+                state = "on" if self.profile_enabled else "off"
+                self.poutput(f"Profiling is {state}, no command measured yet.")
+                return
+            self.poutput(f"{'#':>4} {'Command':<30} {'Wall s':>8} {'CPU s':>8} {'Cmd s':>8} {'View s':>8} "
+                         f"{'Lines in':>11} {'Lines out':>11} {'Chars in':>13} {'Chars out':>13} {'Peak MB':>8}")
+            for n, record in enumerate(self.profile_records, 1):
+                label = record['command'] if len(record['command']) <= 30 else record['command'][:27] + "..."
+                self.poutput(f"{n:>4} {label:<30} {record['wall']:>8.3f} {record['cpu']:>8.3f} {record['body']:>8.3f} "
+                             f"{record['liveview']:>8.3f} {record['lines_in']:>11,} {record['lines_out']:>11,} "
+                             f"{record['chars_in']:>13,} {record['chars_out']:>13,} {record['peak'] / 1048576:>8.1f}")
+            totals = {key: sum(record[key] for record in self.profile_records) for key in ('wall', 'cpu', 'body', 'liveview')}
+            peak = max(record['peak'] for record in self.profile_records)
+            self.poutput(f"{'':>4} {'Total (peak: max)':<30} {totals['wall']:>8.3f} {totals['cpu']:>8.3f} {totals['body']:>8.3f} "
+                         f"{totals['liveview']:>8.3f} {'':>11} {'':>11} {'':>13} {'':>13} {peak / 1048576:>8.1f}")
+        else:
+            self.poutput("Error: Use 'profile on', 'profile off', 'profile report' or 'profile clear'.")
+
+    def complete_profile(self, text, line, begidx, endidx):
+        FRIENDS_T = ['on', 'off', 'report', 'clear', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
+    def do_profile_cmd(self, arg):
+        """Run one command under cProfile to see which functions its time goes to.
+
+        Usage:
+            profile_cmd [--top N] [--prof <file>] [--collapsed <file>] <command ...>
+
+        Options:
+            --top N             - Number of functions listed, by cumulative time (default 20).
+            --prof <file>       - Where to save the cProfile data (default profile_<command>_<time>.prof).
+            --collapsed <file>  - Also write collapsed stacks for flamegraph tools.
+
+        Examples:
+            profile_cmd bulk_replace map.txt
+                - Profile a bulk replacement and list the 20 most expensive functions.
+
+            profile_cmd --top 40 --collapsed stacks.txt indented_remove "def "
+                - List 40 functions and write stacks for flamegraph.pl, inferno or speedscope.
+
+        Notes:
+            - The command runs normally: its output and its changes are kept.
+            - The .prof file opens with python -m pstats, snakeviz or similar viewers.
+            - cProfile records caller -> callee totals, so collapsed stacks of
+              functions called from several places are an estimate.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}\nRun one command under cProfile to see which functions its time goes to.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}profile_cmd [--top N] [--prof <file>] [--collapsed <file>] <command ...>{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Options:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}--top N{self.COLOR_RESET}             - Functions listed, by cumulative time (default 20)\n"
+            f"  {self.COLOR_EXAMPLE}--prof <file>{self.COLOR_RESET}       - cProfile data file (default profile_<command>_<time>.prof)\n"
+            f"  {self.COLOR_EXAMPLE}--collapsed <file>{self.COLOR_RESET}  - Also write collapsed stacks for flamegraph tools\n\n"
+            f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}profile_cmd bulk_replace map.txt{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}profile_cmd --top 40 --collapsed stacks.txt indented_remove \"def \"{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  - The command runs normally: its output and its changes are kept.\n"
+            f"  - Open the .prof file with python -m pstats or snakeviz.\n"
+            f"  - Collapsed stacks of functions called from several places are an estimate.\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if hasattr(arg, 'args'):
+            arg = arg.args
+
+        import cProfile, pstats, io, time
+        top, prof_path, collapsed_path = 20, None, None
+        rest = arg.strip()
+        while rest.startswith("--"):
+            option, _, rest = rest.partition(" ")
+            value, _, rest = rest.strip().partition(" ")
+            rest = rest.strip()
+            if option == "--top" and value.isdigit():
+                top = int(value)
+            elif option == "--prof" and value:
+                prof_path = _unquote(value)
+            elif option == "--collapsed" and value:
+                collapsed_path = _unquote(value)
+            else:
+                self.poutput(f"Error: Invalid option '{option} {value}'. Use --top N, --prof <file> or --collapsed <file>.")
+                return
+        command = rest.split()[0] if rest else ""
+        if not command or command == "profile_cmd":
+            self.poutput("Error: Missing command. Usage: profile_cmd [--top N] [--prof <file>] [--collapsed <file>] <command ...>")
+            return
+        if prof_path is None:
+            prof_path = f"profile_{command}_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:  # another profiler or debugger is already attached
+            self.poutput(f"Error: cProfile could not start: {e}")
+            return
+        try:
+            self.onecmd(rest)
+        finally:
+            profiler.disable()
+
+        try:
+            profiler.dump_stats(prof_path)
+            stats = pstats.Stats(profiler)
+            if collapsed_path:
+                with open(collapsed_path, "w", encoding="utf-8") as f:
+                    for stack in collapsed_stacks(stats.stats):
+                        f.write(stack + "\n")
+        except OSError as e:
+            self.poutput(f"Error: Could not write the profile: {e}")
+            return
+        report = io.StringIO()
+        stats.stream = report
+        stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+        self.poutput(report.getvalue().strip("\n"))
+        self.poutput(f"Profile of '{rest}' saved to '{prof_path}'.")
+        if collapsed_path:
+            self.poutput(f"Collapsed stacks saved to '{collapsed_path}' (flamegraph.pl, inferno or speedscope).")
+
+    def complete_profile_cmd(self, text, line, begidx, endidx):
+        FRIENDS_T = ['--top', '--prof', '--collapsed', '?'] + self.get_all_commands()
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
+    def do_metrics(self, arg):
+        """Record one JSON line per executed command, for tracking performance over time.
+
+        Usage:
+            metrics on [file]       - Append a line per command to file (default text_tool_metrics.jsonl)
+            metrics off             - Stop recording
+            metrics status          - Show whether metrics are recorded and where
+            metrics summary [file]  - p50/p95 durations per command from the file
+
+        Recorded fields:
+            time, session, command, arg_hash (SHA-1 of the arguments, so the
+            text itself is not logged), duration in seconds, lines_before,
+            lines_after, chars_before, chars_after, cache_hits (parsed table,
+            indent outline and trigram index reuses during the command) and
+            peak_rss (peak resident memory of the process in bytes, null where
+            the platform does not report it).
+
+            TextTool keeps no compiled-pattern cache of its own (patterns go
+            through the re module's internal cache, which reports no hits), so
+            cache_hits counts the caches it does keep instead.
+
+        Notes:
+            - The file is appended to, so several sessions and batch runs can
+              share it; the session field tells them apart.
+            - Commands planned in lazy mode or collected in a begin … end block
+              are recorded when they run, under the command that runs them.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}\nRecord one JSON line per executed command, for tracking performance over time.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}metrics on [file]{self.COLOR_RESET}       - Append a line per command (default text_tool_metrics.jsonl)\n"
+            f"  {self.COLOR_EXAMPLE}metrics off{self.COLOR_RESET}             - Stop recording\n"
+            f"  {self.COLOR_EXAMPLE}metrics status{self.COLOR_RESET}          - Show whether metrics are recorded and where\n"
+            f"  {self.COLOR_EXAMPLE}metrics summary [file]{self.COLOR_RESET}  - p50/p95 durations per command\n\n"
+            f"{self.COLOR_COMMAND}Recorded Fields:{self.COLOR_RESET}\n"
+            f"  time, session, command, arg_hash, duration, lines_before/after,\n"
+            f"  chars_before/after, cache_hits, peak_rss\n"
+            f"  cache_hits counts parsed table, indent outline and trigram index reuses;\n"
+            f"  regex patterns use the re module's own cache, which reports no hits.\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  - Arguments are stored as a hash, never as text.\n"
+            f"  - The file is appended to; the session field separates runs.\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if hasattr(arg, 'args'):
+            arg = arg.args
+
+        import json, time
+        option, _, path = arg.strip().partition(" ")
+        option, path = option.lower(), _unquote(path.strip()) if path.strip() else ""
+        if option == "on":
+            self.metrics_path = path or "text_tool_metrics.jsonl"
+            if self.metrics_session is None:
+                self.metrics_session = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+            self.poutput(f"Metrics on: one JSON line per command is appended to '{self.metrics_path}'.")
+        elif option == "off":
+            self.metrics_path = None
+            self.poutput("Metrics off.")
+        elif option in ("", "status"):
+            if self.metrics_path:
+                self.poutput(f"Metrics are recorded to '{self.metrics_path}' (session {self.metrics_session}).")
+            else:
+                self.poutput("Metrics are off.")
+        elif option == "summary":
+            path = path or self.metrics_path or "text_tool_metrics.jsonl"
+            durations = {}
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                            durations.setdefault(record['command'], []).append(float(record['duration']))
+                        except (ValueError, KeyError, TypeError):
+                            continue  # skip damaged or foreign lines
+            except OSError as e:
+                self.poutput(f"Error: Could not read '{path}': {e}")
+                return
+            if not durations:
+                self.poutput(f"No command metrics in '{path}'.")
+                return
+            width = max(len("Command"), max(len(command) for command in durations))
+            self.poutput(f"{'Command':<{width}} {'Runs':>7} {'p50 s':>10} {'p95 s':>10} {'Max s':>10} {'Total s':>10}")
+            for command, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+                self.poutput(f"{command:<{width}} {len(values):>7,} {percentile(values, 50):>10.4f} "
+                             f"{percentile(values, 95):>10.4f} {max(values):>10.4f} {sum(values):>10.3f}")
+        else:
+            self.poutput("Error: Use 'metrics on [file]', 'metrics off', 'metrics status' or 'metrics summary [file]'.")
+
+    def complete_metrics(self, text, line, begidx, endidx):
+        FRIENDS_T = ['on', 'off', 'status', 'summary', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
+    def do_convert_case(self, arg):
+        """Convert the text to uppercase, lowercase, or title case.
+
+        Usage:
+            convert_case <upper|lower|title>
+
+        Arguments:
+            upper - Convert all text to UPPERCASE.
+            lower - Convert all text to lowercase.
+            title - Convert Text To Title Case.
+
+        Examples:
+            convert_case upper  - Converts all text to uppercase.
+            convert_case lower  - Converts all text to lowercase.
+            convert_case title  - Converts text to title case (first letter of each word capitalized).
+
+        Notes:
+            - The conversion applies to all loaded lines.
+            - Title case capitalizes the first letter of each word.
+            - Original line structure is preserved.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}\nConvert the text to uppercase, lowercase, or title case.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}convert_case <upper|lower|title>{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Arguments:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}upper{self.COLOR_RESET} - Convert all text to UPPERCASE.\n"
+            f"  {self.COLOR_EXAMPLE}lower{self.COLOR_RESET} - Convert all text to lowercase.\n"
+            f"  {self.COLOR_EXAMPLE}title{self.COLOR_RESET} - Convert Text To Title Case.\n\n"
+            f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}convert_case upper{self.COLOR_RESET}  - Converts all text to uppercase.\n"
+            f"  {self.COLOR_EXAMPLE}convert_case lower{self.COLOR_RESET}  - Converts all text to lowercase.\n"
+            f"  {self.COLOR_EXAMPLE}convert_case title{self.COLOR_RESET}  - Converts text to title case (first letter of each word capitalized).\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  - The conversion applies to all loaded lines.\n"
+            f"  - Title case capitalizes the first letter of each word.\n"
+            f"  - Original line structure is preserved.\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if not self.current_lines:
+            self.poutput("Error: No file is loaded.")
+            return
+
+        self.previous_words = self.words.copy()
+
+        case_type = arg.strip().lower()
+        if case_type not in ("upper", "lower", "title"):
             self.poutput("Error: Invalid case type. Use 'upper', 'lower', or 'title'.")
             return
+        changed = self.apply_line_changes(self.line_changes(getattr(str, case_type)))
 
-        self.poutput(f"Text converted to {case_type} case successfully.")
+        self.poutput(f"Text converted to {case_type} case successfully: {changed} line(s) changed.")
 
 
     def do_trim_whitespace(self, arg):
@@ -5073,7 +8061,7 @@ class TextTool(cmd2.Cmd):
         self.previous_lines = self.current_lines.copy()
         self.previous_words = self.words.copy()
 
-        self.current_lines = [line.strip() + "\n" for line in self.current_lines]
+        self.current_lines = [line.strip() + "\n" for line in self.iter_progress(self.current_lines)]
         self.update_live_view()
         self.poutput("Whitespace trimmed successfully.")
 
@@ -5113,7 +8101,7 @@ class TextTool(cmd2.Cmd):
         self.previous_lines = self.current_lines.copy()
         self.previous_words = self.words.copy()
 
-        self.current_lines.reverse()
+        self.current_lines = self.current_lines[::-1]
         self.update_live_view()
         self.poutput("Lines reversed successfully.")
 
@@ -5238,11 +8226,29 @@ class TextTool(cmd2.Cmd):
         """Sort the lines in the current text.
 
         Usage:
-            sort  - Sorts the lines in the current text
+            sort [numeric|natural] [column N ["delimiter"]] [regex "pattern" [group]]
+                 [reverse] [ignore_case] [stable] [external [memory_mb]]
+                 [parallel [workers]] [benchmark]
+
+        Options:
+            numeric      - Compare the first number found in the key (lines without one go last)
+            natural      - Compare text and digit runs separately, so v2 sorts before v10
+            column N     - Use column N (1-based) as key, split on delimiter (default: whitespace;
+                           "tab" and "space" are accepted)
+            regex        - Use capture group `group` (default 0, the whole match) of pattern as key
+            reverse      - Sort in descending order
+            ignore_case  - Case-folded comparison
+            stable       - Accepted for clarity; sorting is always stable
+            external     - Force the external merge sort, with an optional memory budget in MB
+            parallel     - Sort chunks in a pool of worker processes (default: one per CPU)
+                           and merge them
+            benchmark    - Time the sort with 1, 2, 4 and 8 workers without changing the text
 
         Notes:
-            - This command sorts the lines in ascending order
-            - The sorting is case-sensitive
+            - Without options, lines are sorted in ascending, case-sensitive order
+            - Keys are computed once per line, not once per comparison
+            - Buffers estimated above the memory budget (default 512 MB) are sorted
+              in runs spilled to temporary files and merged with a k-way merge
             - Empty lines are included in the sort
             - Useful for organizing data or finding duplicates
         """
@@ -5250,9 +8256,31 @@ class TextTool(cmd2.Cmd):
             f"{self.COLOR_HEADER}Sort - Organize Lines Alphabetically{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Description:{self.COLOR_RESET}\n"
             f"  Sort all lines in the current text in ascending alphabetical order.\n"
-            f"  Case-sensitive sorting with all lines included in the operation.\n\n"
+            f"  Case-sensitive sorting with all lines included in the operation.\n"
+            f"  Options select a sort key, the comparison and the direction.\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}sort{self.COLOR_RESET}  - Sort all lines alphabetically\n\n"
+            f"  {self.COLOR_EXAMPLE}sort{self.COLOR_RESET}  - Sort all lines alphabetically\n"
+            f"  {self.COLOR_EXAMPLE}sort [numeric|natural] [column N [\"delimiter\"]] [regex \"pattern\" [group]]{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}     [reverse] [ignore_case] [stable] [external [memory_mb]]{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}     [parallel [workers]] [benchmark]{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Options:{self.COLOR_RESET}\n"
+            f"  • {self.COLOR_EXAMPLE}numeric{self.COLOR_RESET}     - Compare the first number in the key, lines without one go last\n"
+            f"  • {self.COLOR_EXAMPLE}natural{self.COLOR_RESET}     - Version-like order: v2 before v10\n"
+            f"  • {self.COLOR_EXAMPLE}column N{self.COLOR_RESET}    - Key is column N, split on delimiter (default whitespace, or tab/space)\n"
+            f"  • {self.COLOR_EXAMPLE}regex{self.COLOR_RESET}       - Key is a capture group of the pattern (default: whole match)\n"
+            f"  • {self.COLOR_EXAMPLE}reverse{self.COLOR_RESET}     - Descending order\n"
+            f"  • {self.COLOR_EXAMPLE}ignore_case{self.COLOR_RESET} - Case-folded comparison\n"
+            f"  • {self.COLOR_EXAMPLE}stable{self.COLOR_RESET}      - Equal keys keep their order (always the case)\n"
+            f"  • {self.COLOR_EXAMPLE}external{self.COLOR_RESET}    - Force the external merge sort, optional memory budget in MB\n"
+            f"  • {self.COLOR_EXAMPLE}parallel{self.COLOR_RESET}    - Sort chunks in worker processes (default: one per CPU)\n"
+            f"  • {self.COLOR_EXAMPLE}benchmark{self.COLOR_RESET}   - Compare 1, 2, 4 and 8 workers, text unchanged\n\n"
+            f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}sort numeric reverse{self.COLOR_RESET}            - Largest numbers first\n"
+            f"  {self.COLOR_EXAMPLE}sort column 3 \",\" numeric{self.COLOR_RESET}      - By the 3rd CSV field, numerically\n"
+            f"  {self.COLOR_EXAMPLE}sort regex \"v([0-9.]+)\" 1 natural{self.COLOR_RESET} - By version number\n"
+            f"  {self.COLOR_EXAMPLE}sort ignore_case external 128{self.COLOR_RESET}   - Case-folded, 128 MB budget\n"
+            f"  {self.COLOR_EXAMPLE}sort natural parallel 4{self.COLOR_RESET}         - Natural order on 4 processes\n"
+            f"  {self.COLOR_EXAMPLE}sort column 2 numeric benchmark{self.COLOR_RESET} - Measure the parallel speedup\n\n"
             f"{self.COLOR_COMMAND}Sorting Behavior:{self.COLOR_RESET}\n"
             f"  • {self.COLOR_COMMAND}Ascending order{self.COLOR_RESET} - A to Z, then a to z\n"
             f"  • {self.COLOR_COMMAND}Case-sensitive{self.COLOR_RESET} - Uppercase before lowercase\n"
@@ -5264,7 +8292,9 @@ class TextTool(cmd2.Cmd):
             f"  • Standardizing file formats\n"
             f"  • Making data more readable and navigable\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
-            f"  • For numerical sorting, use regex extraction first\n"
+            f"  • Keys are computed once per line, not once per comparison\n"
+            f"  • Buffers above the memory budget (default 512 MB) are sorted in runs\n"
+            f"    spilled to temporary files and merged back\n"
             f"  • Combine with {self.COLOR_EXAMPLE}unique{self.COLOR_RESET} for duplicate removal\n"
             f"  • Live View updates to show sorted result\n"
             f"  • Use {self.COLOR_EXAMPLE}revert{self.COLOR_RESET} to restore original order\n"
@@ -5276,26 +8306,161 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: No file is loaded.")
             return
 
+        if hasattr(arg, 'args'):
+            arg = arg.args
+        try:
+            args = shlex.split(arg)
+        except ValueError:
+            self.poutput("Error: Invalid quotes or arguments.")
+            return
+
+        keywords = {"numeric", "natural", "column", "regex", "reverse", "ignore_case", "stable",
+                    "external", "parallel", "benchmark"}
+        options = {}
+        reverse = False
+        external = False
+        workers = 0
+        benchmark = False
+        memory_mb = self.sort_memory_mb
+        i = 0
+        while i < len(args):
+            token = args[i]
+            nxt = args[i + 1] if i + 1 < len(args) else None
+            if token in ("numeric", "natural", "ignore_case"):
+                options[token] = True
+            elif token == "reverse":
+                reverse = True
+            elif token == "stable":
+                pass  # list.sort and heapq.merge are both stable
+            elif token == "column":
+                if nxt is None or not nxt.isdigit() or int(nxt) < 1:
+                    self.poutput("Error: column expects a column number starting at 1.")
+                    return
+                options["column"] = int(nxt)
+                i += 1
+                if i + 1 < len(args) and args[i + 1] not in keywords:
+                    delimiter = args[i + 1]
+                    options["delimiter"] = {"tab": "\t", "space": " "}.get(delimiter.lower(), delimiter)
+                    i += 1
+            elif token == "regex":
+                if nxt is None:
+                    self.poutput("Error: regex expects a pattern.")
+                    return
+                try:
+                    re.compile(nxt)
+                except re.error as e:
+                    self.poutput(f"Error: Invalid regex pattern: {e}")
+                    return
+                options["pattern"] = nxt
+                i += 1
+                if i + 1 < len(args) and args[i + 1].isdigit():
+                    options["group"] = int(args[i + 1])
+                    i += 1
+            elif token == "external":
+                external = True
+                if nxt is not None and nxt.isdigit():
+                    memory_mb = int(nxt)
+                    i += 1
+            elif token == "parallel":
+                workers = os.cpu_count() or 1
+                if nxt is not None and nxt.isdigit() and int(nxt) > 0:
+                    workers = int(nxt)
+                    i += 1
+            elif token == "benchmark":
+                benchmark = True
+            else:
+                self.poutput(f"Error: Unknown sort option '{token}'. Type 'sort ?' for help.")
+                return
+            i += 1
+
+        if options.get("numeric") and options.get("natural"):
+            self.poutput("Error: Choose either numeric or natural, not both.")
+            return
+        if memory_mb <= 0:
+            self.poutput("Error: memory_mb must be a positive number.")
+            return
+
+        key = SortKey(reverse=reverse, **options) if options else None
+        lines = self.current_lines
+        total = len(lines)
+
+        if benchmark:
+            import time
+            self.poutput(f"Sorting {total:,} lines ({'keyed' if key else 'plain'}, {os.cpu_count()} CPUs):")
+            baseline = None
+            for n in (1, 2, 4, 8):
+                self.report_progress(0, total)
+                start = time.perf_counter()
+                parallel_sort(lines, key, reverse, n)
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                self.poutput(f"  {n} worker(s): {elapsed:8.3f} s   speedup x{baseline / elapsed:.2f}")
+            return
+
+        # Keys and tuples cost a few times the raw text size
+        estimated_bytes = sum(map(len, lines)) * (4 if key else 2)
+        memory_bytes = memory_mb * 1024 * 1024
+        if external or estimated_bytes > memory_bytes:
+            run_lines = max(1000, int(total * memory_bytes / max(estimated_bytes, 1)))
+            sorted_lines = []
+            external_sort(iter(lines), key, reverse, run_lines, sorted_lines.append,
+                          progress=lambda done: self.report_progress(done, total))
+            mode = f"external merge sort, {-(-total // run_lines)} run(s)"
+        elif workers > 1:
+            self.report_progress(0, total)
+            sorted_lines = parallel_sort(lines, key, reverse, workers)
+            mode = f"parallel, {workers} workers"
+        elif key is None:
+            sorted_lines = sorted(lines, reverse=reverse)
+            mode = "in memory"
+        else:
+            # Decorate once: each key is computed a single time, not per comparison
+            decorated = [(key(line), line) for line in self.iter_progress(lines)]
+            decorated.sort(key=lambda record: record[0], reverse=reverse)
+            sorted_lines = [line for _, line in decorated]
+            del decorated
+            mode = "in memory"
+
         # Save the current state for revert functionality
         self.previous_lines = self.current_lines.copy()
         self.previous_words = self.words.copy()
-
-        # Sort the lines
-        self.current_lines.sort()
+        self.current_lines = sorted_lines
         self.update_live_view()
-        self.poutput("Lines sorted successfully.")
+        self.poutput(f"Lines sorted successfully ({mode}).")
+
+    def complete_sort(self, text, line, begidx, endidx):      
+        FRIENDS_T = ['numeric', 'natural', 'column', 'regex', 'reverse', 'ignore_case', 'stable', 'external',
+                     'parallel', 'benchmark', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else: 
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
 
     def do_unique(self, arg):
         """Remove duplicate lines from the current text.
 
         Usage:
-            unique  - Removes duplicate lines from the current text
+            unique [count]  - Removes duplicate lines from the current text
+            unique external [memory_mb] [count]
+                            - Same, spilling to temporary files with bounded memory
+            unique external "input_file" ["output_file"] [memory_mb] [count]
+                            - Deduplicate a file larger than RAM without loading it
+
+        Arguments:
+            count       - Also report how many times each duplicated line occurred
+            memory_mb   - Memory budget for the external mode (default: 256)
 
         Notes:
             - This command removes duplicate lines, keeping only the first occurrence
             - The number of deleted lines is displayed after the operation
             - Lines must be exact matches (including whitespace)
             - Often used after sort for complete duplicate cleanup
+            - The external mode hash-partitions lines into temporary bucket files,
+              deduplicates one bucket at a time and merges the survivors back
+              by line number, so the original order is kept
+            - Without output_file, the result is written next to input_file
+              with a "_unique" suffix
         """
         help_text = (
             f"{self.COLOR_HEADER}Unique - Remove Duplicate Lines{self.COLOR_RESET}\n\n"
@@ -5303,7 +8468,10 @@ class TextTool(cmd2.Cmd):
             f"  Remove duplicate lines from the text, preserving only the first occurrence\n"
             f"  of each unique line. Exact matching including whitespace and case.\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}unique{self.COLOR_RESET}  - Remove duplicate lines\n\n"
+            f"  {self.COLOR_EXAMPLE}unique [count]{self.COLOR_RESET}  - Remove duplicate lines\n"
+            f"  {self.COLOR_EXAMPLE}unique external [memory_mb] [count]{self.COLOR_RESET}  - Same, with bounded memory\n"
+            f"  {self.COLOR_EXAMPLE}unique external \"input_file\" [\"output_file\"] [memory_mb] [count]{self.COLOR_RESET}\n"
+            f"      - Deduplicate a file larger than RAM without loading it\n\n"
             f"{self.COLOR_COMMAND}Operation Details:{self.COLOR_RESET}\n"
             f"  • {self.COLOR_COMMAND}Exact matching{self.COLOR_RESET} - Whitespace and case must match\n"
             f"  • {self.COLOR_COMMAND}First occurrence kept{self.COLOR_RESET} - Subsequent duplicates removed\n"
@@ -5319,6 +8487,8 @@ class TextTool(cmd2.Cmd):
             f"  • Use {self.COLOR_EXAMPLE}revert{self.COLOR_RESET} to restore duplicates\n"
             f"  • Live View updates with unique lines only\n"
             f"  • Perfect for cleaning data exports or logs\n"
+            f"  • {self.COLOR_EXAMPLE}count{self.COLOR_RESET} reports the most repeated lines, like {self.COLOR_EXAMPLE}find_duplicates{self.COLOR_RESET}\n"
+            f"  • {self.COLOR_EXAMPLE}external{self.COLOR_RESET} spills hash buckets to temporary files (default budget 256 MB)\n"
         )
         if arg.strip() == "?":
             self.poutput(help_text)
@@ -5326,29 +8496,132 @@ class TextTool(cmd2.Cmd):
         #if arg.strip() == "?":  # Check if the argument is just "?"
             #self.do_help(self._cmd_func_name)  # Execute help for the current function
             #return  # Exit the function
+        if hasattr(arg, 'args'):
+            arg = arg.args
+        try:
+            args = shlex.split(arg)
+        except ValueError:
+            self.poutput("Error: Invalid quotes or arguments.")
+            return
+
+        show_counts = "count" in args
+        external = False
+        memory_mb = 256
+        files = []
+        for a in args:
+            if a == "count":
+                continue
+            if a == "external":
+                external = True
+            elif a.isdigit() and not external:
+                self.poutput(f"Error: '{a}' is a memory budget; it is only accepted after 'external'.")
+                return
+            elif a.isdigit():
+                memory_mb = int(a)
+            else:
+                files.append(a)
+        if memory_mb <= 0:
+            self.poutput("Error: memory_mb must be a positive number.")
+            return
+
+        if external and files:
+            self._unique_file(files, memory_mb, show_counts)
+            return
+        if files:
+            self.poutput(f"Error: Unknown argument '{files[0]}'. Use 'unique external \"input_file\"' to process a file.")
+            return
+
         if not self.current_lines:
             self.poutput("Error: No file is loaded.")
             return
 
+        # Remove duplicate lines
+        top = 100 if show_counts else 0
+        if external:
+            unique_lines = []
+            total = len(self.current_lines)
+            _, kept, duplicates, duplicated = external_unique(
+                iter(self.current_lines), unique_lines.append, memory_mb * 1024 * 1024,
+                sum(map(len, self.current_lines)), top,
+                progress=lambda done: self.report_progress(done, total))
+        elif show_counts:
+            import heapq
+            unique_lines = []
+            seen = {}  # line -> [first line number, count]
+            for idx, line in enumerate(self.iter_progress(self.current_lines), start=1):
+                entry = seen.get(line)
+                if entry is None:
+                    unique_lines.append(line)
+                    seen[line] = [idx, 1]
+                else:
+                    entry[1] += 1
+            repeated = [(entry[1], entry[0], line) for line, entry in seen.items() if entry[1] > 1]
+            duplicated = len(repeated)
+            duplicates = heapq.nlargest(top, repeated, key=lambda d: (d[0], -d[1]))
+        else:
+            unique_lines = []
+            seen = set()
+            for line in self.iter_progress(self.current_lines):
+                if line not in seen:
+                    unique_lines.append(line)
+                    seen.add(line)
+        deleted_lines_count = len(self.current_lines) - len(unique_lines)
+
         # Save the current state for revert functionality
         self.previous_lines = self.current_lines.copy()
         self.previous_words = self.words.copy()
-
-        # Remove duplicate lines
-        unique_lines = []
-        seen = set()
-        deleted_lines_count = 0
-
-        for line in self.current_lines:
-            if line not in seen:
-                unique_lines.append(line)
-                seen.add(line)
-            else:
-                deleted_lines_count += 1
-
         self.current_lines = unique_lines   
         self.update_live_view()
         self.poutput(f"Duplicate lines removed successfully. Deleted {deleted_lines_count} lines.")
+        if show_counts:
+            self._print_duplicate_counts(duplicates, duplicated)
+
+    def _unique_file(self, files, memory_mb, show_counts):
+        """unique external on a file: stream input_file to output_file with bounded memory."""
+        input_path = files[0]
+        if not os.path.isfile(input_path):
+            self.poutput(f"Error: File '{input_path}' does not exist.")
+            return
+        if len(files) > 1:
+            output_path = files[1]
+        else:
+            base, ext = os.path.splitext(input_path)
+            output_path = f"{base}_unique{ext}"
+        if os.path.abspath(output_path) == os.path.abspath(input_path):
+            self.poutput("Error: output_file must differ from input_file.")
+            return
+
+        size = os.path.getsize(input_path)
+        try:
+            with open(input_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as src, \
+                 open(output_path, "w", encoding="utf-8", errors="surrogateescape", newline="") as dst:
+                total, kept, duplicates, duplicated = external_unique(
+                    src, dst.write, memory_mb * 1024 * 1024, size, 100 if show_counts else 0,
+                    progress=lambda done: self.report_progress(done, 0))
+        except KeyboardInterrupt:
+            os.remove(output_path)  # do not leave a truncated result behind
+            raise
+        self.poutput(f"Wrote {kept:,} unique lines to '{output_path}'. Deleted {total - kept:,} duplicate lines.")
+        if show_counts:
+            self._print_duplicate_counts(duplicates, duplicated)
+
+    def _print_duplicate_counts(self, duplicates, duplicated):
+        """Print the (count, first_line_number, line) report of 'unique ... count'."""
+        if not duplicates:
+            self.poutput("No duplicate lines found.")
+            return
+        output = f"\n{self.COLOR_HEADER}=== Duplicate Lines ==={self.COLOR_RESET}\n"
+        output += f"Found {duplicated:,} unique duplicate line(s)"
+        if duplicated > len(duplicates):
+            output += f", showing the {len(duplicates)} most repeated"
+        output += "\n\n"
+        for count, line_number, line in duplicates:
+            line = line.rstrip('\n\r')
+            display_line = line[:80] + "..." if len(line) > 80 else line
+            output += f"{self.COLOR_COMMAND}Count: {count}{self.COLOR_RESET}\n"
+            output += f"  Line: {display_line}\n"
+            output += f"  First found on line: {line_number}\n\n"
+        self.poutput(output)
         
         
     def do_remove_empty_lines(self, arg):
@@ -5399,7 +8672,7 @@ class TextTool(cmd2.Cmd):
         self.previous_words = self.words.copy()
 
         # Remove empty lines
-        non_empty_lines = [line for line in self.current_lines if line.strip()]
+        non_empty_lines = [line for line in self.iter_progress(self.current_lines) if line.strip()]
         deleted_lines_count = len(self.current_lines) - len(non_empty_lines)
         self.current_lines = non_empty_lines
         try:
@@ -5468,66 +8741,29 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: No file is loaded.")
             return
 
-        # Save previous state
-        self.previous_lines = self.current_lines.copy()
+        # Save previous words; apply_line_changes keeps the previous lines
         self.previous_words = self.words.copy()
 
-        import shlex
         try:
-            args = shlex.split(arg) if '"' in arg or "'" in arg else arg.strip().split()
-        except ValueError:
-            self.poutput("Error: Invalid quotes or arguments.")
-            return
-
-        # Detect and remove case_sensitive flag
-        if "case_sensitive" in args:
-            case_sensitive = True
-            args.remove("case_sensitive")
-        else:
-            case_sensitive = False
-
-        # Parse arguments
-        if len(args) == 2:
-            string1, string2 = args
-        elif len(args) == 1:
-            string1 = ""
-            string2 = args[0]
-        else:
-            self.poutput('Error: Missing parameters. Usage: right_replace "string1" "string2"')
+            string1, string2, case_sensitive = self._parse_side_replace_args(arg, "right_replace")
+        except ValueError as e:
+            self.poutput(f"Error: {e}")
             return
 
-        new_lines = []
+        # Same per-line rule as in a pipeline; only the lines it changes are rebuilt
+        changed = self.apply_line_changes(self.line_changes(self.line_transform("right_replace", arg)))
         if not string1:  # append mode
-            for line in self.current_lines:
-                if not line.endswith("\n"):
-                    line += "\n"
-                new_lines.append(line.rstrip("\n") + string2 + "\n")
             self.poutput(f"Appended '{string2}' to the end of all lines.")
         else:
-            for line in self.current_lines:
-                if case_sensitive:
-                    idx = line.find(string1)
-                else:
-                    idx = line.lower().find(string1.lower())
-                if idx != -1:
-                    new_lines.append(line[:idx] + string2 + "\n")
-                else:
-                    new_lines.append(line)
-            self.poutput(f"Right-side replacement completed ({'case sensitive' if case_sensitive else 'case insensitive'}).")
+            self.poutput(f"Right-side replacement completed ({'case sensitive' if case_sensitive else 'case insensitive'}): {changed} line(s) changed.")
 
-        self.current_lines = new_lines
-        try:
-            self.do_fill_words('')
-        except:
-            a=0        
-        self.update_live_view()
         try:
             self.do_fill_words('')
         except:
             a=0         
 
     def complete_right_replace(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive','?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -5592,61 +8828,29 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: No file is loaded.")
             return
 
-        # Save previous state
-        self.previous_lines = self.current_lines.copy()
+        # Save previous words; apply_line_changes keeps the previous lines
         self.previous_words = self.words.copy()
-
-        import shlex
-        try:
-            args = shlex.split(arg) if '"' in arg or "'" in arg else arg.strip().split()
-        except ValueError:
-            self.poutput("Error: Invalid quotes or arguments.")
-            return
-
-        # Detect and remove case_sensitive flag
-        if "case_sensitive" in args:
-            case_sensitive = True
-            args.remove("case_sensitive")
-        else:
-            case_sensitive = False
-
-        # Parse arguments
-        if len(args) == 2:
-            string1, string2 = args
-        elif len(args) == 1:
-            string1 = ""
-            string2 = args[0]
-        else:
-            self.poutput('Error: Missing parameters. Usage: left_replace "string1" "string2"')
+
+        try:
+            string1, string2, case_sensitive = self._parse_side_replace_args(arg, "left_replace")
+        except ValueError as e:
+            self.poutput(f"Error: {e}")
             return
 
-        new_lines = []
+        # Same per-line rule as in a pipeline; only the lines it changes are rebuilt
+        changed = self.apply_line_changes(self.line_changes(self.line_transform("left_replace", arg)))
         if not string1:  # prepend mode
-            for line in self.current_lines:
-                new_lines.append(string2 + line)
             self.poutput(f"Prepended '{string2}' to the beginning of all lines.")
         else:
-            for line in self.current_lines:
-                if case_sensitive:
-                    idx = line.find(string1)
-                else:
-                    idx = line.lower().find(string1.lower())
-                if idx != -1:
-                    new_lines.append(string2 + line[idx + len(string1):])
-                else:
-                    new_lines.append(line)
-            self.poutput(f"Left-side replacement completed ({'case sensitive' if case_sensitive else 'case insensitive'}).")
+            self.poutput(f"Left-side replacement completed ({'case sensitive' if case_sensitive else 'case insensitive'}): {changed} line(s) changed.")
 
-        self.current_lines = new_lines
-       
-        self.update_live_view()
         try:
             self.do_fill_words('')
         except:
             a=0 
             
     def complete_left_replace(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive','?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -5695,10 +8899,14 @@ class TextTool(cmd2.Cmd):
         if arg.strip() == "?":
             self.poutput(help_text)
             return
-        diff = difflib.unified_diff(
-            self.previous_lines, self.current_lines,
-            fromfile='previous', tofile='current', lineterm=''
-        )
+        if self.last_changes and self.last_changes[0] is self.previous_lines and self.last_changes[1] is self.current_lines:
+            # The last command recorded its changed lines: no need to compare the whole text
+            diff = change_set_diff(self.previous_lines, self.current_lines, self.last_changes[2])
+        else:
+            diff = difflib.unified_diff(
+                self.previous_lines, self.current_lines,
+                fromfile='previous', tofile='current', lineterm=''
+            )
         self.poutput('\n'.join(diff))
 
 
@@ -5707,6 +8915,7 @@ class TextTool(cmd2.Cmd):
 
         Usage:
             placeholder_replace "placeholder1" ["placeholder2" ...] [filename] [case_sensitive]
+                                [to_file <output_file>] [workers N]
 
         Behavior:
             - If filename is provided → use its lines as replacement values.
@@ -5715,11 +8924,14 @@ class TextTool(cmd2.Cmd):
             - Each copy has ALL placeholders replaced with values from that mapping line.
             - The new text replaces the old one (original lines are not kept).
             - Add 'case_sensitive' to make matching case-sensitive.
+            - With to_file, the result is streamed to output_file instead and the text is unchanged.
 
         Arguments:
             placeholder1, placeholder2, ... - One or more placeholder strings to replace.
             filename                        - Optional file containing replacement values.
             case_sensitive                  - Optional flag for case-sensitive matching.
+            to_file <output_file>           - Write the result to a file, row by row, without building it in memory.
+            workers N                       - With to_file, split the mapping rows over N processes.
 
         Mapping File Format:
             Each line in the file (or clipboard) should contain space-separated values,
@@ -5742,6 +8954,9 @@ class TextTool(cmd2.Cmd):
             
             placeholder_replace "ID" "VALUE" data.txt case_sensitive
                 - Case-sensitive replacement from data.txt.
+            
+            placeholder_replace "ID" "VALUE" data.txt to_file "out.txt" workers 4
+                - Stream the result for a large mapping to out.txt using 4 processes.
 
         Detailed Example:
             Original text:
@@ -5776,6 +8991,7 @@ class TextTool(cmd2.Cmd):
             - Add 'case_sensitive' for case-sensitive matching.
             - The ORIGINAL text is preserved while building each mapping output.
             - Each placeholder can appear multiple times in the text.
+            - All placeholders are replaced in one pass; values are inserted as plain text.
             - Useful for mail merge, test data generation, and template expansion.
         """
         help_text = (
@@ -5786,7 +9002,8 @@ class TextTool(cmd2.Cmd):
             f"  Essentially performs batch template filling with your text as the template.\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}placeholder_replace \"placeholder1\" [filename] [case_sensitive]{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}placeholder_replace \"ph1\" \"ph2\" \"ph3\" mapping.txt{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}placeholder_replace \"ph1\" \"ph2\" \"ph3\" mapping.txt{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}placeholder_replace \"ph1\" mapping.txt to_file \"out.txt\" [workers N]{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Input Methods:{self.COLOR_RESET}\n"
             f"  • {self.COLOR_COMMAND}File mapping{self.COLOR_RESET} - Provide filename with replacement values\n"
             f"  • {self.COLOR_COMMAND}Clipboard mapping{self.COLOR_RESET} - Use clipboard content if no file\n"
@@ -5822,7 +9039,8 @@ class TextTool(cmd2.Cmd):
             f"  • Placeholders are treated as literal text (not regex)\n"
             f"  • Mapping lines with wrong column count are skipped\n"
             f"  • Original text serves as immutable template\n"
-            f"  • Output lines = template lines × mapping lines\n\n"
+            f"  • Output lines = template lines × mapping lines\n"
+            f"  • {self.COLOR_EXAMPLE}to_file{self.COLOR_RESET} streams large results to a file; {self.COLOR_EXAMPLE}workers N{self.COLOR_RESET} shards the rows\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
             f"  • Use {self.COLOR_EXAMPLE}revert{self.COLOR_RESET} to return to original template\n"
             f"  • Mapping file should use spaces/tabs to separate values\n"
@@ -5851,6 +9069,28 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: Invalid arguments.")
             return
 
+        # to_file <path> streams the result to a file; workers N shards the mapping rows
+        output_path = None
+        workers = 1
+        for keyword in ("to_file", "workers"):
+            if keyword in parts:
+                pos = parts.index(keyword)
+                if pos + 1 >= len(parts):
+                    self.poutput(f"Error: {keyword} needs a value.")
+                    return
+                value = parts[pos + 1]
+                del parts[pos:pos + 2]
+                if keyword == "to_file":
+                    output_path = value
+                elif value.isdigit() and int(value) >= 1:
+                    workers = int(value)
+                else:
+                    self.poutput("Error: workers expects a number of processes (1 or more).")
+                    return
+        if workers > 1 and not output_path:
+            self.poutput("Error: workers needs to_file <path>.")
+            return
+
         # detect case_sensitive flag
         case_sensitive = False
         if parts and parts[-1].lower() == "case_sensitive":
@@ -5907,27 +9147,33 @@ class TextTool(cmd2.Cmd):
                 self.poutput(f"Note: {skipped} mapping lines were skipped due to token count mismatch.")
             return
 
-        # compile patterns for placeholders (escape to treat placeholders as plain text)
-        flags = 0 if case_sensitive else re.IGNORECASE
-        placeholder_patterns = [re.compile(re.escape(p), flags) for p in placeholders]
+        # Find the placeholders once per template line; each mapping row is then a str.format call
+        formats = compile_template(self.current_lines, placeholders, case_sensitive)
+        total_lines = len(mappings) * len(formats)
+
+        if output_path:
+            if filename and os.path.abspath(output_path) == os.path.abspath(filename):
+                self.poutput("Error: to_file must differ from the mapping file.")
+                return
+            try:
+                self._placeholder_rows_to_file("".join(formats), mappings, output_path, workers)
+            except OSError as e:
+                self.poutput(f"Error: Could not write '{output_path}': {e}")
+                return
+            self.poutput(f"Wrote {total_lines:,} lines ({len(mappings):,} mapping lines x {len(formats):,} template lines) "
+                         f"to '{output_path}'. ({skipped} mapping lines skipped)")
+            return
 
-        # Keep original text unchanged while producing outputs
-        original_lines = self.current_lines.copy()
+        if total_lines > self.placeholder_memory_lines:
+            self.poutput(f"Error: The result would have {total_lines:,} lines, too many to keep in memory. "
+                         f"Add to_file <path> to stream it to a file.")
+            return
 
         result_lines = []
-        for mapping in mappings:
-            # For this mapping row, apply all replacements to every line of original_lines
-            for orig in original_lines:
-                modified = orig
-                # apply each placeholder -> mapping value
-                for idx, pat in enumerate(placeholder_patterns):
-                    replacement = mapping[idx]
-                    # use re.sub with pattern object and flags via compiled pattern
-                    modified = pat.sub(replacement, modified)
-                # ensure newline ending
-                if not modified.endswith("\n"):
-                    modified = modified + ("\n" if orig.endswith("\n") else "")
-                result_lines.append(modified)
+        for row, mapping in enumerate(mappings):
+            if row % 1000 == 0:
+                self.report_progress(row * len(formats), total_lines)
+            result_lines.extend([template.format(*mapping) for template in formats])
 
         # Save previous state for revert
         self.previous_lines = self.current_lines.copy()
@@ -5948,8 +9194,60 @@ class TextTool(cmd2.Cmd):
 
 
 
+    def _placeholder_rows_to_file(self, template, mappings, output_path, workers):
+        """Stream the filled template for every mapping row to output_path, sharding the rows over worker processes.
+
+        The result is written to part files next to output_path and moved onto
+        it only once complete, so a cancel or an OSError (raised to the caller)
+        leaves neither part files nor a truncated output behind.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        import shutil
+        import tempfile
+
+        total = len(mappings)
+        directory = os.path.dirname(os.path.abspath(output_path))
+        part_paths = []
+
+        def new_part():
+            fd, part_path = tempfile.mkstemp(prefix="placeholder_", suffix=".part", dir=directory)
+            os.close(fd)
+            part_paths.append(part_path)
+            return part_path
+
+        try:
+            result_path = new_part()
+            if workers <= 1 or total < 2 * workers:
+                write_template_rows(template, mappings, result_path,
+                                    progress=lambda done: self.report_progress(done, total))
+            else:
+                # Each worker writes one contiguous shard; the shards are then appended in order
+                size = -(-total // workers)
+                shards = [mappings[i:i + size] for i in range(0, total, size)]
+                shard_paths = [new_part() for _ in shards]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(write_template_rows, template, shard, part_path)
+                               for shard, part_path in zip(shards, shard_paths)]
+                    done = 0
+                    for future in futures:
+                        done += future.result()
+                        self.report_progress(done, total)
+                with open(result_path, "wb") as out:
+                    for part_path in shard_paths:
+                        with open(part_path, "rb") as part:
+                            shutil.copyfileobj(part, out, 1 << 20)
+            # mkstemp files are private; give the result the mode a new file would get
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(result_path, 0o666 & ~umask)
+            os.replace(result_path, output_path)
+        finally:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+
     def complete_placeholder_replace(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:] + ['case_sensitive','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit) + ['case_sensitive', 'to_file', 'workers', '?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -5976,6 +9274,9 @@ class TextTool(cmd2.Cmd):
         Notes:
             - Line numbers start at 1.
             - The repeated text is appended at the end of the current content.
+            - Large results (clone_virtual_lines, 1,000,000 lines by default) keep the
+              copies as a virtual repeat: show, count and save read it as is, line-wise
+              edits change the repeated block once, and other edits materialize it.
         """
         help_text = (
             f"{self.COLOR_HEADER}\nRepeat lines or the whole text a specified number of times.{self.COLOR_RESET}\n\n"
@@ -5988,6 +9289,7 @@ class TextTool(cmd2.Cmd):
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
             f"  - Line numbers start at 1.\n"
             f"  - The repeated text is appended at the end of the current content.\n"
+            f"  - Results of 1,000,000+ lines stay virtual until an edit needs the real lines.\n"
         )
         if arg.strip() == "?":
             self.poutput(help_text)
@@ -6035,10 +9337,20 @@ class TextTool(cmd2.Cmd):
             # Save current state for revert
             self.previous_lines = self.current_lines.copy()
             self.previous_words = self.words.copy()
+            self.previous_repeat_tail = None
+
+            if len(lines_to_repeat) * repeat_number >= self.clone_virtual_lines:
+                # Keep the copies as one repeat segment; show, count and save iterate it
+                # and line-wise edits change the block once, until an edit needs real lines
+                self.repeat_tail = (lines_to_repeat, repeat_number)
+                self.poutput(f"Repeated {part_desc} {repeat_number} time(s). The {self.repeat_tail_lines():,} "
+                             f"copied lines are kept virtual until an edit needs them.")
+                self.update_live_view()
+                return
 
             # Perform repetition
             repeated_part = lines_to_repeat * repeat_number
-            self.current_lines.extend(repeated_part)
+            self.current_lines = self.current_lines + repeated_part
 
             self.poutput(f"Repeated {part_desc} {repeat_number} time(s).")
             self.update_live_view()
@@ -6047,7 +9359,7 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: Parameters must be integers.")
 
     def complete_select(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case-sensitive','[pipe]', '[doublequote]', '[quote]', '[tab]','[greater]', 'OR','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case-sensitive','[pipe]', '[doublequote]', '[quote]', '[tab]','[greater]', 'OR','?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -6060,7 +9372,7 @@ class TextTool(cmd2.Cmd):
     def complete_filter(self, text, line, begidx, endidx):      
         FRIENDS_T = ['case-sensitive','[pipe]', '[doublequote]', '[quote]', '[tab]','[greater]', 'OR','?']
         if not text:
-          completions = self.words[:]+FRIENDS_T[:]
+          completions = self.word_index.complete(text, self.completion_limit)+FRIENDS_T[:]
         else: 
           completions = [ f 
                           for f in (FRIENDS_T)
@@ -6091,7 +9403,7 @@ class TextTool(cmd2.Cmd):
         return completions
 
     def complete_extract_between(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive','inner_only','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive','inner_only','?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -6102,7 +9414,7 @@ class TextTool(cmd2.Cmd):
         return completions
 
     def complete_bulk_replace(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive','?']
         if not text:
           completions = FRIENDS_T[:]
         else: 
@@ -6117,13 +9429,14 @@ class TextTool(cmd2.Cmd):
         """Extract specific columns from delimited text.
         
         Usage:
-            extract_column <column_numbers> [delimiter]
+            extract_column <column_numbers> [delimiter] [raw]
             
         Arguments:
             <column_numbers> - Comma-separated column numbers or ranges (1-based)
                               Examples: "1,3,5" or "2-4" or "1,3-5,7"
             [delimiter]      - Column delimiter (default: comma)
                               Use "tab" for tab character, "space" for space
+            [raw]            - Split on every delimiter, ignoring CSV quoting
             
         Examples:
             extract_column "1,3,5" ","     - Extract columns 1, 3, and 5 from CSV.
@@ -6135,17 +9448,23 @@ class TextTool(cmd2.Cmd):
             - Column numbers are 1-based (first column is 1).
             - Ranges are inclusive (1-3 means columns 1, 2, and 3).
             - Empty columns are preserved in the output.
+            - Quoted fields ("a,b") are kept whole, as in CSV; the space delimiter and
+              the raw option split on every delimiter. Delimiters longer than one
+              character and unbalanced quotes also fall back to splitting on every
+              delimiter, so no line is lost.
+            - The parsed columns are cached until the text changes.
             - Useful for extracting specific fields from CSV or TSV files.
         """
         help_text = (
             f"{self.COLOR_HEADER}\nExtract specific columns from delimited text.{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}extract_column <column_numbers> [delimiter]{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}extract_column <column_numbers> [delimiter] [raw]{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Arguments:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}<column_numbers>{self.COLOR_RESET} - Comma-separated column numbers or ranges (1-based)\n"
             f"                      Examples: \"1,3,5\" or \"2-4\" or \"1,3-5,7\"\n"
             f"  {self.COLOR_EXAMPLE}[delimiter]{self.COLOR_RESET}      - Column delimiter (default: comma)\n"
-            f"                      Use \"tab\" for tab character, \"space\" for space\n\n"
+            f"                      Use \"tab\" for tab character, \"space\" for space\n"
+            f"  {self.COLOR_EXAMPLE}[raw]{self.COLOR_RESET}            - Split on every delimiter, ignoring CSV quoting\n\n"
             f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}extract_column \"1,3,5\" \",\"{self.COLOR_RESET}     - Extract columns 1, 3, and 5 from CSV.\n"
             f"  {self.COLOR_EXAMPLE}extract_column \"2-4\" tab{self.COLOR_RESET}       - Extract columns 2 through 4 from tab-delimited.\n"
@@ -6154,6 +9473,8 @@ class TextTool(cmd2.Cmd):
             f"  - Column numbers are 1-based (first column is 1).\n"
             f"  - Ranges are inclusive (1-3 means columns 1, 2, and 3).\n"
             f"  - Empty columns are preserved in the output.\n"
+            f"  - Quoted fields are kept whole (CSV quoting); use raw to split on every delimiter.\n"
+            f"  - Long delimiters and unbalanced quotes fall back to splitting on every delimiter.\n"
             f"  - Useful for extracting specific fields from CSV or TSV files.\n"
         )
         if arg.strip() == "?":
@@ -6174,8 +9495,11 @@ class TextTool(cmd2.Cmd):
             self.poutput("Error: Missing column numbers. Usage: extract_column <column_numbers> [delimiter]")
             return
         
+        raw = "raw" in args[1:]
+        if raw:
+            args = [args[0]] + [a for a in args[1:] if a != "raw"]
         column_spec = args[0].strip('"').strip("'")
-        delimiter = "," if len(args) < 2 else args[1]
+        delimiter = "," if len(args) < 2 else args[1].strip('"').strip("'") or ","
         
         # Handle special delimiter keywords
         if delimiter.lower() == "tab":
@@ -6185,57 +9509,14 @@ class TextTool(cmd2.Cmd):
         
         # Parse column specification
         try:
-            columns_to_extract = set()
-            parts = column_spec.split(',')
-            for part in parts:
-                part = part.strip()
-                if '-' in part:
-                    # Handle range (e.g., "2-4")
-                    start, end = part.split('-')
-                    start_col = int(start.strip())
-                    end_col = int(end.strip())
-                    if start_col < 1 or end_col < start_col:
-                        self.poutput(f"Error: Invalid range '{part}'")
-                        return
-                    columns_to_extract.update(range(start_col, end_col + 1))
-                else:
-                    # Handle single column
-                    col = int(part)
-                    if col < 1:
-                        self.poutput(f"Error: Column numbers must be positive (got {col})")
-                        return
-                    columns_to_extract.add(col)
-            
-            # Sort columns for consistent output
-            columns_to_extract = sorted(columns_to_extract)
-            
+            columns_to_extract = parse_column_spec(column_spec)
         except ValueError as e:
-            self.poutput(f"Error: Invalid column specification. {e}")
+            self.poutput(f"Error: {e}")
             return
         
-        # Extract columns
-        new_lines = []
-        for line in self.current_lines:
-            # Remove trailing newline for processing
-            line_content = line.rstrip('\n\r')
-            
-            # Split by delimiter
-            columns = line_content.split(delimiter)
-            
-            # Extract specified columns
-            extracted = []
-            for col_num in columns_to_extract:
-                # Convert to 0-based index
-                idx = col_num - 1
-                if idx < len(columns):
-                    extracted.append(columns[idx])
-                else:
-                    # Column doesn't exist in this line, add empty string
-                    extracted.append("")
-            
-            # Join and add newline
-            new_line = delimiter.join(extracted) + "\n"
-            new_lines.append(new_line)
+        # Extract columns from the cached parse; rows too short for a column get ""
+        table = self.parsed_table(delimiter, "raw" if raw or delimiter == " " else "csv")
+        new_lines = table.format_rows(zip(*(table.column(col_num) for col_num in columns_to_extract)))
         
         self.current_lines = new_lines
         try:
@@ -6251,7 +9532,7 @@ class TextTool(cmd2.Cmd):
 
 
     def complete_extract_column(self, text, line, begidx, endidx):      
-        FRIENDS_T = ['tab', 'space', ',', '|', ';', '?']
+        FRIENDS_T = ['tab', 'space', ',', '|', ';', 'raw', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -6390,7 +9671,7 @@ class TextTool(cmd2.Cmd):
         """Show statistics about the current text.
         
         Usage:
-            statistics
+            statistics [--sample [N]]
             
         Displays:
             - Total lines
@@ -6398,38 +9679,46 @@ class TextTool(cmd2.Cmd):
             - Total characters (including whitespace)
             - Total characters (excluding whitespace)
             - Total words
-            - Average line length
+            - Average line length, median and 90/95/99th percentiles
+            - Line length histogram
             - Longest line (with preview)
             - Shortest line (with preview)
             - Most common words (top 10)
             
         Examples:
-            statistics  - Display comprehensive text statistics.
+            statistics             - Display comprehensive text statistics.
+            statistics --sample    - Approximate statistics from 100,000 random lines.
+            statistics --sample 5000 - Approximate statistics from 5,000 random lines.
             
         Notes:
             - Statistics are calculated on the currently loaded/selected text.
             - Word counting uses simple whitespace splitting.
             - Character counts include newlines.
             - Most common words filter excludes short words (2 chars or less).
+            - With --sample, counts are extrapolated to the whole text.
         """
         help_text = (
             f"{self.COLOR_HEADER}\nShow statistics about the current text.{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}statistics{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}statistics [--sample [N]]{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Displays:{self.COLOR_RESET}\n"
             f"  - Total lines and non-empty lines\n"
             f"  - Total characters (with and without whitespace)\n"
             f"  - Total words\n"
-            f"  - Average line length\n"
+            f"  - Average line length, median and 90/95/99th percentiles\n"
+            f"  - Line length histogram\n"
             f"  - Longest and shortest lines with previews\n"
             f"  - Most common words (top 10)\n\n"
             f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}statistics{self.COLOR_RESET}  - Display comprehensive text statistics.\n\n"
+            f"  {self.COLOR_EXAMPLE}statistics{self.COLOR_RESET}  - Display comprehensive text statistics.\n"
+            f"  {self.COLOR_EXAMPLE}statistics --sample{self.COLOR_RESET}  - Approximate statistics from 100,000 random lines.\n"
+            f"  {self.COLOR_EXAMPLE}statistics --sample 5000{self.COLOR_RESET}  - Approximate statistics from 5,000 random lines.\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
             f"  - Statistics are calculated on the currently loaded/selected text.\n"
             f"  - Word counting uses simple whitespace splitting.\n"
             f"  - Character counts include newlines.\n"
             f"  - Most common words filter excludes short words (2 chars or less).\n"
+            f"  - With --sample, counts are extrapolated to the whole text.\n"
         )
         if arg.strip() == "?":
             self.poutput(help_text)
@@ -6438,44 +9727,85 @@ class TextTool(cmd2.Cmd):
         if not self.current_lines:
             self.poutput("Error: No file is loaded.")
             return
-        
-        # Calculate statistics
+
+        import numpy as np
+        import random
+        from collections import Counter
+
+        if hasattr(arg, 'args'):
+            arg = arg.args
+
+        # Parse --sample [N]
+        args = arg.split()
+        sample_size = None
+        if "--sample" in args:
+            pos = args.index("--sample")
+            sample_size = 100000
+            if pos + 1 < len(args):
+                try:
+                    sample_size = int(args[pos + 1])
+                except ValueError:
+                    self.poutput("Error: --sample expects a number of lines.")
+                    return
+            if sample_size <= 0:
+                self.poutput("Error: --sample expects a positive number of lines.")
+                return
+
         total_lines = len(self.current_lines)
-        non_empty_lines = sum(1 for line in self.current_lines if line.strip())
-        
-        total_chars_with_ws = sum(len(line) for line in self.current_lines)
-        total_chars_no_ws = sum(len(line.replace(' ', '').replace('\t', '').replace('\n', '').replace('\r', '')) 
-                               for line in self.current_lines)
-        
-        # Word counting
-        words = []
-        for line in self.current_lines:
-            words.extend(line.split())
-        total_words = len(words)
-        
-        # Average line length (excluding newlines)
-        line_lengths = [len(line.rstrip('\n\r')) for line in self.current_lines]
-        avg_line_length = sum(line_lengths) / len(line_lengths) if line_lengths else 0
-        
-        # Find longest and shortest lines
-        if line_lengths:
-            max_length = max(line_lengths)
-            min_length = min(line_lengths)
-            longest_line_idx = line_lengths.index(max_length)
-            shortest_line_idx = line_lengths.index(min_length)
-            longest_line = self.current_lines[longest_line_idx].rstrip('\n\r')
-            shortest_line = self.current_lines[shortest_line_idx].rstrip('\n\r')
+        if sample_size and sample_size < total_lines:
+            line_numbers = sorted(random.sample(range(total_lines), sample_size))
+            lines = [self.current_lines[i] for i in line_numbers]
         else:
-            longest_line = shortest_line = ""
-            max_length = min_length = 0
-        
-        # Most common words (case-insensitive)
-        from collections import Counter
-        word_counts = Counter(word.lower() for word in words if len(word) > 2)  # Ignore short words
+            sample_size = None
+            line_numbers = None
+            lines = self.current_lines
+
+        # Single streaming pass: per-line counters plus an array of line lengths
+        line_lengths = np.empty(len(lines), dtype=np.int64)
+        non_empty_lines = 0
+        total_chars_with_ws = 0
+        total_chars_no_ws = 0
+        total_words = 0
+        word_counts = Counter()
+        for i, line in enumerate(self.iter_progress(lines)):
+            length = len(line)
+            total_chars_with_ws += length
+            total_chars_no_ws += length - line.count(' ') - line.count('\t') - line.count('\n') - line.count('\r')
+            line_lengths[i] = len(line.rstrip('\n\r'))
+            words = line.split()
+            if words:
+                non_empty_lines += 1
+                total_words += len(words)
+                word_counts.update(word.lower() for word in words if len(word) > 2)  # Ignore short words
+
+        # Extrapolate sampled counts to the whole text
+        scale = total_lines / len(lines)
+        if sample_size:
+            non_empty_lines = round(non_empty_lines * scale)
+            total_chars_with_ws = round(total_chars_with_ws * scale)
+            total_chars_no_ws = round(total_chars_no_ws * scale)
+            total_words = round(total_words * scale)
+
+        # Vectorized length metrics
+        avg_line_length = float(line_lengths.mean())
+        longest_line_idx = int(line_lengths.argmax())
+        shortest_line_idx = int(line_lengths.argmin())
+        max_length = int(line_lengths[longest_line_idx])
+        min_length = int(line_lengths[shortest_line_idx])
+        longest_line = lines[longest_line_idx].rstrip('\n\r')
+        shortest_line = lines[shortest_line_idx].rstrip('\n\r')
+        if line_numbers:
+            longest_line_idx = line_numbers[longest_line_idx]
+            shortest_line_idx = line_numbers[shortest_line_idx]
+        p50, p90, p95, p99 = np.percentile(line_lengths, [50, 90, 95, 99])
+        hist_counts, hist_edges = np.histogram(line_lengths, bins=min(10, max(1, max_length - min_length + 1)))
+
         most_common = word_counts.most_common(10)
         
         # Display statistics
         output = f"\n{self.COLOR_HEADER}=== Text Statistics ==={self.COLOR_RESET}\n\n"
+        if sample_size:
+            output += f"{self.COLOR_EXAMPLE}Approximate: based on {sample_size:,} randomly sampled lines.{self.COLOR_RESET}\n\n"
         output += f"{self.COLOR_COMMAND}Lines:{self.COLOR_RESET}\n"
         output += f"  Total lines:     {total_lines:,}\n"
         output += f"  Non-empty lines: {non_empty_lines:,}\n"
@@ -6490,8 +9820,17 @@ class TextTool(cmd2.Cmd):
         
         output += f"{self.COLOR_COMMAND}Line Length:{self.COLOR_RESET}\n"
         output += f"  Average:  {avg_line_length:.2f} characters\n"
+        output += f"  Median:   {p50:.0f} characters\n"
+        output += f"  p90/p95/p99: {p90:.0f} / {p95:.0f} / {p99:.0f} characters\n"
         output += f"  Longest:  {max_length} characters\n"
         output += f"  Shortest: {min_length} characters\n\n"
+
+        output += f"{self.COLOR_COMMAND}Length histogram:{self.COLOR_RESET}\n"
+        peak = int(hist_counts.max()) or 1
+        for count, low, high in zip(hist_counts, hist_edges[:-1], hist_edges[1:]):
+            bar = "#" * int(round(40 * int(count) / peak))
+            output += f"  {low:>7.0f} - {high:<7.0f} {bar:<40} {int(count):,}\n"
+        output += "\n"
         
         if longest_line:
             preview = longest_line[:100] + "..." if len(longest_line) > 100 else longest_line
@@ -6516,15 +9855,22 @@ class TextTool(cmd2.Cmd):
         
         Usage:
             find_duplicates [threshold] [case_sensitive]
+            find_duplicates near [threshold] [similarity] [representatives] [case_sensitive]
             
         Arguments:
             [threshold]      - Minimum number of occurrences to display (default: 2).
             [case_sensitive] - Make comparison case-sensitive.
+            near             - Approximate mode: group lines that differ only in IDs,
+                               numbers or timestamps, or in a few words.
+            [similarity]     - For near mode, a value between 0 and 1 (default: 0.8).
+            representatives  - For near mode, print one line per cluster with its count.
             
         Examples:
             find_duplicates           - Show all lines appearing 2+ times.
             find_duplicates 5         - Show only lines appearing 5+ times.
             find_duplicates 3 case_sensitive - Case-sensitive, threshold 3.
+            find_duplicates near      - Show clusters of near-duplicate lines.
+            find_duplicates near 10 0.7 representatives - Clusters of 10+ lines, 70% similar.
             
         Notes:
             - By default, comparison is case-insensitive.
@@ -6532,23 +9878,32 @@ class TextTool(cmd2.Cmd):
             - Original line format is preserved in output.
             - Empty lines are included in duplicate detection.
             - Shows line numbers where duplicates appear.
+            - Near mode masks digits, hex values and UUIDs, then clusters the
+              masked lines with MinHash signatures bucketed by LSH.
         """
         help_text = (
             f"{self.COLOR_HEADER}\nFind and show duplicate lines with their counts.{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}find_duplicates [threshold] [case_sensitive]{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}find_duplicates [threshold] [case_sensitive]{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}find_duplicates near [threshold] [similarity] [representatives] [case_sensitive]{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Arguments:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}[threshold]{self.COLOR_RESET}      - Minimum occurrences to display (default: 2).\n"
-            f"  {self.COLOR_EXAMPLE}[case_sensitive]{self.COLOR_RESET} - Make comparison case-sensitive.\n\n"
+            f"  {self.COLOR_EXAMPLE}[case_sensitive]{self.COLOR_RESET} - Make comparison case-sensitive.\n"
+            f"  {self.COLOR_EXAMPLE}near{self.COLOR_RESET}             - Group lines differing only in IDs, numbers, timestamps or a few words.\n"
+            f"  {self.COLOR_EXAMPLE}[similarity]{self.COLOR_RESET}     - Near mode similarity between 0 and 1 (default: 0.8).\n"
+            f"  {self.COLOR_EXAMPLE}representatives{self.COLOR_RESET}  - Near mode: print one line per cluster with its count.\n\n"
             f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}find_duplicates{self.COLOR_RESET}           - Show all duplicates (2+ times).\n"
             f"  {self.COLOR_EXAMPLE}find_duplicates 5{self.COLOR_RESET}         - Show lines appearing 5+ times.\n"
-            f"  {self.COLOR_EXAMPLE}find_duplicates 3 case_sensitive{self.COLOR_RESET} - Case-sensitive search.\n\n"
+            f"  {self.COLOR_EXAMPLE}find_duplicates 3 case_sensitive{self.COLOR_RESET} - Case-sensitive search.\n"
+            f"  {self.COLOR_EXAMPLE}find_duplicates near{self.COLOR_RESET}      - Clusters of near-duplicate lines.\n"
+            f"  {self.COLOR_EXAMPLE}find_duplicates near 10 0.7 representatives{self.COLOR_RESET} - One line per cluster of 10+.\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
             f"  - By default, comparison is case-insensitive.\n"
             f"  - Results are sorted by occurrence count (descending).\n"
             f"  - Original line format is preserved in output.\n"
             f"  - Shows line numbers where duplicates appear.\n"
+            f"  - Near mode masks digits, hex values and UUIDs, then clusters lines with MinHash/LSH.\n"
         )
         if arg.strip() == "?":
             self.poutput(help_text)
@@ -6562,10 +9917,26 @@ class TextTool(cmd2.Cmd):
         args = arg.strip().split()
         threshold = 2
         case_sensitive = False
+        near = False
+        similarity = 0.8
+        representatives = False
         
         for a in args:
             if a.lower() == "case_sensitive":
                 case_sensitive = True
+            elif a.lower() == "near":
+                near = True
+            elif a.lower() == "representatives":
+                representatives = True
+            elif "." in a:
+                try:
+                    similarity = float(a)
+                except ValueError:
+                    self.poutput(f"Error: Invalid similarity value '{a}'")
+                    return
+                if not 0 < similarity <= 1:
+                    self.poutput("Error: Similarity must be between 0 and 1")
+                    return
             else:
                 try:
                     threshold = int(a)
@@ -6576,6 +9947,10 @@ class TextTool(cmd2.Cmd):
                     self.poutput(f"Error: Invalid threshold value '{a}'")
                     return
         
+        if near:
+            self._find_near_duplicates(threshold, similarity, representatives, case_sensitive)
+            return
+
         # Count occurrences
         from collections import defaultdict
         line_counts = defaultdict(list)  # key -> list of (line_number, original_line)
@@ -6619,8 +9994,63 @@ class TextTool(cmd2.Cmd):
         self.poutput(output)
 
 
+    def _find_near_duplicates(self, threshold, similarity, representatives, case_sensitive):
+        """Approximate mode of find_duplicates: cluster masked lines with MinHash/LSH."""
+        from collections import defaultdict
+
+        # Exact grouping on the masked form first, so each distinct shape is hashed once
+        groups = {}  # masked line -> [first original line, [line numbers]]
+        for idx, line in enumerate(self.iter_progress(self.current_lines), start=1):
+            line_stripped = line.rstrip('\n\r')
+            key = normalize_line(line_stripped, case_sensitive)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [line_stripped, [idx]]
+            else:
+                group[1].append(idx)
+
+        keys = list(groups)
+        cluster_ids = minhash_clusters(keys, similarity, progress=self.report_progress)
+        clusters = defaultdict(list)
+        for key, cluster_id in zip(keys, cluster_ids):
+            clusters[cluster_id].append(groups[key])
+
+        results = []
+        for members in clusters.values():
+            line_numbers = sorted(n for member in members for n in member[1])
+            if len(line_numbers) >= threshold:
+                # Representative: the member seen first in the text
+                first = min(members, key=lambda m: m[1][0])[0]
+                results.append((line_numbers, len(members), first))
+        results.sort(key=lambda r: len(r[0]), reverse=True)
+
+        sensitivity = "case-sensitive" if case_sensitive else "case-insensitive"
+        if not results:
+            self.poutput(f"No near-duplicate lines found with threshold {threshold}, similarity {similarity} ({sensitivity}).")
+            return
+
+        if representatives:
+            self.poutput("\n".join(f"{len(line_numbers):>8,}  {first}" for line_numbers, _, first in results))
+            return
+
+        output = f"\n{self.COLOR_HEADER}=== Near-Duplicate Lines ==={self.COLOR_RESET}\n"
+        output += f"Threshold: {threshold}+ occurrences, similarity {similarity} ({sensitivity})\n"
+        output += f"Found {len(results)} cluster(s) from {len(keys):,} distinct line shapes\n\n"
+
+        for line_numbers, variants, first in results:
+            display_line = first[:80] + "..." if len(first) > 80 else first
+            output += f"{self.COLOR_COMMAND}Count: {len(line_numbers)}{self.COLOR_RESET}  ({variants} variant(s))\n"
+            output += f"  Line: {display_line}\n"
+            output += f"  Found on lines: {', '.join(str(n) for n in line_numbers[:20])}"
+            if len(line_numbers) > 20:
+                output += f" ... and {len(line_numbers) - 20} more"
+            output += "\n\n"
+
+        self.poutput(output)
+
+
     def complete_find_duplicates(self, text, line, begidx, endidx):      
-        FRIENDS_T = ['case_sensitive', '?']
+        FRIENDS_T = ['case_sensitive', 'near', 'representatives', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -6698,47 +10128,35 @@ class TextTool(cmd2.Cmd):
             start_delim, end_delim, replacement = args[:3]
             filter_words = []
         
-        regex, msg = self._compile_regex_safely(
-            start_delim,
-            end_delim,
-            keep_delimiters=keep_delims,
-            case_sensitive=case_sensitive,
-            multiline=True
-        )
-        
-        if not regex:
-            self.poutput(f"Error: {msg}")
+        if not start_delim or not end_delim:
+            self.poutput("Error: Delimiters must not be empty.")
             return
         
-        text = "".join(self.current_lines)
+        lines = self.current_lines
+        # With keep_delimiters the block stops before the end delimiter, which stays in place
+        spans = scan_blocks(lines, start_delim, end_delim, case_sensitive, include_end=not keep_delims,
+                            progress=lambda done: self.report_progress(done, len(lines)))
         
-        if keep_delims:
-            def replacement_func(match):
-                # Check content filtering - ALL words must be present
-                if filter_words:
-                    block_text = match.group(2)  # The content between delimiters
-                    if not all(word in block_text for word in filter_words):
-                        return match.group(0)  # Return original if filter doesn't match
-                return match.group(1) + replacement  # Keep delimiters + replacement
-            
-            new_text = regex.sub(replacement_func, text)
-        else:
-            def replacement_func(match):
-                # Check content filtering - ALL words must be present
-                if filter_words:
-                    if not all(word in match.group(0) for word in filter_words):
-                        return match.group(0)  # Return original if filter doesn't match
-                return replacement  # Replace the entire block
-            
-            new_text = regex.sub(replacement_func, text)
+        def replacement_func(span):
+            block = span_text(lines, span)
+            start_text = block[:len(start_delim)]
+            # Check content filtering - ALL words must be present
+            if filter_words:
+                block_text = block[len(start_delim):] if keep_delims else block
+                if not all(word in block_text for word in filter_words):
+                    return None  # Keep the original if filter doesn't match
+            new = start_text + replacement if keep_delims else replacement
+            return None if new == block else new
+        
+        new_lines, replaced = rewrite_spans(lines, spans, replacement_func)
         
-        if new_text == text:
+        if not replaced:
             filter_info = " Filter may have excluded all matches." if filter_words else ""
             self.poutput(f"No matching blocks found.{filter_info}")
             return
         
         self.previous_lines = self.current_lines.copy()
-        self.current_lines = new_text.splitlines(keepends=True)
+        self.current_lines = new_lines
         
         try:
             self.do_fill_words('')
@@ -6751,7 +10169,7 @@ class TextTool(cmd2.Cmd):
         self.poutput(f"Replaced content between '{start_delim}' and '{end_delim}'{filter_info}.")
 
     def complete_replace_between(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive', 'keep_delimiters','?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive', 'keep_delimiters','?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -7086,16 +10504,51 @@ class TextTool(cmd2.Cmd):
         return completions
 
 
+    def format_box_table(self, rows, col_widths=None, max_width=30, use_header=True):
+        """Render rows as a bordered text table, the first row as header when use_header is set."""
+        if col_widths is None:
+            col_widths = [0] * max((len(row) for row in rows), default=0)
+            for row in rows:
+                for i, cell in enumerate(row):
+                    col_widths[i] = max(col_widths[i], min(len(str(cell)), max_width))
+        # Ensure minimum width for readability
+        col_widths = [max(width, 3) for width in col_widths]
+        header_sep = "+" + "+".join("-" * (width + 2) for width in col_widths) + "+"
+
+        def render(row):
+            cells = []
+            for i, width in enumerate(col_widths):
+                if i < len(row):
+                    cell_content = str(row[i])[:max_width]
+                    cells.append(f" {cell_content:<{width}} ")
+                else:
+                    cells.append(" " * (width + 2))
+            return "|" + "|".join(cells) + "|"
+
+        table_lines = [header_sep]
+        if use_header and rows:
+            table_lines += [render(rows[0]), header_sep]
+            rows = rows[1:]
+        table_lines.extend(render(row) for row in rows)
+        table_lines.append(header_sep)
+        return table_lines
+
     def do_csv_to_table(self, arg):
         """Convert CSV/delimited text to a formatted table display.
 
         Usage:
-            csv_to_table [delimiter] [header] [max_cols] [max_width]
+            csv_to_table [delimiter] [header] [max_cols] [max_width] [raw]
+                         [--page N] [--rows N] [--head [N]] [--tail [N]]
         
         Arguments:
             delimiter - Field delimiter (default: ",")
                        Use "tab", "space", "pipe", "semicolon", or specific character.
             header    - Treat first line as header (add "noheader" to disable).
+            raw       - Split on every delimiter, ignoring CSV quoting.
+            --page N  - Show page N (default: 1).
+            --rows N  - Rows per page (default: 100).
+            --head N  - Show only the first N rows (default: 10).
+            --tail N  - Show only the last N rows (default: 10).
             max_cols  - Maximum number of columns to display (default: 10).
             max_width - Maximum column width (default: 30).
         
@@ -7105,30 +10558,48 @@ class TextTool(cmd2.Cmd):
             csv_to_table ";" 15 50          - Semicolon-delimited, max 15 cols, width 50.
             csv_to_table pipe noheader      - Pipe-delimited, no header treatment.
             csv_to_table space 5 20         - Space-delimited, limited display.
+            csv_to_table --page 3 --rows 50 - Rows 101-150.
+            csv_to_table tab --tail 20      - Last 20 rows of a tab-delimited file.
         
         Notes:
             - The conversion is for display only - doesn't modify the actual data.
             - Very wide tables will be truncated for readability.
+            - Only one page is rendered; column widths come from the whole table,
+              so they stay the same from page to page.
+            - Quoted fields are kept whole; the parsed columns are cached until the text changes.
+            - Delimiters longer than one character and unbalanced quotes fall back to
+              splitting on every delimiter, so no row is lost.
             - Useful for quickly viewing CSV data in a readable format.
         """
         help_text = (
             f"{self.COLOR_HEADER}\nConvert CSV/delimited text to a formatted table display.{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
-            f"  {self.COLOR_EXAMPLE}csv_to_table [delimiter] [header] [max_cols] [max_width]{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}csv_to_table [delimiter] [header] [max_cols] [max_width] [raw]{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}             [--page N] [--rows N] [--head [N]] [--tail [N]]{self.COLOR_RESET}\n\n"
             f"{self.COLOR_COMMAND}Arguments:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}delimiter{self.COLOR_RESET} - Field delimiter (default: \",\")\n"
             f"               Use \"tab\", \"space\", \"pipe\", \"semicolon\", or specific character.\n"
             f"  {self.COLOR_EXAMPLE}header{self.COLOR_RESET}    - Treat first line as header (add \"noheader\" to disable).\n"
+            f"  {self.COLOR_EXAMPLE}raw{self.COLOR_RESET}       - Split on every delimiter, ignoring CSV quoting.\n"
+            f"  {self.COLOR_EXAMPLE}--page N{self.COLOR_RESET}  - Show page N (default: 1).\n"
+            f"  {self.COLOR_EXAMPLE}--rows N{self.COLOR_RESET}  - Rows per page (default: 100).\n"
+            f"  {self.COLOR_EXAMPLE}--head N{self.COLOR_RESET}  - Show only the first N rows (default: 10).\n"
+            f"  {self.COLOR_EXAMPLE}--tail N{self.COLOR_RESET}  - Show only the last N rows (default: 10).\n"
             f"  {self.COLOR_EXAMPLE}max_cols{self.COLOR_RESET}  - Maximum number of columns to display (default: 10).\n"
             f"  {self.COLOR_EXAMPLE}max_width{self.COLOR_RESET} - Maximum column width (default: 30).\n\n"
             f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}csv_to_table{self.COLOR_RESET}                    - Convert with comma delimiter.\n"
             f"  {self.COLOR_EXAMPLE}csv_to_table tab header{self.COLOR_RESET}         - Convert tab-delimited with header.\n"
             f"  {self.COLOR_EXAMPLE}csv_to_table \";\" 15 50{self.COLOR_RESET}          - Semicolon-delimited, max 15 cols, width 50.\n"
-            f"  {self.COLOR_EXAMPLE}csv_to_table pipe noheader{self.COLOR_RESET}      - Pipe-delimited, no header treatment.\n\n"
+            f"  {self.COLOR_EXAMPLE}csv_to_table pipe noheader{self.COLOR_RESET}      - Pipe-delimited, no header treatment.\n"
+            f"  {self.COLOR_EXAMPLE}csv_to_table --page 3 --rows 50{self.COLOR_RESET} - Rows 101-150.\n"
+            f"  {self.COLOR_EXAMPLE}csv_to_table tab --tail 20{self.COLOR_RESET}      - Last 20 rows.\n\n"
             f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
             f"  - The conversion is for display only - doesn't modify the actual data.\n"
             f"  - Very wide tables will be truncated for readability.\n"
+            f"  - Only the requested page is rendered; widths stay the same on every page.\n"
+            f"  - Quoted fields are kept whole, as in CSV; long delimiters and unbalanced quotes\n"
+            f"    fall back to splitting on every delimiter.\n"
             f"  - Useful for quickly viewing CSV data in a readable format.\n"
         )
         if arg.strip() == "?":
@@ -7146,8 +10617,37 @@ class TextTool(cmd2.Cmd):
             use_header = True
             max_cols = 10
             max_width = 30
+            raw = False
+            page = 1
+            page_rows = 100
+            head = tail = None
+            
+            # Paging options take a number: "--page 3" or "--page=3"
+            remaining = []
+            i = 0
+            while i < len(args):
+                option, _, value = args[i].partition("=")
+                if option in ("--page", "--rows", "--head", "--tail"):
+                    if not value and i + 1 < len(args) and args[i + 1].isdigit():
+                        value = args[i + 1]
+                        i += 1
+                    if value and (not value.isdigit() or int(value) < 1):
+                        self.poutput(f"Error: {option} expects a positive number.")
+                        return
+                    number = int(value) if value else None
+                    if option == "--page":
+                        page = number or 1
+                    elif option == "--rows":
+                        page_rows = number or page_rows
+                    elif option == "--head":
+                        head = number or 10
+                    else:
+                        tail = number or 10
+                else:
+                    remaining.append(args[i])
+                i += 1
             
-            for arg_val in args:
+            for arg_val in remaining:
                 if arg_val in ["tab", "\\t", "\t"]:
                     delimiter = "\t"
                 elif arg_val == "space":
@@ -7160,6 +10660,8 @@ class TextTool(cmd2.Cmd):
                     use_header = False
                 elif arg_val == "header":
                     use_header = True
+                elif arg_val == "raw":
+                    raw = True
                 elif arg_val.isdigit():
                     if max_cols == 10:  # First number is max_cols
                         max_cols = int(arg_val)
@@ -7169,107 +10671,282 @@ class TextTool(cmd2.Cmd):
                     # Assume it's a custom delimiter
                     delimiter = arg_val
             
-            # Parse CSV data
-            rows = []
-            max_columns = 0
-            
-            for line in self.current_lines:
-                line = line.rstrip('\n\r')
-                if delimiter == " ":
-                    # For space delimiter, use split() to handle multiple spaces
-                    parts = line.split()
-                else:
-                    parts = line.split(delimiter)
-                
-                if parts:  # Only add non-empty lines
-                    rows.append(parts)
-                    max_columns = max(max_columns, len(parts))
+            # Parse CSV data (for space delimiter, split() handles multiple spaces)
+            if delimiter == " ":
+                table = self.parsed_table(delimiter, "words")
+            else:
+                table = self.parsed_table(delimiter, "raw" if raw else "csv")
+            max_columns = len(table.columns)
             
-            if not rows:
+            # Only add non-empty lines
+            if all(table.row_lengths):
+                keep = range(table.n_rows)
+            else:
+                keep = [n for n, length in enumerate(table.row_lengths) if length]
+            if not keep:
                 self.poutput("Error: No data found to display as table.")
                 return
             
             # Limit columns
             display_cols = min(max_columns, max_cols)
+            columns = table.columns[:display_cols]
             
-            # Calculate column widths
-            col_widths = [0] * display_cols
-            for row in rows:
-                for i in range(min(len(row), display_cols)):
-                    col_widths[i] = max(col_widths[i], min(len(str(row[i])), max_width))
-            
-            # Ensure minimum width for readability
-            col_widths = [max(width, 3) for width in col_widths]
-            
-            # Build table
-            table_lines = []
-            
-            # Header separator
-            header_sep = "+" + "+".join("-" * (width + 2) for width in col_widths) + "+"
-            
-            table_lines.append(header_sep)
-            
-            # Add header if requested and data exists
-            if use_header and rows:
-                header_row = rows[0]
-                header_cells = []
-                for i in range(display_cols):
-                    if i < len(header_row):
-                        cell_content = str(header_row[i])[:max_width]
-                        header_cells.append(f" {cell_content:<{col_widths[i]}} ")
-                    else:
-                        header_cells.append(" " * (col_widths[i] + 2))
-                
-                table_lines.append("|" + "|".join(header_cells) + "|")
-                table_lines.append(header_sep)
-                data_rows = rows[1:]
+            # Pick the rows of the requested page; only these are rendered
+            data_index = keep[1:] if use_header else keep
+            total_rows = len(data_index)
+            if head is not None:
+                first, last = 0, min(head, total_rows)
+            elif tail is not None:
+                first, last = max(total_rows - tail, 0), total_rows
             else:
-                data_rows = rows
+                first = (page - 1) * page_rows
+                last = min(first + page_rows, total_rows)
+                if first >= total_rows > 0:
+                    self.poutput(f"Error: Page {page} is past the end ({-(-total_rows // page_rows)} pages).")
+                    return
+            rows = [tuple(column[n] for column in columns) for n in data_index[first:last]]
+            if use_header:
+                rows.insert(0, tuple(column[keep[0]] for column in columns))
             
-            # Add data rows
-            for row in data_rows:
-                cells = []
-                for i in range(display_cols):
-                    if i < len(row):
-                        cell_content = str(row[i])[:max_width]
-                        cells.append(f" {cell_content:<{col_widths[i]}} ")
-                    else:
-                        cells.append(" " * (col_widths[i] + 2))
-                
-                table_lines.append("|" + "|".join(cells) + "|")
+            # Calculate column widths over the whole table, so every page lines up
+            full_widths = table.widths()
+            col_widths = [min(width, max_width) for width in full_widths[:display_cols]]
             
-            table_lines.append(header_sep)
+            # Build table
+            table_lines = self.format_box_table(rows, col_widths, max_width, use_header)
+            data_rows = rows[1:] if use_header and rows else rows
             
             # Display table
-            self.poutput(f"\nTable display ({len(data_rows)} rows, {display_cols} columns):")
+            if len(data_rows) == total_rows:
+                self.poutput(f"\nTable display ({len(data_rows)} rows, {display_cols} columns):")
+            else:
+                self.poutput(f"\nTable display (rows {first + 1}-{last} of {total_rows}, {display_cols} columns):")
             self.poutput(f"Delimiter: {repr(delimiter)} | Max columns: {max_cols} | Max width: {max_width}")
             self.poutput("")
             
-            for line in table_lines:
-                self.poutput(line)
+            self.poutput("\n".join(table_lines))
             
             # Show summary
+            if head is None and tail is None and last < total_rows:
+                self.poutput(f"\nPage {page} of {-(-total_rows // page_rows)}. Use --page N to see more.")
             if max_columns > display_cols:
                 self.poutput(f"\nNote: Table truncated from {max_columns} to {display_cols} columns.")
-            if any(len(str(cell)) > max_width for row in rows for cell in row):
+            if any(width > max_width for width in full_widths):
                 self.poutput(f"Note: Some cell contents truncated to {max_width} characters.")
                 
         except Exception as e:
             self.poutput(f"Error displaying table: {str(e)}")
 
     def complete_csv_to_table(self, text, line, begidx, endidx):      
-        FRIENDS_T = ['tab', 'space', 'pipe', 'semicolon','case_sensitive','header','noheader','?']
+        FRIENDS_T = ['tab', 'space', 'pipe', 'semicolon','case_sensitive','header','noheader','raw',
+                     '--page', '--rows', '--head', '--tail', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
             completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
         return completions
 
+    def do_group_by(self, arg):
+        """Group delimited rows by one or more columns and aggregate numeric columns.
+
+        Usage:
+            group_by <key_columns> [values <value_columns>] [delimiter] [header] [raw] [to_text] [pandas]
+
+        Arguments:
+            key_columns   - Columns to group by, same format as extract_column ("1", "1,3", "2-4")
+            values        - Numeric columns to aggregate with sum, min, max and mean
+            delimiter     - Field delimiter (default: ","); "tab", "space", "pipe", "semicolon" or a character
+            header        - The first line holds column names
+            raw           - Split on every delimiter, ignoring CSV quoting
+            to_text       - Replace the text with the result (delimited) instead of displaying a table
+            pandas        - Aggregate with pandas instead of the built-in hash aggregation
+
+        Examples:
+            group_by 2                           - Count rows per value of column 2
+            group_by "1,3" values 5 header       - Count, sum, min, max and mean of column 5 per (1, 3)
+            group_by 4 values "6-7" tab to_text  - Write the rollup back as tab-delimited lines
+
+        Notes:
+            - Rows are aggregated in a single pass over the cached parsed table.
+            - Groups are listed by descending count; ties keep their first appearance.
+            - Values that are not numbers are ignored by the aggregates (but still counted).
+            - Delimiters longer than one character and unbalanced quotes fall back to
+              splitting on every delimiter, so no row is lost.
+        """
+        help_text = (
+            f"{self.COLOR_HEADER}\nGroup delimited rows and aggregate numeric columns.{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}group_by <key_columns> [values <value_columns>] [delimiter] [header] [raw] [to_text] [pandas]{self.COLOR_RESET}\n\n"
+            f"{self.COLOR_COMMAND}Arguments:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}key_columns{self.COLOR_RESET} - Columns to group by, as in extract_column (\"1\", \"1,3\", \"2-4\")\n"
+            f"  {self.COLOR_EXAMPLE}values{self.COLOR_RESET}      - Numeric columns to aggregate (sum, min, max, mean)\n"
+            f"  {self.COLOR_EXAMPLE}delimiter{self.COLOR_RESET}   - Field delimiter (default: \",\"); tab, space, pipe, semicolon\n"
+            f"  {self.COLOR_EXAMPLE}header{self.COLOR_RESET}      - The first line holds column names\n"
+            f"  {self.COLOR_EXAMPLE}raw{self.COLOR_RESET}         - Split on every delimiter, ignoring CSV quoting\n"
+            f"  {self.COLOR_EXAMPLE}to_text{self.COLOR_RESET}     - Replace the text with the result instead of displaying it\n"
+            f"  {self.COLOR_EXAMPLE}pandas{self.COLOR_RESET}      - Aggregate with pandas\n\n"
+            f"{self.COLOR_COMMAND}Examples:{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}group_by 2{self.COLOR_RESET}                           - Count rows per value of column 2\n"
+            f"  {self.COLOR_EXAMPLE}group_by \"1,3\" values 5 header{self.COLOR_RESET}       - Aggregate column 5 per (1, 3)\n"
+            f"  {self.COLOR_EXAMPLE}group_by 4 values \"6-7\" tab to_text{self.COLOR_RESET}  - Write the rollup back as text\n\n"
+            f"{self.COLOR_COMMAND}Notes:{self.COLOR_RESET}\n"
+            f"  - Rows are aggregated in a single pass over the cached parsed table.\n"
+            f"  - Groups are listed by descending count.\n"
+            f"  - Values that are not numbers are ignored by the aggregates (but still counted).\n"
+            f"  - Long delimiters and unbalanced quotes fall back to splitting on every delimiter.\n"
+        )
+        if arg.strip() == "?":
+            self.poutput(help_text)
+            return
+        if not self.current_lines:
+            self.poutput("Error: No file is loaded.")
+            return
+        if hasattr(arg, 'args'):
+            arg = arg.args
+
+        args = shlex.split(arg) if '"' in arg or "'" in arg else arg.split()
+        if not args:
+            self.poutput("Error: Missing key columns. Usage: group_by <key_columns> [values <value_columns>]")
+            return
+        delimiter = ","
+        use_header = raw = to_text = use_pandas = False
+        value_spec = None
+        i = 1
+        while i < len(args):
+            token = args[i]
+            if token == "values" and i + 1 < len(args):
+                value_spec = args[i + 1]
+                i += 1
+            elif token == "header":
+                use_header = True
+            elif token == "raw":
+                raw = True
+            elif token == "to_text":
+                to_text = True
+            elif token == "pandas":
+                use_pandas = True
+            else:
+                delimiter = {"tab": "\t", "\\t": "\t", "space": " ", "pipe": "|", "semicolon": ";"}.get(token, token)
+            i += 1
+        try:
+            key_cols = parse_column_spec(args[0])
+            value_cols = parse_column_spec(value_spec) if value_spec else []
+        except ValueError as e:
+            self.poutput(f"Error: {e}")
+            return
+
+        if delimiter == " ":
+            table = self.parsed_table(delimiter, "words")
+        else:
+            table = self.parsed_table(delimiter, "raw" if raw else "csv")
+        row_numbers = [n for n, length in enumerate(table.row_lengths) if length]
+        if use_header and row_numbers:
+            header_n = row_numbers.pop(0)
+            name = lambda c: table.column(c)[header_n] or f"col{c}"
+        else:
+            name = lambda c: f"col{c}"
+        if not row_numbers:
+            self.poutput("Error: No data rows to group.")
+            return
+
+        key_columns = [table.column(c) for c in key_cols]
+        value_columns = [table.column(c) for c in value_cols]
+        if use_pandas:
+            try:
+                results = self._group_by_pandas(row_numbers, key_columns, value_columns)
+            except ImportError:
+                self.poutput("Error: pandas is not installed.")
+                return
+        else:
+            # One hash-aggregation pass: key -> [count, [sum, min, max, n] per value column]
+            groups = {}
+            for n in self.iter_progress(row_numbers):
+                key = tuple(column[n] for column in key_columns)
+                stats = groups.get(key)
+                if stats is None:
+                    stats = groups[key] = [0] + [[0.0, None, None, 0] for _ in value_columns]
+                stats[0] += 1
+                for j, column in enumerate(value_columns, start=1):
+                    try:
+                        x = float(column[n])
+                    except ValueError:
+                        continue
+                    acc = stats[j]
+                    acc[0] += x
+                    acc[1] = x if acc[1] is None or x < acc[1] else acc[1]
+                    acc[2] = x if acc[2] is None or x > acc[2] else acc[2]
+                    acc[3] += 1
+            results = []
+            for key, stats in groups.items():
+                aggregates = []
+                for total, low, high, count in stats[1:]:
+                    aggregates += [total, low, high, total / count] if count else [None] * 4
+                results.append((key, stats[0], aggregates))
+            results.sort(key=lambda result: result[1], reverse=True)
+
+        def number(x):
+            if x is None or x != x:
+                return ""
+            if float(x).is_integer() and abs(x) < 1e15:
+                return str(int(x))
+            return f"{x:.6f}".rstrip("0").rstrip(".")
+
+        header = [name(c) for c in key_cols] + ["count"]
+        for c in value_cols:
+            header += [f"{stat}_{name(c)}" for stat in ("sum", "min", "max", "mean")]
+        rows = [header] + [list(key) + [str(count)] + [number(x) for x in aggregates]
+                           for key, count, aggregates in results]
+
+        if to_text:
+            self.previous_lines = self.current_lines.copy()
+            self.previous_words = self.words.copy()
+            self.current_lines = table.format_rows(rows)
+            self.update_live_view()
+            try:
+                self.do_fill_words('')
+            except:
+                a=0
+            self.poutput(f"Grouped {len(row_numbers)} rows into {len(results)} groups.")
+        else:
+            self.poutput(f"\nGroup by {', '.join(header[:len(key_cols)])} ({len(row_numbers)} rows, {len(results)} groups):\n")
+            self.poutput("\n".join(self.format_box_table(rows)))
+
+    def _group_by_pandas(self, row_numbers, key_columns, value_columns):
+        """pandas version of the group_by aggregation; returns (key, count, aggregates) rows."""
+        import pandas as pd
+
+        frame = pd.DataFrame({f"k{i}": [column[n] for n in row_numbers] for i, column in enumerate(key_columns)})
+        keys = list(frame.columns)
+        for i, column in enumerate(value_columns):
+            values = pd.Series([column[n] for n in row_numbers]).str.strip()
+            frame[f"v{i}"] = pd.to_numeric(values, errors="coerce")
+        grouped = frame.groupby(keys, sort=False)
+        result = grouped.size().to_frame("count")
+        for i in range(len(value_columns)):
+            result[f"sum{i}"] = grouped[f"v{i}"].sum(min_count=1)
+            result[f"min{i}"] = grouped[f"v{i}"].min()
+            result[f"max{i}"] = grouped[f"v{i}"].max()
+            result[f"mean{i}"] = grouped[f"v{i}"].mean()
+        result = result.sort_values("count", ascending=False, kind="stable")
+        rows = []
+        for key, record in zip(result.index, result.itertuples(index=False)):
+            key = key if isinstance(key, tuple) else (key,)
+            rows.append((key, int(record[0]), [None if pd.isna(x) else float(x) for x in record[1:]]))
+        return rows
+
+    def complete_group_by(self, text, line, begidx, endidx):
+        FRIENDS_T = ['values', 'tab', 'space', 'pipe', 'semicolon', 'header', 'raw', 'to_text', 'pandas', '?']
+        if not text:
+            completions = FRIENDS_T[:]
+        else:
+            completions = [f for f in FRIENDS_T if f.lower().startswith(text.lower())]
+        return completions
+
     def do_indented_select(self, arg):
         """Select all indented text under a specified heading or pattern.
 
         Usage:
-            indented_select <pattern> [case_sensitive]
+            indented_select <pattern> [case_sensitive] [--depth N]
 
         Description:
             Finds lines matching the pattern and selects those lines plus all subsequent
@@ -7281,6 +10958,7 @@ class TextTool(cmd2.Cmd):
             indented_select "element-rule"   - Select all element-rule blocks with their content
             indented_select "function " case_sensitive - Pattern with trailing space (case-sensitive)
             indented_select "class "         - Select lines starting with "class " (with space)
+            indented_select "name" --depth 1 - Select "name" blocks one level below the top
 
         Behavior:
             - Finds the target pattern in the text
@@ -7305,7 +10983,8 @@ class TextTool(cmd2.Cmd):
             f"  Essential for working with structured configuration files and code.\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}indented_select <pattern>{self.COLOR_RESET}  - Select pattern and indented content\n"
-            f"  {self.COLOR_EXAMPLE}indented_select <pattern> case_sensitive{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}indented_select <pattern> case_sensitive{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}indented_select <pattern> --depth N{self.COLOR_RESET}  - Only headers nested N levels deep (0 = top level)\n\n"
             f"{self.COLOR_COMMAND}Selection Logic:{self.COLOR_RESET}\n"
             f"  • Finds all lines matching the pattern\n"
             f"  • Includes the matching line itself\n"
@@ -7371,6 +11050,19 @@ class TextTool(cmd2.Cmd):
         if case_sensitive:
             args.remove("case_sensitive")
 
+        # Optional --depth N: only headers at that nesting depth (0 = top level)
+        depth = None
+        if "--depth" in args:
+            pos = args.index("--depth")
+            try:
+                depth = int(args[pos + 1])
+                if depth < 0:
+                    raise ValueError
+            except (IndexError, ValueError):
+                self.poutput("Error: --depth needs a non-negative number.")
+                return
+            del args[pos:pos + 2]
+
         # Get pattern - use first argument and preserve all spaces
         if not args:
             self.poutput("Error: Invalid pattern specified.")
@@ -7388,46 +11080,10 @@ class TextTool(cmd2.Cmd):
             flags = 0 if case_sensitive else re.IGNORECASE
             regex = re.compile(pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags)
 
-            selected_lines = []
-            i = 0
-            
-            while i < len(self.current_lines):
-                line = self.current_lines[i]
-                
-                # Check if this line matches our pattern
-                if regex.search(line):
-                    # Calculate base indentation (count leading whitespace)
-                    base_indent = len(line) - len(line.lstrip())
-                    
-                    # Add the matching line
-                    selected_lines.append(line)
-                    
-                    # Process subsequent lines with greater indentation
-                    j = i + 1
-                    while j < len(self.current_lines):
-                        next_line = self.current_lines[j]
-                        
-                        # Skip completely empty lines but include them in the selection
-                        if not next_line.strip():
-                            selected_lines.append(next_line)
-                            j += 1
-                            continue
-                        
-                        # Calculate next line's indentation
-                        next_indent = len(next_line) - len(next_line.lstrip())
-                        
-                        # If next line has equal or less indentation, we've reached the end of this block
-                        if next_indent <= base_indent:
-                            break
-                        
-                        # Line has greater indentation - include it
-                        selected_lines.append(next_line)
-                        j += 1
-                    
-                    # Move i to where we left off
-                    i = j
-                else:
-                    i += 1
+            # The outline gives each matching line's block as an index range
+            lines = self.current_lines
+            blocks = self.indent_outline().blocks(lambda i: regex.search(lines[i]), depth)
+            selected_lines = [line for start, end in blocks for line in lines[start:end]]
 
             if selected_lines:
                 self.current_lines = selected_lines
@@ -7449,7 +11105,7 @@ class TextTool(cmd2.Cmd):
             self.poutput(f"Error: Invalid regex pattern. {e}")
 
     def complete_indented_select(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive', '?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive', '--depth', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -7461,7 +11117,7 @@ class TextTool(cmd2.Cmd):
         """Remove all indented text under a specified heading or pattern.
 
         Usage:
-            indented_remove <pattern> [case_sensitive]
+            indented_remove <pattern> [case_sensitive] [--depth N]
 
         Description:
             Finds lines matching the pattern and removes those lines plus all subsequent
@@ -7473,6 +11129,7 @@ class TextTool(cmd2.Cmd):
             indented_remove "element-rule"   - Remove all element-rule blocks with their content
             indented_remove "debug " case_sensitive - Pattern with trailing space (case-sensitive)
             indented_remove "test_ "         - Remove lines starting with "test_ " (with space)
+            indented_remove "debug" --depth 2 - Remove only "debug" blocks nested two levels deep
 
         Behavior:
             - Finds the target pattern in the text
@@ -7498,7 +11155,8 @@ class TextTool(cmd2.Cmd):
             f"  Inverse operation of {self.COLOR_EXAMPLE}indented_select{self.COLOR_RESET}.\n\n"
             f"{self.COLOR_COMMAND}Usage:{self.COLOR_RESET}\n"
             f"  {self.COLOR_EXAMPLE}indented_remove <pattern>{self.COLOR_RESET}  - Remove pattern and indented content\n"
-            f"  {self.COLOR_EXAMPLE}indented_remove <pattern> case_sensitive{self.COLOR_RESET}\n\n"
+            f"  {self.COLOR_EXAMPLE}indented_remove <pattern> case_sensitive{self.COLOR_RESET}\n"
+            f"  {self.COLOR_EXAMPLE}indented_remove <pattern> --depth N{self.COLOR_RESET}  - Only headers nested N levels deep (0 = top level)\n\n"
             f"{self.COLOR_COMMAND}Removal Logic:{self.COLOR_RESET}\n"
             f"  • Finds all lines matching the pattern\n"
             f"  • Removes the matching line itself\n"
@@ -7564,6 +11222,19 @@ class TextTool(cmd2.Cmd):
         if case_sensitive:
             args.remove("case_sensitive")
 
+        # Optional --depth N: only headers at that nesting depth (0 = top level)
+        depth = None
+        if "--depth" in args:
+            pos = args.index("--depth")
+            try:
+                depth = int(args[pos + 1])
+                if depth < 0:
+                    raise ValueError
+            except (IndexError, ValueError):
+                self.poutput("Error: --depth needs a non-negative number.")
+                return
+            del args[pos:pos + 2]
+
         # Get pattern - use first argument and preserve all spaces
         if not args:
             self.poutput("Error: Invalid pattern specified.")
@@ -7581,55 +11252,21 @@ class TextTool(cmd2.Cmd):
             flags = 0 if case_sensitive else re.IGNORECASE
             regex = re.compile(pattern.replace('[doublequote]','\\"').replace('[pipe]','\\|').replace('[quote]',"\\'").replace('[tab]',"\t").replace('[greater]',">").replace('[spaces]',r"[^\S\r\n]+"), flags)
 
-            lines_to_remove = set()  # Use set to track line indices to remove
-            i = 0
-            blocks_removed = 0
-            
-            while i < len(self.current_lines):
-                line = self.current_lines[i]
-                
-                # Check if this line matches our pattern
-                if regex.search(line):
-                    blocks_removed += 1
-                    # Calculate base indentation (count leading whitespace)
-                    base_indent = len(line) - len(line.lstrip())
-                    
-                    # Mark the matching line for removal
-                    lines_to_remove.add(i)
-                    
-                    # Mark subsequent lines with greater indentation for removal
-                    j = i + 1
-                    while j < len(self.current_lines):
-                        next_line = self.current_lines[j]
-                        
-                        # Handle completely empty lines - include them in removal
-                        if not next_line.strip():
-                            lines_to_remove.add(j)
-                            j += 1
-                            continue
-                        
-                        # Calculate next line's indentation
-                        next_indent = len(next_line) - len(next_line.lstrip())
-                        
-                        # If next line has equal or less indentation, we've reached the end of this block
-                        if next_indent <= base_indent:
-                            break
-                        
-                        # Line has greater indentation - mark for removal
-                        lines_to_remove.add(j)
-                        j += 1
-                    
-                    # Move i to where we left off
-                    i = j
-                else:
-                    i += 1
-
-            if lines_to_remove:
-                # Create new list without the removed lines
-                remaining_lines = [line for idx, line in enumerate(self.current_lines) 
-                                 if idx not in lines_to_remove]
-                
-                lines_removed = len(lines_to_remove)
+            # The outline gives each matching line's block as an index range
+            lines = self.current_lines
+            blocks = self.indent_outline().blocks(lambda i: regex.search(lines[i]), depth)
+            blocks_removed = len(blocks)
+
+            if blocks:
+                # Keep the lines between the removed ranges
+                remaining_lines = []
+                kept_from = 0
+                for start, end in blocks:
+                    remaining_lines.extend(lines[kept_from:start])
+                    kept_from = end
+                remaining_lines.extend(lines[kept_from:])
+                
+                lines_removed = len(lines) - len(remaining_lines)
                 self.current_lines = remaining_lines
                 
                 try:
@@ -7653,7 +11290,7 @@ class TextTool(cmd2.Cmd):
             self.poutput(f"Error: Invalid regex pattern. {e}")
 
     def complete_indented_remove(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive', '?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive', '--depth', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -7661,7 +11298,7 @@ class TextTool(cmd2.Cmd):
         return completions
 
     def complete_autocompletion_from_text(self, text, line, begidx, endidx):      
-        FRIENDS_T = ['on', 'off','?']
+        FRIENDS_T = ['on', 'off', 'limit', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -7752,7 +11389,7 @@ class TextTool(cmd2.Cmd):
 
 
     def complete_extract_context(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive', '?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -7844,7 +11481,7 @@ class TextTool(cmd2.Cmd):
 
 
     def complete_replace_multiline(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive', '?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -7924,27 +11561,22 @@ class TextTool(cmd2.Cmd):
             start_pat, end_pat = args[:2]
             filter_words = []
         
-        regex, msg = self._compile_regex_safely(
-            start_pat,
-            end_pat,
-            case_sensitive=case_sensitive,
-            multiline=True
-        )
-        
-        if not regex:
-            self.poutput(f"Error: {msg}")
+        if not start_pat or not end_pat:
+            self.poutput("Error: Delimiters must not be empty.")
             return
         
-        text = "".join(self.current_lines)
+        lines = self.current_lines
+        spans = scan_blocks(lines, start_pat, end_pat, case_sensitive,
+                            progress=lambda done: self.report_progress(done, len(lines)))
         
-        def removal_func(match):
+        def removal_func(span):
             # Check content filtering - ALL words must be present
             if filter_words:
-                if not all(word in match.group(0) for word in filter_words):
-                    return match.group(0)  # Keep the block if filter doesn't match
+                if not all(word in span_text(lines, span) for word in filter_words):
+                    return None  # Keep the block if filter doesn't match
             return ""  # Remove the block
         
-        new_text, count = regex.subn(removal_func, text)
+        new_lines, count = rewrite_spans(lines, spans, removal_func)
         
         if count == 0:
             filter_info = " (filter may have excluded matches)" if filter_words else ""
@@ -7952,7 +11584,7 @@ class TextTool(cmd2.Cmd):
             return
         
         self.previous_lines = self.current_lines.copy()
-        self.current_lines = new_text.splitlines(keepends=True)
+        self.current_lines = new_lines
         
         try:
             self.do_fill_words('')
@@ -7966,7 +11598,7 @@ class TextTool(cmd2.Cmd):
 
 
     def complete_remove_blocks(self, text, line, begidx, endidx):      
-        FRIENDS_T = self.words[:]+['case_sensitive', '?']
+        FRIENDS_T = self.word_index.complete(text, self.completion_limit)+['case_sensitive', '?']
         if not text:
             completions = FRIENDS_T[:]
         else: 
@@ -7974,31 +11606,12 @@ class TextTool(cmd2.Cmd):
         return completions
 
     def do_fill_words(self, arg):
-        import re
-
-        # Example: self.current_lines is a list of strings
+        # Keep the autocompletion word index in step with the text. Only the lines
+        # added or removed since the last call are tokenized (see WordIndex); a
+        # sparse edit hands over its change set so the text is not compared.
         if not self.auotocomplete_from_text:
             return
-        if not hasattr(self, "previous_lines"):
-            self.previous_lines = []
-        if not hasattr(self, "current_lines"):
-            self.current_lines = []            
-        if self.current_lines == self.previous_lines:
-            return
-        if self.current_lines:
-            full_text = " ".join(self.current_lines)
-
-        # Use regex to split by spaces, tabs, <, >, or >< (handled by splitting on all non-word characters)
-            delimiters = r"[\s\t<>\/,\"&;:\\=\(\)\+\|\.\'\!\^\’\”\“\{\}]+"
-            wordss = re.split(delimiters, full_text)
-
-
-            filtered_words = {
-                word for word in wordss
-                if word and len(word) > 3 and re.match(r'^[A-Za-z]', word)}
-
-        # Filter out empty strings and get unique words
-            self.words = sorted(filtered_words)
+        self.word_index.sync(getattr(self, "current_lines", []), getattr(self, "last_changes", None))
 
 
     def do_unfilter(self, arg):